@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+
+        from . import checks  # noqa: F401
+        from .authentication import revoke_deleted_user, revoke_inactive_user
+        from .metrics import install_query_wrapper
+        from .models import CustomUser
+
+        connection_created.connect(install_query_wrapper)
+        post_delete.connect(revoke_deleted_user, sender=CustomUser)
+        post_save.connect(revoke_inactive_user, sender=CustomUser)
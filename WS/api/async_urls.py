@@ -0,0 +1,37 @@
+from django.urls import path
+
+from . import urls
+from .async_views import (
+    AsyncCheckAuthenticationView,
+    AsyncContactView,
+    AsyncProgressRecordsView,
+    AsyncSendCodeForRegistrationView,
+    AsyncSendCodeForResetPasswordView,
+    AsyncVerifyCodeView,
+)
+
+# Profil ASGI : ces routes passent avant celles de api.urls, qui gardent les autres vues
+urlpatterns = [
+    path(
+        "check-authentication/",
+        AsyncCheckAuthenticationView.as_view(),
+        name="check_authentication",
+    ),
+    path(
+        "send-code-registration/",
+        AsyncSendCodeForRegistrationView.as_view(),
+        name="send-code-registration",
+    ),
+    path(
+        "send-code-reset-password/",
+        AsyncSendCodeForResetPasswordView.as_view(),
+        name="send-code-reset-password",
+    ),
+    path("verify-code/", AsyncVerifyCodeView.as_view(), name="verify-code"),
+    path(
+        "progress-records/",
+        AsyncProgressRecordsView.as_view(),
+        name="progress-records",
+    ),
+    path("contact/", AsyncContactView.as_view(), name="contact"),
+] + urls.urlpatterns
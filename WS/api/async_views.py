@@ -0,0 +1,286 @@
+"""
+Versions asynchrones des vues dominées par les entrées/sorties, servies sous ASGI
+quand ASYNC_VIEWS est activé (voir api/async_urls.py).
+
+DRF ne gère pas les vues async : ces vues héritent de django.views.View, lisent la
+base avec l'ORM asynchrone et renvoient le même JSON que les vues DRF.
+L'ORM asynchrone exécute encore les requêtes sur un thread dédié : le gain vient
+surtout des E/S hors base (SMTP en envoi direct) qui ne bloquent plus le worker.
+"""
+
+import io
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import NotAuthenticated, ParseError, Throttled
+from rest_framework.throttling import BaseThrottle
+
+from . import records_cache
+from .authentication import CookieJWTAuthentication
+from .conditional import arecords_validators, not_modified, set_validators
+from .fastpath import PROGRESS_RECORD_FIELDS, render_json
+from .models import CustomUser
+from .pagination import InvalidCursor, apaginate_by_keyset
+from .parsers import ORJSONParser
+from .serializers import (
+    ContactFormSerializer,
+    EmailCodeRequestRegistrationSerializer,
+    EmailCodeRequestResetPasswordSerializer,
+    EmailCodeRequestSerializer,
+    EmailCodeVerificationSerializer,
+    ProgressRecordFilterSerializer,
+)
+from .throttling import check_rate_limit
+from .utils import agenerate_and_send_verification_code, asend_contact_email
+from .verification_codes import aget_code
+from .views import ProgressRecordsView
+
+
+def json_response(data, status_code=status.HTTP_200_OK) -> HttpResponse:
+    # Même rendu que le JSONRenderer de DRF (voir fastpath.render_json)
+    return HttpResponse(
+        render_json(data), content_type="application/json", status=status_code
+    )
+
+
+def success_response(data=None, message="Opération réussie", status_code=200):
+    return json_response(
+        {"success": True, "message": message, "data": data}, status_code
+    )
+
+
+def error_response(errors=None, message="Une erreur s'est produite", status_code=400):
+    return json_response(
+        {"success": False, "message": message, "errors": errors}, status_code
+    )
+
+
+def request_data(request) -> dict:
+    """
+    Corps de la requête en JSON ou en formulaire, comme les parsers DRF par défaut.
+    Un JSON invalide, ou qui n'est pas un objet, lève une ParseError rendue en 400
+    comme par l'API DRF (voir AsyncAPIView).
+    """
+    if request.content_type == "application/json":
+        if not request.body:
+            return {}
+        data = ORJSONParser().parse(
+            io.BytesIO(request.body),
+            parser_context={"encoding": request.encoding or settings.DEFAULT_CHARSET},
+        )
+        if not isinstance(data, dict):
+            raise ParseError(
+                "JSON parse error - Expected a JSON object, got %s."
+                % type(data).__name__
+            )
+        return data
+    return request.POST.dict()
+
+
+class AsyncAPIView(View):
+    """
+    Base des vues async : exemptées de CSRF comme les APIView de DRF (authentification
+    par cookie JWT), et limitées par le même seau à jetons que TokenBucketThrottle.
+    """
+
+    throttle_scope = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except ParseError as exc:
+            return json_response({"detail": exc.detail}, exc.status_code)
+
+    async def throttled(self, request, email=None) -> HttpResponse | None:
+        if self.throttle_scope is None:
+            return None
+        # Cache synchrone (get_many/set) : hors de la boucle d'événements
+        wait = await sync_to_async(check_rate_limit)(
+            self.throttle_scope, BaseThrottle().get_ident(request), email
+        )
+        if not wait:
+            return None
+        response = json_response(
+            {"detail": Throttled(wait).detail}, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        response["Retry-After"] = str(math.ceil(wait))
+        return response
+
+
+class AsyncCheckAuthenticationView(AsyncAPIView):
+    async def get(self, request):
+        user = await CookieJWTAuthentication().aauthenticate(request)
+        return json_response({"authenticated": user is not None})
+
+
+class AsyncVerifyCodeView(AsyncAPIView):
+    throttle_scope = "verify_code"
+
+    async def post(self, request):
+        data = request_data(request)
+        response = await self.throttled(request, data.get("email"))
+        if response is not None:
+            return response
+
+        serializer = EmailCodeVerificationSerializer(data=data)
+        if not serializer.is_valid():
+            return json_response(
+                {
+                    "success": False,
+                    "message": "Ce code est invalide.",
+                    "errors": serializer.errors,
+                },
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        entry = await aget_code(serializer.validated_data["email"])
+        if entry is None or entry.code != serializer.validated_data["code"]:
+            message = "Code incorrect"
+        elif entry.is_expired():
+            message = "Code expiré"
+        else:
+            return json_response(
+                {
+                    "success": True,
+                    "message": "Code vérifié avec succès",
+                    "data": {"valid": True},
+                }
+            )
+        return json_response(
+            {"success": False, "message": message, "data": {"valid": False}}
+        )
+
+
+class AsyncSendCodeView(AsyncAPIView):
+    """
+    Envoi d'un code : `user_must_exist` indique si l'adresse doit déjà avoir un compte
+    (réinitialisation) ou au contraire être libre (inscription).
+    """
+
+    throttle_scope = "send_code"
+    user_must_exist = False
+
+    async def post(self, request):
+        data = request_data(request)
+        response = await self.throttled(request, data.get("email"))
+        if response is not None:
+            return response
+
+        serializer = EmailCodeRequestSerializer(data=data)
+        errors = None
+        if not serializer.is_valid():
+            errors = serializer.errors
+        else:
+            email = serializer.validated_data["email"]
+            exists = await CustomUser.objects.filter(email=email).aexists()
+            if exists and not self.user_must_exist:
+                errors = {"email": [EmailCodeRequestRegistrationSerializer.EMAIL_TAKEN]}
+            elif not exists and self.user_must_exist:
+                errors = {
+                    "email": [EmailCodeRequestResetPasswordSerializer.EMAIL_UNKNOWN]
+                }
+        if errors is not None:
+            return error_response(errors=errors, message="Échec de l'envoi du code")
+
+        await agenerate_and_send_verification_code(email)
+        return success_response(message="Code envoyé avec succès.")
+
+
+class AsyncSendCodeForRegistrationView(AsyncSendCodeView):
+    user_must_exist = False
+
+
+class AsyncSendCodeForResetPasswordView(AsyncSendCodeView):
+    user_must_exist = True
+
+
+class AsyncContactView(AsyncAPIView):
+    throttle_scope = "contact"
+
+    async def post(self, request):
+        response = await self.throttled(request)
+        if response is not None:
+            return response
+
+        serializer = ContactFormSerializer(data=request_data(request))
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+        await asend_contact_email(serializer.validated_data)
+        return json_response({"detail": "Message reçu avec succès."})
+
+
+class AsyncProgressRecordsView(AsyncAPIView):
+    """
+    Lecture asynchrone de la liste des enregistrements (JSON compact, même cache et
+    mêmes validateurs que ProgressRecordsView). Les autres rendus (API navigable,
+    JSON indenté) sont délégués à la vue DRF.
+    """
+
+    sync_view = staticmethod(sync_to_async(ProgressRecordsView.as_view()))
+
+    async def get(self, request):
+        accept = request.headers.get("Accept", "")
+        if "text/html" in accept or "indent" in accept:
+            return await self.sync_view(request)
+
+        user = await CookieJWTAuthentication().aauthenticate(request)
+        if user is None:
+            response = json_response(
+                {"detail": NotAuthenticated().detail}, status.HTTP_401_UNAUTHORIZED
+            )
+            response["WWW-Authenticate"] = 'Bearer realm="api"'
+            return response
+
+        params = request.GET
+        filters = ProgressRecordFilterSerializer(
+            data={
+                key: params[param]
+                for param, key in ProgressRecordsView.QUERY_PARAMS.items()
+                if param in params
+            }
+        )
+        if not filters.is_valid():
+            return json_response(filters.errors, status.HTTP_400_BAD_REQUEST)
+        data = filters.validated_data
+
+        etag, last_modified = await arecords_validators(user)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return set_validators(response, etag, last_modified)
+
+        key = records_cache.cache_key(etag, params)
+        content = await records_cache.aget_listing(key)
+        cache_status = "HIT"
+        if content is None:
+            cache_status = "MISS"
+            records = ProgressRecordsView.filter_records(user, data).values(
+                *PROGRESS_RECORD_FIELDS
+            )
+            if "cursor" in params or "limit" in params:
+                try:
+                    page, next_cursor = await apaginate_by_keyset(
+                        records, data.get("cursor"), data["limit"]
+                    )
+                except InvalidCursor as exc:
+                    return json_response(
+                        {"cursor": [str(exc)]}, status.HTTP_400_BAD_REQUEST
+                    )
+                body = {"results": page, "next_cursor": next_cursor}
+            else:
+                body = [row async for row in records.order_by("-date", "-id")]
+            content = render_json(body)
+            await records_cache.aset_listing(key, content)
+
+        response = HttpResponse(content, content_type="application/json")
+        response["X-Cache"] = cache_status
+        return set_validators(response, etag, last_modified)
@@ -1,9 +1,142 @@
+import datetime
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import CustomUser
+
+# Champs de l'utilisateur recopiés dans les claims signés du token
+USER_CLAIMS = ["email", "first_name", "last_name", "gender", "birth_date", "is_active"]
+
+# Date (timestamp) avant laquelle les tokens d'un utilisateur sont refusés, dans le
+# cache partagé entre les workers
+REVOKED_KEY = "auth:revoked:{}"
+
+
+def add_user_claims(token, user):
+    """
+    Ajoute au token les champs de l'utilisateur utilisés par les vues.
+    """
+    for claim in USER_CLAIMS:
+        value = getattr(user, claim)
+        if isinstance(value, datetime.date):
+            value = value.isoformat()
+        token[claim] = value
+    return token
+
+
+def user_from_claims(token) -> CustomUser | None:
+    """
+    Construit l'utilisateur à partir des claims du token, sans requête.
+    Retourne None pour un token émis sans ces claims.
+    Cette instance n'est pas complète (pas de mot de passe) : elle ne doit jamais
+    être sauvegardée telle quelle.
+    """
+    if any(claim not in token for claim in USER_CLAIMS):
+        return None
+    birth_date = token["birth_date"]
+    return CustomUser(
+        pk=token[api_settings.USER_ID_CLAIM],
+        email=token["email"],
+        username=token["email"],
+        first_name=token["first_name"],
+        last_name=token["last_name"],
+        gender=token["gender"],
+        birth_date=datetime.date.fromisoformat(birth_date) if birth_date else None,
+        is_active=token["is_active"],
+    )
+
+
+def revoke_user_tokens(user_id):
+    """
+    Refuse dans tous les workers les tokens émis jusqu'ici pour cet utilisateur
+    (compte supprimé ou désactivé) : ses claims ne font plus foi.
+    Le marqueur vit aussi longtemps que le plus ancien token encore valide.
+    """
+    lifetime = api_settings.REFRESH_TOKEN_LIFETIME + api_settings.ACCESS_TOKEN_LIFETIME
+    cache.set(
+        REVOKED_KEY.format(user_id),
+        int(time.time()),
+        timeout=int(lifetime.total_seconds()),
+    )
+    user_cache.invalidate(user_id)
+
+
+def is_revoked(validated_token, revoked_at) -> bool:
+    # "iat" est recopié du refresh token dans les access tokens qui en dérivent
+    return revoked_at is not None and validated_token.get("iat", 0) <= revoked_at
+
+
+def revoke_deleted_user(sender, instance, **kwargs):
+    """
+    Receiver post_delete de CustomUser (connecté dans ApiConfig.ready).
+    """
+    revoke_user_tokens(instance.pk)
+
+
+def revoke_inactive_user(sender, instance, created, **kwargs):
+    """
+    Receiver post_save de CustomUser (connecté dans ApiConfig.ready).
+    """
+    if not created and not instance.is_active:
+        revoke_user_tokens(instance.pk)
+
+
+class UserCache:
+    """
+    Cache LRU borné, avec durée de vie, des utilisateurs authentifiés du processus.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._entries[user_id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL)
 
 
 class CookieJWTAuthentication(JWTAuthentication):
     """
     Lit le token JWT depuis les cookies.
+    Avec AUTH_USER_CACHE, l'utilisateur est servi par le cache du processus ou
+    reconstruit depuis les claims du token : aucune requête en base, seulement une
+    lecture du marqueur de révocation dans le cache partagé.
     """
 
     def authenticate(self, request):
@@ -14,6 +147,57 @@ class CookieJWTAuthentication(JWTAuthentication):
         try:
             validated_token = self.get_validated_token(access_token)
 
-            return self.get_user(validated_token), validated_token
+            if not settings.AUTH_USER_CACHE:
+                return self.get_user(validated_token), validated_token
+            return self.get_cached_user(validated_token), validated_token
+        except Exception:
+            return None
+
+    def get_cached_user(self, validated_token):
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if is_revoked(validated_token, cache.get(REVOKED_KEY.format(user_id))):
+            raise AuthenticationFailed("Token révoqué")
+        user = user_cache.get(user_id)
+        if user is None:
+            user = user_from_claims(validated_token) or self.get_user(validated_token)
+            user_cache.set(user_id, user)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("Utilisateur inactif")
+        return user
+
+    async def aauthenticate(self, request):
+        """
+        Équivalent asynchrone de authenticate() pour les vues async : retourne
+        l'utilisateur ou None. La lecture en base passe par l'ORM asynchrone.
+        """
+        access_token = request.COOKIES.get("access_token")
+        if access_token is None:
+            return None
+        try:
+            validated_token = self.get_validated_token(access_token)
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+            user = None
+            if settings.AUTH_USER_CACHE:
+                revoked_at = await cache.aget(REVOKED_KEY.format(user_id))
+                if is_revoked(validated_token, revoked_at):
+                    return None
+                user = user_cache.get(user_id) or user_from_claims(validated_token)
+            if user is None:
+                user = await CustomUser.objects.aget(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
         except Exception:
             return None
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            return None
+        # Instance issue des claims : pas de mot de passe à comparer
+        if (
+            api_settings.CHECK_REVOKE_TOKEN
+            and user.password
+            and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+            != get_md5_hash_password(user.password)
+        ):
+            return None
+        if settings.AUTH_USER_CACHE:
+            user_cache.set(user_id, user)
+        return user
@@ -0,0 +1,92 @@
+"""
+Préparation d'un processus serveur avant qu'il n'accepte du trafic (voir
+next_shape_ws/gunicorn.conf.py).
+
+warm_up() charge ce que la première requête de chaque worker chargerait sinon ;
+freeze_heap() gèle les objets survivants pour qu'ils restent partagés après le fork.
+"""
+
+import gc
+import inspect
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from django.utils import translation
+from rest_framework import serializers as drf_serializers
+from rest_framework.settings import api_settings
+
+
+def _load_urls():
+    # Importe toutes les vues (et leurs dépendances) et construit l'index de reverse()
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+
+
+def _load_serializers():
+    from . import serializers
+
+    for _, serializer_class in inspect.getmembers(serializers, inspect.isclass):
+        if (
+            issubclass(serializer_class, drf_serializers.BaseSerializer)
+            and serializer_class.__module__ == serializers.__name__
+        ):
+            # Champs des ModelSerializer et validateurs construits à la demande
+            serializer_class().fields
+
+
+def _load_jwt():
+    from rest_framework_simplejwt.state import token_backend
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    token = AccessToken()
+    token["user_id"] = 0
+    token_backend.decode(str(token))
+
+
+def _load_drf():
+    for name in (
+        "DEFAULT_RENDERER_CLASSES",
+        "DEFAULT_PARSER_CLASSES",
+        "DEFAULT_AUTHENTICATION_CLASSES",
+        "DEFAULT_PERMISSION_CLASSES",
+    ):
+        getattr(api_settings, name)
+    # Catalogues de traduction des messages d'erreur (chargés à la première requête)
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext("This field is required.")
+
+
+STEPS = {
+    "urls": _load_urls,
+    "serializers": _load_serializers,
+    "jwt": _load_jwt,
+    "drf": _load_drf,
+}
+
+
+def warm_up() -> dict:
+    """
+    Exécute chaque étape de préchauffage et renvoie sa durée en secondes.
+    Aucune connexion à la base ne doit survivre : elle serait partagée par le fork.
+    """
+    timings = {}
+    for name, step in STEPS.items():
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+    connections.close_all()
+    return timings
+
+
+def freeze_heap() -> int:
+    """
+    Collecte puis déplace les objets survivants dans la génération permanente : le GC
+    ne les parcourt plus, n'écrit donc plus dans leurs en-têtes, et les pages héritées
+    du master restent partagées (copie sur écriture). Renvoie le nombre d'objets gelés.
+    """
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
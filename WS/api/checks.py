@@ -0,0 +1,68 @@
+"""
+Vérifications au démarrage (manage.py check, migrate, runserver) de la configuration
+de production : cache partagé entre les workers, accès aux métriques.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Caches propres à chaque processus : rien n'y est vu par les autres workers
+LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def cache_is_shared(alias: str = "default") -> bool:
+    return settings.CACHES[alias]["BACKEND"] not in LOCAL_CACHE_BACKENDS
+
+
+@register(Tags.security)
+def check_metrics_token(app_configs, **kwargs):
+    if settings.DEBUG or not settings.METRICS_ENABLED or settings.METRICS_TOKEN:
+        return []
+    return [
+        Warning(
+            "METRICS_TOKEN is not set: /metrics answers 404 outside DEBUG.",
+            hint="Set METRICS_TOKEN and configure Prometheus with it as a bearer "
+            "token.",
+            id="api.W002",
+        )
+    ]
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # En DEBUG, runserver ne lance qu'un processus
+    if settings.DEBUG or cache_is_shared():
+        return []
+    errors = []
+    if settings.AUTH_USER_CACHE:
+        errors.append(
+            Error(
+                "AUTH_USER_CACHE requires a shared cache backend.",
+                hint="Token revocations (deleted or deactivated users) are stored "
+                "in the default cache; set CACHE_BACKEND to Redis or Memcached.",
+                id="api.E001",
+            )
+        )
+    if settings.VERIFICATION_CODE_STORE == "cache":
+        errors.append(
+            Error(
+                'VERIFICATION_CODE_STORE="cache" requires a shared cache backend.',
+                hint="A code stored by one worker must be readable by the others; "
+                'set CACHE_BACKEND to Redis or Memcached or use VERIFICATION_CODE_STORE="db".',
+                id="api.E002",
+            )
+        )
+    if settings.RATE_LIMIT_ENABLED:
+        errors.append(
+            Warning(
+                "Rate limit buckets are kept per worker process.",
+                hint="Each worker applies RATE_LIMITS on its own, so the effective "
+                "limit is multiplied by the number of workers; set CACHE_BACKEND to "
+                "Redis or Memcached.",
+                id="api.W001",
+            )
+        )
+    return errors
@@ -0,0 +1,53 @@
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import CustomUser
+
+
+def records_validators(user) -> tuple[str, int | None]:
+    """
+    ETag et date de dernière modification des enregistrements d'un utilisateur.
+    Une seule lecture par clé primaire, sans charger ni sérialiser les enregistrements.
+    """
+    revision, modified_at = (
+        CustomUser.objects.filter(pk=user.pk)
+        .values_list("records_revision", "records_modified_at")
+        .get()
+    )
+    return _validators(user.pk, revision, modified_at)
+
+
+async def arecords_validators(user) -> tuple[str, int | None]:
+    revision, modified_at = await (
+        CustomUser.objects.filter(pk=user.pk)
+        .values_list("records_revision", "records_modified_at")
+        .aget()
+    )
+    return _validators(user.pk, revision, modified_at)
+
+
+def _validators(user_id, revision, modified_at) -> tuple[str, int | None]:
+    etag = quote_etag(f"{user_id}-{revision}")
+    last_modified = int(modified_at.timestamp()) if modified_at else None
+    return etag, last_modified
+
+
+def not_modified(request, etag: str, last_modified: int | None):
+    """
+    Retourne une réponse 304 si les en-têtes If-None-Match/If-Modified-Since
+    correspondent encore, sinon None.
+    """
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag: str, last_modified: int | None):
+    """
+    Ajoute ETag/Last-Modified à la réponse. Le contenu dépend de l'utilisateur
+    (cookie JWT), il ne doit donc être mis en cache que par le navigateur.
+    """
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ["Cookie"])
+    return response
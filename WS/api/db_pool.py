@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import connections
+
+
+def summarize_pool_stats(raw: dict) -> dict:
+    """
+    Met en forme les statistiques de psycopg_pool (ConnectionPool.get_stats()).
+    Les compteurs de psycopg_pool sont absents tant qu'ils valent 0.
+    """
+    max_size = raw.get("pool_max", 0)
+    size = raw.get("pool_size", 0)
+    in_use = size - raw.get("pool_available", 0)
+    checkouts = raw.get("requests_num", 0)
+    wait_ms = raw.get("requests_wait_ms", 0)
+    return {
+        "min_size": raw.get("pool_min", 0),
+        "max_size": max_size,
+        "size": size,
+        "in_use": in_use,
+        "utilization": round(in_use / max_size, 3) if max_size else 0.0,
+        "requests_waiting": raw.get("requests_waiting", 0),
+        "checkouts": checkouts,
+        "checkout_wait_ms_total": wait_ms,
+        "checkout_wait_ms_avg": round(wait_ms / checkouts, 3) if checkouts else 0.0,
+        "checkout_timeouts": raw.get("requests_errors", 0),
+        "connections_opened": raw.get("connections_num", 0),
+        "connections_lost": raw.get("connections_lost", 0),
+    }
+
+
+def pool_stats(alias: str = "default") -> dict:
+    """
+    État des connexions du processus courant (chaque worker a son propre pool).
+    """
+    connection = connections[alias]
+    stats = {"mode": settings.DB_POOL}
+    if settings.DB_POOL == "persistent":
+        stats["conn_max_age"] = connection.settings_dict["CONN_MAX_AGE"]
+        stats["connected"] = connection.connection is not None
+    elif settings.DB_POOL == "psycopg":
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            stats.update(summarize_pool_stats(pool.get_stats()))
+    return stats
@@ -0,0 +1,99 @@
+import csv
+import json
+import zlib
+
+from django.db.models import QuerySet
+
+EXPORT_FIELDS = [
+    "id",
+    "date",
+    "weight_kg",
+    "height_cm",
+    "activity_level",
+    "imc",
+    "bmr",
+    "tdee",
+    "calories_recommandees",
+    "goal",
+    "created_at",
+    "modified_at",
+]
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+ITERATOR_CHUNK_SIZE = 2000
+# Taille visée des morceaux envoyés au client (évite un write par ligne)
+BUFFER_SIZE = 64 * 1024
+
+
+class _Echo:
+    """
+    Pseudo-fichier pour csv.writer : write() renvoie la ligne au lieu de la stocker.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _iter_rows(queryset: QuerySet):
+    return (
+        queryset.order_by("-date", "-id")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+
+
+def _iter_csv(queryset: QuerySet):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in _iter_rows(queryset):
+        yield writer.writerow(
+            [
+                value.isoformat() if hasattr(value, "isoformat") else value
+                for value in row
+            ]
+        )
+
+
+def _iter_ndjson(queryset: QuerySet):
+    for row in _iter_rows(queryset):
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str) + "\n"
+
+
+def _buffered(lines):
+    """
+    Regroupe les lignes en morceaux d'environ BUFFER_SIZE octets.
+    """
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 : en-tête et pied gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(queryset: QuerySet, file_format: str, gzip: bool = False):
+    """
+    Génère l'export d'un historique par morceaux d'octets.
+    Les lignes sont lues avec QuerySet.iterator() et écrites au fil de l'eau :
+    la mémoire utilisée ne dépend pas du nombre d'enregistrements.
+    """
+    lines = _iter_csv(queryset) if file_format == "csv" else _iter_ndjson(queryset)
+    chunks = _buffered(lines)
+    return _gzipped(chunks) if gzip else chunks
@@ -0,0 +1,25 @@
+from . import renderers
+from .serializers import ProgressRecordSerializer
+
+PROGRESS_RECORD_FIELDS = ProgressRecordSerializer.Meta.fields
+
+
+def render_json(data) -> bytes:
+    """
+    Rendu JSON compact d'ORJSONRenderer, sans passer par la négociation de DRF.
+    """
+    return renderers.dumps(data)
+
+
+def accepts_fast_json(request) -> bool:
+    """
+    Le chemin rapide ne sert que le JSON compact : l'API navigable ou un
+    `Accept: application/json; indent=4` passent par le rendu DRF habituel.
+    """
+    renderer = getattr(request, "accepted_renderer", None)
+    media_type = getattr(request, "accepted_media_type", "") or ""
+    return (
+        renderer is not None
+        and renderer.format == "json"
+        and "indent" not in media_type
+    )
@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, make_password
+from django.contrib.auth.hashers import verify_password as _verify_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .metrics import timed_section
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 avec des paramètres réglables dans les settings.
+    Garde l'algorithme "argon2" : les hash existants restent vérifiables et sont
+    recalculés à la connexion si les paramètres changent.
+    """
+
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
+
+
+class HashingUnavailable(APIException):
+    """
+    Levée quand la file de hachage est pleine ou que l'attente dépasse le délai.
+    Rendue par DRF en 503 avec un en-tête Retry-After.
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Service momentanément surchargé, veuillez réessayer."
+    default_code = "hashing_unavailable"
+    wait = 1
+
+
+def _timed(func, enqueued_at, *args):
+    """
+    Exécute `func` dans le pool et renvoie aussi le temps passé dans la file.
+    """
+    started_at = time.monotonic()
+    return started_at - enqueued_at, func(*args)
+
+
+class HashingExecutor:
+    """
+    Pool partagé pour le hachage des mots de passe, à concurrence bornée.
+    Au-delà de `max_pending` tâches en attente ou en cours, les demandes sont refusées
+    immédiatement. Une tâche qui n'a pas démarré après `queue_timeout` secondes est
+    annulée. Dans les deux cas HashingUnavailable est levée.
+    """
+
+    def __init__(
+        self, workers: int, max_pending: int, queue_timeout: float, kind="thread"
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.kind = kind
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            "completed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "queue_wait_seconds": 0.0,
+        }
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=django.setup
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="hashing"
+                )
+        return self._pool
+
+    def submit(self, func, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise HashingUnavailable()
+            self._pending += 1
+        future = self._get_pool().submit(_timed, func, time.monotonic(), *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._stats["completed"] += 1
+            self._stats["queue_wait_seconds"] += future.result()[0]
+
+    def _timeout(self, future: Future):
+        # Une tâche déjà démarrée ne peut plus être annulée : on attend son résultat
+        if future.cancel():
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise HashingUnavailable()
+
+    def run(self, func, *args):
+        """
+        Exécute `func(*args)` dans le pool et attend le résultat (vues synchrones).
+        """
+        with timed_section("password_hashing"):
+            future = self.submit(func, *args)
+            try:
+                return future.result(timeout=self.queue_timeout)[1]
+            except TimeoutError:
+                self._timeout(future)
+                return future.result()[1]
+
+    async def arun(self, func, *args):
+        """
+        Équivalent de run() pour les vues asynchrones : n'occupe pas la boucle.
+        """
+        with timed_section("password_hashing"):
+            future = self.submit(func, *args)
+            wrapped = asyncio.wrap_future(future)
+            try:
+                return (
+                    await asyncio.wait_for(asyncio.shield(wrapped), self.queue_timeout)
+                )[1]
+            except asyncio.TimeoutError:
+                self._timeout(future)
+                return (await wrapped)[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+            stats = dict(self._stats)
+        stats["in_flight"] = pending
+        stats["queue_depth"] = max(pending - self.workers, 0)
+        stats["workers"] = self.workers
+        return stats
+
+
+executor = HashingExecutor(
+    workers=settings.PASSWORD_HASHING_WORKERS,
+    max_pending=settings.PASSWORD_HASHING_MAX_PENDING,
+    queue_timeout=settings.PASSWORD_HASHING_QUEUE_TIMEOUT,
+    kind=settings.PASSWORD_HASHING_POOL,
+)
+
+
+def hash_password(raw_password: str) -> str:
+    """
+    Calcule le hash d'un mot de passe dans le pool de hachage.
+    """
+    return executor.run(make_password, raw_password)
+
+
+def check_user_password(user, raw_password: str) -> bool:
+    """
+    Vérifie le mot de passe dans le pool de hachage.
+    Si le hash utilise un ancien algorithme ou d'anciens paramètres, il est recalculé
+    avec le hasher par défaut et enregistré (comme AbstractBaseUser.check_password).
+    """
+    is_correct, must_update = executor.run(
+        _verify_password, raw_password, user.password
+    )
+    if is_correct and must_update:
+        user.password = hash_password(raw_password)
+        user.save(update_fields=["password"])
+    return is_correct
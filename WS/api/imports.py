@@ -0,0 +1,205 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+
+from .models import CustomUser, ProgressRecord
+from .rollups import rebuild_rollups
+from .serializers import ProgressRecordImportRowSerializer
+from .utils import calculs_calories_batch, get_age
+
+DEFAULT_CHUNK_SIZE = 500
+# On ne garde qu'un nombre borné d'erreurs détaillées pour que la mémoire reste stable
+MAX_REPORTED_ERRORS = 1000
+DATE_TAKEN = "Un enregistrement existe déjà pour cette date."
+
+
+class ImportFileError(ValueError):
+    """
+    Levée lorsque le fichier ne peut pas être lu (en-tête absent, encodage...).
+    """
+
+
+def iter_rows(stream, file_format: str):
+    """
+    Parcourt le fichier ligne par ligne sans le charger en mémoire.
+    Produit des tuples (numéro de ligne, données brutes ou None, erreur ou None).
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if file_format == "csv":
+            reader = csv.DictReader(text)
+            if reader.fieldnames is None:
+                raise ImportFileError("Le fichier CSV est vide.")
+            for row in reader:
+                yield reader.line_num, row, None
+            return
+
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_number, None, {"non_field_errors": [str(exc)]}
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, {
+                    "non_field_errors": ["Chaque ligne doit être un objet JSON."]
+                }
+                continue
+            yield line_number, row, None
+    except UnicodeDecodeError as exc:
+        raise ImportFileError("Le fichier doit être encodé en UTF-8.") from exc
+    finally:
+        # Évite que la fermeture du wrapper ne ferme le fichier d'origine
+        text.detach()
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class ImportReport:
+    """
+    Compte rendu d'un import : nombre de lignes créées et erreurs par ligne.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.error_count = 0
+        self.errors: list[dict] = []
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+
+
+def _import_chunk(user, chunk, report: ImportReport):
+    valid = []
+    for line, row, error in chunk:
+        if error is not None:
+            report.add_error(line, error)
+            continue
+        # Une cellule CSV vide équivaut à une valeur absente (valeur par défaut)
+        row = {key: value for key, value in row.items() if key and value != ""}
+        serializer = ProgressRecordImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            report.add_error(line, serializer.errors)
+            continue
+        valid.append((line, serializer.validated_data))
+
+    if not valid:
+        return
+
+    # Une seule requête par bloc pour détecter les dates déjà enregistrées
+    dates = [data["date"] for _, data in valid]
+    taken = set(
+        ProgressRecord.objects.filter(
+            user=user, date__gte=min(dates), date__lte=max(dates)
+        ).values_list("date", flat=True)
+    )
+
+    rows = []
+    for line, data in valid:
+        if data["date"] in taken:
+            report.add_error(line, {"date": [DATE_TAKEN]})
+            continue
+        taken.add(data["date"])
+        rows.append((line, data))
+
+    if not rows:
+        return
+
+    # Calcul des métriques du bloc entier en une passe vectorisée
+    results = calculs_calories_batch(
+        [data["weight_kg"] for _, data in rows],
+        [data["height_cm"] for _, data in rows],
+        # Âge actuel, comme la modification d'un enregistrement et recompute_metrics
+        [get_age(user.birth_date)] * len(rows),
+        [user.gender] * len(rows),
+        [data["activity_level"] for _, data in rows],
+        [data["goal"] for _, data in rows],
+    )
+    records = [
+        (
+            line,
+            ProgressRecord(
+                user=user,
+                date=data["date"],
+                weight_kg=data["weight_kg"],
+                height_cm=data["height_cm"],
+                activity_level=data["activity_level"],
+                goal=data["goal"],
+                imc=float(results["imc"][index]),
+                bmr=float(results["bmr"][index]),
+                tdee=float(results["tdee"][index]),
+                calories_recommandees=float(results["calories_recommandees"][index]),
+            ),
+        )
+        for index, (line, data) in enumerate(rows)
+    ]
+
+    try:
+        with transaction.atomic():
+            ProgressRecord.objects.bulk_create([record for _, record in records])
+        report.created += len(records)
+    except IntegrityError:
+        # Date enregistrée entre-temps par une autre requête : on reprend le bloc
+        # ligne par ligne pour ne rejeter que les lignes en conflit
+        for line, record in records:
+            try:
+                with transaction.atomic():
+                    record.save(force_insert=True)
+            except IntegrityError:
+                report.add_error(line, {"date": [DATE_TAKEN]})
+            else:
+                report.created += 1
+
+
+def import_progress_records(
+    user, stream, file_format: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> dict:
+    """
+    Importe un historique CSV ou JSONL par blocs de `chunk_size` lignes.
+    Chaque bloc est validé puis inséré avec bulk_create dans sa propre transaction,
+    la mémoire utilisée ne dépend donc que de la taille des blocs.
+    Lève ImportFileError si le fichier est illisible avant la première insertion ;
+    après, l'erreur figure dans le compte rendu (ligne None).
+    """
+    if user.birth_date is None:
+        raise ImportFileError(
+            "La date de naissance est nécessaire pour calculer les besoins caloriques."
+        )
+
+    report = ImportReport()
+    try:
+        for chunk in _chunks(iter_rows(stream, file_format), chunk_size):
+            _import_chunk(user, chunk, report)
+    except ImportFileError as exc:
+        # Fichier illisible avant toute insertion : rien n'a été écrit, simple refus
+        if not report.created:
+            raise
+        # Des blocs sont déjà enregistrés : le compte rendu indique combien, avec
+        # une erreur sur le fichier, pour que le client ne renvoie pas ces lignes
+        report.add_error(None, {"file": [str(exc)]})
+    finally:
+        # Même si la lecture échoue en cours de fichier, les blocs déjà insérés
+        # doivent apparaître dans les agrégats et invalider le cache des listes
+        if report.created:
+            rebuild_rollups(user)
+            CustomUser.touch_records(user.pk)
+    return report.as_dict()
@@ -0,0 +1,47 @@
+import json
+
+from api.imports import DEFAULT_CHUNK_SIZE, ImportFileError, import_progress_records
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Import a user's progress history from a CSV or JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", help="Email of the user owning the records")
+        parser.add_argument("path", help="Path to the CSV or JSONL file")
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=["csv", "jsonl"],
+            help="File format (guessed from the extension by default)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options["email"]).first()
+        if user is None:
+            raise CommandError(f"Unknown user: {options['email']}")
+
+        path = options["path"]
+        file_format = options["file_format"] or (
+            "csv" if path.lower().endswith(".csv") else "jsonl"
+        )
+        try:
+            with open(path, "rb") as stream:
+                report = import_progress_records(
+                    user, stream, file_format, chunk_size=options["chunk_size"]
+                )
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for error in report["errors"]:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{report['created']} records imported, {report['error_count']} errors."
+            )
+        )
@@ -0,0 +1,10 @@
+from api.verification_codes import purge_expired_codes
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Delete the email verification codes older than VERIFICATION_CODE_TTL"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_codes()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} expired code(s) deleted."))
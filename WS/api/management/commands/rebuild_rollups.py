@@ -0,0 +1,36 @@
+from api.rollups import find_rollup_drift, rebuild_rollups
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user weekly/monthly rollups or check them for drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Email of a single user to process")
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only compare stored rollups with the records, do not rewrite them",
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            user = User.objects.filter(email=options["user"]).first()
+            if user is None:
+                raise CommandError(f"Unknown user: {options['user']}")
+
+        if options["check"]:
+            drift = find_rollup_drift(user)
+            for line in drift:
+                self.stdout.write(line)
+            if drift:
+                raise CommandError(f"{len(drift)} rollup(s) out of sync.")
+            self.stdout.write(self.style.SUCCESS("Rollups are in sync."))
+            return
+
+        count = rebuild_rollups(user)
+        self.stdout.write(self.style.SUCCESS(f"{count} rollups rebuilt."))
@@ -0,0 +1,79 @@
+import os
+from pathlib import Path
+
+from api.recompute import DEFAULT_CHUNK_SIZE, recompute_metrics
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+DEFAULT_CHECKPOINT = "recompute_metrics.checkpoint.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute imc/bmr/tdee/calories of every progress record with the rule used "
+        "when a record is edited: the user's profile gender and current age. Records "
+        "saved by calculate-calories with another age or gender than the profile's "
+        "are reported as changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes (1 computes in the current process)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many records would change",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=Path,
+            default=None,
+            help="File used to resume an interrupted run "
+            f"(default: BASE_DIR/{DEFAULT_CHECKPOINT})",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and start from the first record",
+        )
+
+    def handle(self, *args, **options):
+        # Indépendant du répertoire courant : une reprise retrouve toujours le fichier
+        checkpoint = (
+            options["checkpoint"] or Path(settings.BASE_DIR) / DEFAULT_CHECKPOINT
+        )
+        if options["restart"] and checkpoint.exists():
+            checkpoint.unlink()
+        elif checkpoint.exists() and not options["dry_run"]:
+            self.stdout.write(f"Resuming from checkpoint {checkpoint}")
+        self.stdout.write(
+            "Rule: profile gender and current age (same as editing a record); "
+            "ages sent to calculate-calories are not kept."
+        )
+
+        def progress(state):
+            self.stdout.write(
+                f"id <= {state['last_id']}: {state['scanned']} scanned, "
+                f"{state['changed']} changed"
+            )
+
+        state = recompute_metrics(
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+            dry_run=options["dry_run"],
+            checkpoint_path=checkpoint,
+            progress=progress if options["verbosity"] > 1 else None,
+        )
+
+        verb = "would change" if options["dry_run"] else "updated"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{state['scanned']} records scanned, {state['changed']} {verb}, "
+                f"{state['skipped']} skipped (no birth date)."
+            )
+        )
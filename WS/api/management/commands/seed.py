@@ -2,20 +2,13 @@ import random
 from datetime import datetime, timedelta
 
 from api.models import ProgressRecord
-from api.utils import calculs_calories
+from api.rollups import rebuild_rollups
+from api.utils import ACTIVITY_FACTORS, calculs_calories
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 
 User = get_user_model()
 
-ACTIVITY_FACTORS = {
-    "sedentaire": 1.2,
-    "leger": 1.375,
-    "modere": 1.55,
-    "intense": 1.725,
-    "tres_intense": 1.9,
-}
-
 
 class Command(BaseCommand):
     help = "Seed database with fake users and progress records"
@@ -65,4 +58,6 @@ class Command(BaseCommand):
                 calories_recommandees=result["calories_recommandees"],
                 goal=goal,
             )
+        rebuild_rollups(user)
+        User.touch_records(user.pk)
         self.stdout.write(self.style.SUCCESS("60 progress records added."))
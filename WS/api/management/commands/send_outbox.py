@@ -0,0 +1,70 @@
+import signal
+import time
+
+from api.outbox import PURGE_INTERVAL, SMTPConnection, drain_batch, purge_sent
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Send the queued emails of the outbox over a reused SMTP connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the emails currently due, then exit",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.EMAIL_OUTBOX_POLL_INTERVAL,
+            help="Seconds to wait when the outbox is empty",
+        )
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        connection = SMTPConnection()
+        totals = {"sent": 0, "retried": 0, "failed": 0, "purged": 0}
+        next_purge = 0.0
+        try:
+            while self.running:
+                counts = drain_batch(connection, options["batch_size"])
+                for key, value in counts.items():
+                    totals[key] += value
+                if any(counts.values()):
+                    self.stdout.write(
+                        f"sent={counts['sent']} retried={counts['retried']} "
+                        f"failed={counts['failed']}"
+                    )
+                    continue
+                if time.monotonic() >= next_purge:
+                    purged = purge_sent()
+                    totals["purged"] += purged
+                    if purged:
+                        self.stdout.write(f"purged={purged}")
+                    next_purge = time.monotonic() + PURGE_INTERVAL
+                if options["once"]:
+                    break
+                connection.close_if_idle()
+                time.sleep(options["interval"])
+        finally:
+            connection.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Outbox worker stopped: {totals['sent']} sent, "
+                f"{totals['retried']} retried, {totals['failed']} failed, "
+                f"{totals['purged']} purged, "
+                f"{connection.opened} SMTP connection(s) opened."
+            )
+        )
+
+    def stop(self, *args):
+        self.running = False
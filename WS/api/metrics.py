@@ -0,0 +1,483 @@
+"""
+Métriques par route (latence, requêtes SQL, taille des réponses, statuts) et temps
+passé dans les sections coûteuses (envoi d'email, hachage), au format Prometheus.
+
+Les compteurs sont en mémoire, par processus. Avec METRICS_DIR (défini par
+next_shape_ws/gunicorn.conf.py), chaque worker y écrit régulièrement un instantané
+<pid>.json et /metrics additionne ceux de tous les workers, y compris des workers
+terminés : les compteurs restent monotones quel que soit le worker interrogé.
+"""
+
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """
+    Mesures de la requête en cours, partagées avec les threads de sync_to_async
+    (asgiref recopie le contexte).
+    """
+
+    __slots__ = ("queries", "query_seconds", "sections")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.sections: dict[str, float] = {}
+
+
+_current: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar(
+    "request_stats", default=None
+)
+
+
+class Registry:
+    # Compteurs scalaires, puis listes additionnées élément par élément
+    COUNTERS = ("requests", "queries", "query_seconds", "response_bytes")
+    LISTS = ("latency", "sections")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests: dict[tuple, int] = {}
+            # (route, méthode) -> [compteurs par bucket..., +Inf, somme]
+            self.latency: dict[tuple, list] = {}
+            self.queries: dict[tuple, int] = {}
+            self.query_seconds: dict[tuple, float] = {}
+            self.response_bytes: dict[tuple, int] = {}
+            self.sections: dict[tuple, list] = {}
+
+    def observe_request(
+        self, route, method, status, seconds, stats: RequestStats, size
+    ):
+        key = (route, method)
+        with self._lock:
+            status_key = (route, method, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    break
+            else:
+                index = len(LATENCY_BUCKETS)
+            histogram[index] += 1
+            histogram[-1] += seconds
+            self.queries[key] = self.queries.get(key, 0) + stats.queries
+            self.query_seconds[key] = (
+                self.query_seconds.get(key, 0.0) + stats.query_seconds
+            )
+            if size is not None:
+                self.response_bytes[key] = self.response_bytes.get(key, 0) + size
+            for section, spent in stats.sections.items():
+                self._observe_section(route, section, spent)
+
+    def observe_section(self, route, section, seconds):
+        with self._lock:
+            self._observe_section(route, section, seconds)
+
+    def _observe_section(self, route, section, seconds):
+        entry = self.sections.setdefault((route, section), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def snapshot(self) -> dict:
+        """
+        Copie sérialisable en JSON (les clés tuple deviennent des listes).
+        """
+        with self._lock:
+            return {
+                name: [
+                    [list(key), list(value) if name in self.LISTS else value]
+                    for key, value in getattr(self, name).items()
+                ]
+                for name in self.COUNTERS + self.LISTS
+            }
+
+    def merge(self, snapshot: dict):
+        with self._lock:
+            for name in self.COUNTERS + self.LISTS:
+                target = getattr(self, name)
+                for key, value in snapshot.get(name, []):
+                    key = tuple(key)
+                    current = target.get(key)
+                    if current is None:
+                        target[key] = value
+                    elif name in self.LISTS:
+                        target[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = current + value
+
+
+registry = Registry()
+
+
+def process_gauges() -> dict:
+    """
+    Jauges propres au processus : pool de hachage et connexions à la base.
+    """
+    from .db_pool import pool_stats
+    from .hashing import executor
+
+    gauges = {}
+    for key, value in executor.stats().items():
+        gauges[f"password_hashing_{key}"] = (f"Password hashing pool: {key}.", value)
+    for key, value in pool_stats().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            gauges[f"db_pool_{key}"] = (f"Database connection pool: {key}.", value)
+    return gauges
+
+
+class SharedStore:
+    """
+    Instantanés des workers dans METRICS_DIR. Le worker écrit le sien au plus une
+    fois par METRICS_FLUSH_INTERVAL depuis un thread, à sa sortie (hook worker_exit)
+    et avant de répondre à /metrics. Un pid réutilisé reprend les compteurs du
+    processus précédent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._dirty = threading.Event()
+        self._thread = None
+        self._gauges: dict = {}
+        self._gauges_at = 0.0
+        self._resumed = False
+
+    def after_fork(self):
+        # Rien n'est hérité du master : ni compteurs, ni thread
+        self._lock = threading.Lock()
+        self._reset()
+        registry._lock = threading.Lock()
+        registry.reset()
+
+    def path(self, pid: int) -> str:
+        return os.path.join(settings.METRICS_DIR, f"{pid}.json")
+
+    def mark_dirty(self):
+        """
+        Appelé par le thread de la requête : les jauges y sont relevées (certaines
+        dépendent des connexions du thread), le thread d'écriture démarre au besoin.
+        """
+        if not settings.METRICS_DIR:
+            return
+        now = time.monotonic()
+        if now - self._gauges_at >= settings.METRICS_FLUSH_INTERVAL:
+            self._gauges, self._gauges_at = process_gauges(), now
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="metrics-flush", daemon=True
+                    )
+                    self._thread.start()
+        self._dirty.set()
+
+    def _run(self):
+        while True:
+            self._dirty.wait()
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self._dirty.clear()
+            self.flush()
+
+    def flush(self):
+        if not settings.METRICS_DIR:
+            return
+        pid = os.getpid()
+        path = self.path(pid)
+        with self._lock:
+            if not self._resumed:
+                self._resumed = True
+                previous = read_snapshot(path)
+                if previous is not None:
+                    registry.merge(previous)
+            snapshot = registry.snapshot()
+            snapshot["pid"] = pid
+            snapshot["gauges"] = self._gauges
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as file:
+                json.dump(snapshot, file)
+            os.replace(tmp, path)
+
+    def collect(self) -> tuple[Registry, list[dict]]:
+        """
+        Compteurs additionnés de tous les workers et jauges des workers vivants.
+        Sans METRICS_DIR, ceux du processus seul.
+        """
+        if not settings.METRICS_DIR:
+            return registry, [{"pid": os.getpid(), "gauges": process_gauges()}]
+        self._gauges, self._gauges_at = process_gauges(), time.monotonic()
+        self.flush()
+        merged = Registry()
+        processes = []
+        for path in sorted(glob.glob(os.path.join(settings.METRICS_DIR, "*.json"))):
+            snapshot = read_snapshot(path)
+            if snapshot is None:
+                continue
+            merged.merge(snapshot)
+            if _is_alive(snapshot["pid"]):
+                processes.append(snapshot)
+        return merged, processes
+
+
+def read_snapshot(path: str) -> dict | None:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+store = SharedStore()
+os.register_at_fork(after_in_child=store.after_fork)
+
+
+def start_request() -> contextvars.Token:
+    return _current.set(RequestStats())
+
+
+def finish_request(token: contextvars.Token) -> RequestStats:
+    stats = _current.get()
+    _current.reset(token)
+    return stats
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installé sur chaque connexion : compte les requêtes et leur durée
+    pour la requête HTTP en cours (aucun effet hors requête).
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - start
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """
+    Branché sur le signal connection_created.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MeasuredStream:
+    """
+    Contenu d'une StreamingHttpResponse (exports) : les requêtes SQL faites pendant
+    l'itération sont comptées pour la requête, mesurée à la fermeture de la réponse.
+    """
+
+    def __init__(self, content, stats: RequestStats, on_close):
+        self._iterator = iter(content)
+        self.stats = stats
+        self.size = 0
+        self._on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = _current.set(self.stats)
+        try:
+            chunk = next(self._iterator)
+        finally:
+            _current.reset(token)
+        self.size += len(chunk)
+        return chunk
+
+    def close(self):
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close(self.size)
+
+
+class AsyncMeasuredStream:
+    """
+    Équivalent de MeasuredStream pour un contenu asynchrone (ASGI). Django appelle
+    close() à la fin de la réponse, comme pour les contenus synchrones.
+    """
+
+    def __init__(self, content, stats: RequestStats, on_close):
+        self._iterator = aiter(content)
+        self.stats = stats
+        self.size = 0
+        self._on_close = on_close
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        token = _current.set(self.stats)
+        try:
+            chunk = await anext(self._iterator)
+        finally:
+            _current.reset(token)
+        self.size += len(chunk)
+        return chunk
+
+    def close(self):
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close(self.size)
+
+    async def aclose(self):
+        self.close()
+
+
+@contextmanager
+def timed_section(name: str):
+    """
+    Mesure un bloc coûteux (envoi d'email, hachage) : attribué à la route en cours,
+    ou à la pseudo-route "background" hors requête (worker, commandes).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spent = time.perf_counter() - start
+        stats = _current.get()
+        if stats is None:
+            registry.observe_section("background", name, spent)
+        else:
+            stats.sections[name] = stats.sections.get(name, 0.0) + spent
+
+
+def _labels(**labels) -> str:
+    content = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return "{" + content + "}"
+
+
+def _metric(lines, name, kind, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for suffix, labels, value in samples:
+        lines.append(f"{name}{suffix}{_labels(**labels) if labels else ''} {value}")
+
+
+def render(
+    source: Registry = registry,
+    counters: dict | None = None,
+    processes: list[dict] | None = None,
+) -> str:
+    """
+    Exposition au format texte Prometheus 0.0.4.
+    `counters` ajoute des compteurs déjà partagés : {nom: (aide, valeur)} ;
+    `processes` les jauges de chaque worker vivant, étiquetées par pid.
+    """
+    with source._lock:
+        requests = dict(source.requests)
+        latency = {key: list(value) for key, value in source.latency.items()}
+        queries = dict(source.queries)
+        query_seconds = dict(source.query_seconds)
+        response_bytes = dict(source.response_bytes)
+        sections = {key: list(value) for key, value in source.sections.items()}
+
+    lines: list[str] = []
+    _metric(
+        lines,
+        "http_requests_total",
+        "counter",
+        "Requests by route, method and status.",
+        [
+            ("", {"route": r, "method": m, "status": s}, count)
+            for (r, m, s), count in sorted(requests.items())
+        ],
+    )
+    samples = []
+    for (route, method), histogram in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram[:-1]):
+            cumulative += count
+            samples.append(
+                ("_bucket", {"route": route, "method": method, "le": bound}, cumulative)
+            )
+        samples.append(("_sum", {"route": route, "method": method}, histogram[-1]))
+        samples.append(("_count", {"route": route, "method": method}, cumulative))
+    _metric(
+        lines,
+        "http_request_duration_seconds",
+        "histogram",
+        "Request latency by route.",
+        samples,
+    )
+    for name, help_text, values in (
+        ("http_db_queries_total", "SQL queries by route.", queries),
+        ("http_db_query_seconds_total", "Time spent in SQL by route.", query_seconds),
+        ("http_response_bytes_total", "Response body bytes by route.", response_bytes),
+    ):
+        _metric(
+            lines,
+            name,
+            "counter",
+            help_text,
+            [
+                ("", {"route": r, "method": m}, value)
+                for (r, m), value in sorted(values.items())
+            ],
+        )
+    _metric(
+        lines,
+        "section_seconds_total",
+        "counter",
+        "Time spent in email sending and password hashing, by route.",
+        [
+            ("", {"route": r, "section": s}, spent)
+            for (r, s), (_, spent) in sorted(sections.items())
+        ],
+    )
+    _metric(
+        lines,
+        "section_calls_total",
+        "counter",
+        "Requests or background calls that entered each section, by route.",
+        [
+            ("", {"route": r, "section": s}, count)
+            for (r, s), (count, _) in sorted(sections.items())
+        ],
+    )
+    for name, (help_text, value) in (counters or {}).items():
+        _metric(lines, name, "counter", help_text, [("", None, value)])
+    gauges: dict[str, tuple] = {}
+    for process in processes or []:
+        for name, (help_text, value) in process["gauges"].items():
+            gauges.setdefault(name, (help_text, []))[1].append(
+                ("", {"pid": process["pid"]}, value)
+            )
+    for name, (help_text, samples) in sorted(gauges.items()):
+        _metric(lines, name, "gauge", help_text, samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,131 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import FileResponse
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+from . import metrics
+from .storage import VITE_ASSET
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise compatible avec une chaîne de middlewares asynchrone.
+    Le middleware d'origine est uniquement synchrone : sous ASGI, Django fait alors
+    passer chaque requête (vue async comprise) par son unique thread synchrone, ce qui
+    les traite une par une.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    def find_static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+    def immutable_file_test(self, path, url):
+        # Noms hachés par le manifest de Django ou par Vite : cache permanent
+        if super().immutable_file_test(path, url):
+            return True
+        return url.startswith(self.static_prefix) and bool(
+            VITE_ASSET.match(url[len(self.static_prefix) :])
+        )
+
+    async def __acall__(self, request):
+        static_file = self.find_static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Mesure chaque requête : latence, requêtes SQL, taille de la réponse et statut,
+    agrégés par route (le motif d'URL, pas le chemin, pour borner les séries).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stats = metrics.finish_request(token)
+        self.observe(request, response, start, stats)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stats = metrics.finish_request(token)
+        self.observe(request, response, start, stats)
+        return response
+
+    @classmethod
+    def observe(cls, request, response, start, stats):
+        if response.streaming and not isinstance(response, FileResponse):
+            # Mesure différée à la fermeture : le contenu (et ses requêtes SQL)
+            # est produit pendant l'envoi, après le retour de la vue
+            stream = (
+                metrics.AsyncMeasuredStream
+                if response.is_async
+                else metrics.MeasuredStream
+            )
+            response.streaming_content = stream(
+                response.streaming_content,
+                stats,
+                lambda size: cls.record(request, response, start, stats, size),
+            )
+            return
+        if response.streaming:
+            size = (
+                int(response["Content-Length"])
+                if response.has_header("Content-Length")
+                else None
+            )
+        else:
+            size = len(response.content)
+        cls.record(request, response, start, stats, size)
+
+    @staticmethod
+    def record(request, response, start, stats, size):
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match is not None else "unmatched"
+        metrics.registry.observe_request(
+            route,
+            request.method,
+            response.status_code,
+            time.perf_counter() - start,
+            stats,
+            size,
+        )
+        metrics.store.mark_dirty()
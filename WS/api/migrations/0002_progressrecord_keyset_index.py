@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="progressrecord",
+            index=models.Index(
+                fields=["user", "-date", "-id"], name="progress_user_date_id_idx"
+            ),
+        ),
+    ]
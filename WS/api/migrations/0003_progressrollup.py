@@ -0,0 +1,53 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0002_progressrecord_keyset_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProgressRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("week", "Semaine"), ("month", "Mois")], max_length=5
+                    ),
+                ),
+                ("period", models.DateField()),
+                ("count", models.PositiveIntegerField()),
+                ("avg_weight", models.FloatField()),
+                ("min_weight", models.FloatField()),
+                ("max_weight", models.FloatField()),
+                ("avg_imc", models.FloatField()),
+                ("avg_calories", models.FloatField()),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="progress_rollups",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["period"],
+                "unique_together": {("user", "granularity", "period")},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0003_progressrollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="records_modified_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="records_revision",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0005_emailoutbox"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="emailverificationcode",
+            index=models.Index(
+                fields=["email", "-created_at"], name="code_email_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="emailverificationcode",
+            index=models.Index(fields=["created_at"], name="code_created_idx"),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import TruncMonth, TruncWeek
+
+GRANULARITIES = {"week": TruncWeek, "month": TruncMonth}
+
+
+def _round(value, digits=2):
+    return round(value, digits) if value is not None else None
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Agrégats des enregistrements existants avant 0003 (même calcul que
+    api.rollups.rebuild_rollups, recopié pour ne dépendre que des modèles historiques).
+    """
+    ProgressRecord = apps.get_model("api", "ProgressRecord")
+    ProgressRollup = apps.get_model("api", "ProgressRollup")
+    rollups = []
+    for granularity, trunc in GRANULARITIES.items():
+        rows = (
+            ProgressRecord.objects.order_by()
+            .annotate(period=trunc("date"))
+            .values("user_id", "period")
+            .annotate(
+                count=Count("id"),
+                avg_weight=Avg("weight_kg"),
+                min_weight=Min("weight_kg"),
+                max_weight=Max("weight_kg"),
+                avg_imc=Avg("imc"),
+                avg_calories=Avg("calories_recommandees"),
+            )
+        )
+        rollups.extend(
+            ProgressRollup(
+                user_id=row["user_id"],
+                granularity=granularity,
+                period=row["period"],
+                count=row["count"],
+                avg_weight=_round(row["avg_weight"]),
+                min_weight=row["min_weight"],
+                max_weight=row["max_weight"],
+                avg_imc=_round(row["avg_imc"]),
+                avg_calories=_round(row["avg_calories"], 0),
+            )
+            for row in rows.iterator()
+        )
+    ProgressRollup.objects.all().delete()
+    ProgressRollup.objects.bulk_create(rollups, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0006_verification_code_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -13,6 +13,11 @@ ACTIVITY_CHOICES = [
     ("tres_intense", "Très intense"),
 ]
 
+GRANULARITY_CHOICES = [
+    ("week", "Semaine"),
+    ("month", "Mois"),
+]
+
 
 class CustomUser(AbstractUser):
     """
@@ -23,6 +28,9 @@ class CustomUser(AbstractUser):
     phone_number = models.CharField(max_length=20, unique=True, null=True, blank=True)
     birth_date = models.DateField(null=True, blank=True)
     gender = models.CharField(max_length=1, blank=False, default="H")
+    # Incrémenté à chaque écriture sur les ProgressRecord de l'utilisateur (ETag)
+    records_revision = models.PositiveIntegerField(default=0)
+    records_modified_at = models.DateTimeField(null=True, blank=True)
 
     # L'email sera utilisé comme identifiant au lieu du username
     USERNAME_FIELD = "email"
@@ -36,14 +44,37 @@ class CustomUser(AbstractUser):
         """
         return self.email
 
+    @classmethod
+    def touch_records(cls, *user_ids):
+        """
+        Marque les enregistrements de ces utilisateurs comme modifiés.
+        Une seule requête UPDATE atomique, sans charger les utilisateurs.
+        """
+        cls.objects.filter(pk__in=user_ids).update(
+            records_revision=models.F("records_revision") + 1,
+            records_modified_at=timezone.now(),
+        )
+
 
 class EmailVerificationCode(models.Model):
     email = models.EmailField()
     code = models.CharField(max_length=6)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Dernier code d'une adresse : filter(email=...).latest("created_at")
+            models.Index(
+                fields=["email", "-created_at"], name="code_email_created_idx"
+            ),
+            # Purge des codes expirés
+            models.Index(fields=["created_at"], name="code_created_idx"),
+        ]
+
     def is_expired(self):
-        return self.created_at < timezone.now() - datetime.timedelta(minutes=10)
+        return self.created_at < timezone.now() - datetime.timedelta(
+            seconds=settings.VERIFICATION_CODE_TTL
+        )
 
     def __str__(self):
         return f"{self.email} - {self.code}"
@@ -74,3 +105,69 @@ class ProgressRecord(models.Model):
     class Meta:
         unique_together = ("user", "date")
         ordering = ["-date"]
+        indexes = [
+            # Sert la pagination par clé (date, id) et les filtres par période
+            models.Index(
+                fields=["user", "-date", "-id"], name="progress_user_date_id_idx"
+            ),
+        ]
+
+
+class ProgressRollup(models.Model):
+    """
+    Agrégat hebdomadaire ou mensuel des enregistrements d'un utilisateur.
+    Maintenu à chaque création/modification/suppression d'un ProgressRecord.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="progress_rollups",
+    )
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    period = models.DateField()
+    count = models.PositiveIntegerField()
+    avg_weight = models.FloatField()
+    min_weight = models.FloatField()
+    max_weight = models.FloatField()
+    avg_imc = models.FloatField()
+    avg_calories = models.FloatField()
+
+    class Meta:
+        unique_together = ("user", "granularity", "period")
+        ordering = ["period"]
+
+
+class EmailOutbox(models.Model):
+    """
+    Email en attente d'envoi par le worker SMTP (commande send_outbox).
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "En attente"),
+        ("sending", "En cours d'envoi"),
+        ("sent", "Envoyé"),
+        ("failed", "Échec"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    to_email = models.EmailField()
+    reply_to = models.EmailField(null=True, blank=True)
+    html_content = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Prochaine tentative (ou fin du bail pendant l'envoi)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outbox_status_next_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} ({self.status})"
@@ -0,0 +1,231 @@
+import datetime
+import time
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .metrics import timed_section
+from .models import EmailOutbox
+
+# smtplib et les modules email ne sont importés qu'au premier envoi : la plupart des
+# workers web ne font que remplir l'outbox
+if TYPE_CHECKING:
+    from email.mime.multipart import MIMEMultipart
+
+# Durée pendant laquelle un email réservé par un worker n'est pas repris par un autre.
+# Au-delà (worker arrêté en plein envoi), il redevient éligible.
+LEASE_SECONDS = 300
+SMTP_TIMEOUT = 30
+# Le worker supprime les emails envoyés trop anciens au plus une fois par heure
+PURGE_INTERVAL = 3600
+
+
+def build_message(
+    subject: str, to_email: str, html_content: str, reply_to: str | None = None
+) -> "MIMEMultipart":
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = settings.DEFAULT_FROM_EMAIL
+    msg["To"] = to_email
+    if reply_to:
+        msg["Reply-To"] = reply_to
+    msg.attach(MIMEText(html_content, "html"))
+    return msg
+
+
+def enqueue_email(
+    subject: str, to_email: str, html_content: str, reply_to: str | None = None
+) -> EmailOutbox:
+    """
+    Enregistre un email dans l'outbox. Il sera envoyé par le worker send_outbox.
+    """
+    return EmailOutbox.objects.create(
+        subject=subject, to_email=to_email, html_content=html_content, reply_to=reply_to
+    )
+
+
+async def aenqueue_email(
+    subject: str, to_email: str, html_content: str, reply_to: str | None = None
+) -> EmailOutbox:
+    return await EmailOutbox.objects.acreate(
+        subject=subject, to_email=to_email, html_content=html_content, reply_to=reply_to
+    )
+
+
+class SMTPConnection:
+    """
+    Connexion SMTP ouverte à la demande et réutilisée entre les envois.
+    Elle est rouverte si le serveur l'a coupée ou si elle est restée inactive
+    plus de `idle_timeout` secondes.
+    """
+
+    def __init__(self, idle_timeout: float | None = None):
+        self.idle_timeout = (
+            settings.EMAIL_SMTP_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        )
+        self.server = None
+        self.last_used = 0.0
+        self.opened = 0
+
+    def open(self):
+        import smtplib
+        import ssl
+
+        server = smtplib.SMTP(
+            settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=SMTP_TIMEOUT
+        )
+        if settings.EMAIL_USE_TLS:
+            server.starttls(context=ssl._create_unverified_context())
+        if settings.EMAIL_HOST_USER:
+            server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
+        self.server = server
+        self.opened += 1
+
+    def close(self):
+        if self.server is None:
+            return
+        import smtplib
+
+        try:
+            self.server.quit()
+        except smtplib.SMTPException:
+            self.server.close()
+        except OSError:
+            pass
+        self.server = None
+
+    def close_if_idle(self):
+        if self.server is not None and (
+            time.monotonic() - self.last_used > self.idle_timeout
+        ):
+            self.close()
+
+    def send(self, msg: "MIMEMultipart"):
+        import smtplib
+
+        with timed_section("email"):
+            self.close_if_idle()
+            if self.server is None:
+                self.open()
+            try:
+                self.server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # Connexion coupée par le serveur : une seule reconnexion
+                self.server = None
+                self.open()
+                self.server.send_message(msg)
+            finally:
+                self.last_used = time.monotonic()
+
+
+def _is_permanent(error: Exception) -> bool:
+    """
+    Les refus définitifs (codes SMTP 5xx) ne sont pas retentés.
+    """
+    import smtplib
+
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def purge_sent(retention_days: int | None = None) -> int:
+    """
+    Supprime les emails envoyés depuis plus de `retention_days` jours.
+    Les échecs sont conservés pour diagnostic.
+    """
+    if retention_days is None:
+        retention_days = settings.EMAIL_OUTBOX_RETENTION_DAYS
+    if retention_days <= 0:
+        return 0
+    deleted, _ = EmailOutbox.objects.filter(
+        status="sent",
+        sent_at__lt=timezone.now() - datetime.timedelta(days=retention_days),
+    ).delete()
+    return deleted
+
+
+def retry_delay(attempts: int, base: float | None = None) -> datetime.timedelta:
+    """
+    Délai avant la tentative suivante : base, 2 x base, 4 x base...
+    """
+    base = settings.EMAIL_OUTBOX_RETRY_DELAY if base is None else base
+    return datetime.timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def claim_batch(batch_size: int) -> list[EmailOutbox]:
+    """
+    Réserve jusqu'à `batch_size` emails à envoyer.
+    SKIP LOCKED permet à plusieurs workers de se partager l'outbox sans doublon.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status__in=["pending", "sending"], next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        EmailOutbox.objects.filter(id__in=ids).update(
+            status="sending",
+            attempts=F("attempts") + 1,
+            next_attempt_at=now + datetime.timedelta(seconds=LEASE_SECONDS),
+        )
+    return list(
+        EmailOutbox.objects.filter(id__in=ids).order_by("next_attempt_at", "id")
+    )
+
+
+def drain_batch(
+    connection: SMTPConnection,
+    batch_size: int | None = None,
+    max_attempts: int | None = None,
+) -> dict:
+    """
+    Envoie un lot d'emails sur la connexion fournie et enregistre le statut de chacun.
+    Un échec temporaire est retenté plus tard (backoff exponentiel) jusqu'à
+    `max_attempts` tentatives ; un refus définitif passe directement en "failed".
+    """
+    import smtplib
+
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    counts = {"sent": 0, "retried": 0, "failed": 0}
+
+    for email in claim_batch(batch_size):
+        try:
+            connection.send(
+                build_message(
+                    email.subject, email.to_email, email.html_content, email.reply_to
+                )
+            )
+        except (smtplib.SMTPException, OSError) as error:
+            email.last_error = f"{type(error).__name__}: {error}"[:1000]
+            if _is_permanent(error) or email.attempts >= max_attempts:
+                email.status = "failed"
+                counts["failed"] += 1
+            else:
+                email.status = "pending"
+                email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                counts["retried"] += 1
+            if not isinstance(
+                error, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+            ):
+                # Erreur réseau : la connexion est peut-être dans un état incertain
+                connection.close()
+            email.save(update_fields=["status", "next_attempt_at", "last_error"])
+            continue
+
+        email.status = "sent"
+        email.sent_at = timezone.now()
+        email.last_error = ""
+        email.save(update_fields=["status", "sent_at", "last_error"])
+        counts["sent"] += 1
+
+    return counts
@@ -0,0 +1,80 @@
+import base64
+import binascii
+import datetime
+
+from django.db.models import Q, QuerySet
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """
+    Levée lorsqu'un curseur de pagination ne peut pas être décodé.
+    """
+
+
+def encode_cursor(date: datetime.date, primary_key: int) -> str:
+    """
+    Encode la position (date, id) d'un enregistrement en curseur opaque.
+    """
+    raw = f"{date.isoformat()}|{primary_key}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.date, int]:
+    """
+    Décode un curseur opaque en position (date, id).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_str, pk_str = raw.split("|")
+        return datetime.date.fromisoformat(date_str), int(pk_str)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor("Curseur de pagination invalide.") from exc
+
+
+def _keyset_queryset(queryset: QuerySet, cursor: str | None) -> QuerySet:
+    queryset = queryset.order_by("-date", "-id")
+    if cursor:
+        date, primary_key = decode_cursor(cursor)
+        queryset = queryset.filter(Q(date__lt=date) | Q(date=date, id__lt=primary_key))
+    return queryset
+
+
+def _split_page(records: list, limit: int) -> tuple[list, str | None]:
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        last = records[-1]
+        # Les lignes peuvent être des instances ou des dicts issus de values()
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(last["date"], last["id"])
+        else:
+            next_cursor = encode_cursor(last.date, last.id)
+    return records, next_cursor
+
+
+def paginate_by_keyset(
+    queryset: QuerySet, cursor: str | None, limit: int
+) -> tuple[list, str | None]:
+    """
+    Pagination par clé (date, id) décroissante.
+    Le coût d'une page ne dépend que de `limit`, pas de la position dans l'historique,
+    car on filtre sur la clé au lieu d'utiliser un OFFSET.
+    Retourne les enregistrements de la page et le curseur de la page suivante.
+    """
+    queryset = _keyset_queryset(queryset, cursor)
+    # On récupère un élément de plus pour savoir s'il existe une page suivante
+    return _split_page(list(queryset[: limit + 1]), limit)
+
+
+async def apaginate_by_keyset(
+    queryset: QuerySet, cursor: str | None, limit: int
+) -> tuple[list, str | None]:
+    """
+    Équivalent de paginate_by_keyset avec l'ORM asynchrone.
+    """
+    queryset = _keyset_queryset(queryset, cursor)
+    return _split_page([record async for record in queryset[: limit + 1]], limit)
@@ -0,0 +1,31 @@
+"""
+Lecture des corps JSON de l'API avec orjson.
+"""
+
+import codecs
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser de DRF accéléré par orjson : le corps UTF-8 est lu tel quel, sans
+    décodage préalable. orjson refuse NaN et l'infini, comme STRICT_JSON ; sans
+    STRICT_JSON, le parser de DRF reprend la main.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        try:
+            content = stream.read()
+            if codecs.lookup(encoding).name != "utf-8":
+                content = content.decode(encoding)
+            return orjson.loads(content)
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
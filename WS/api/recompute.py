@@ -0,0 +1,165 @@
+import datetime
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.db import transaction
+
+from .models import CustomUser, ProgressRecord
+from .rollups import rebuild_rollups
+from .utils import calculs_calories_batch, get_age
+
+DEFAULT_CHUNK_SIZE = 2000
+METRIC_FIELDS = ["imc", "bmr", "tdee", "calories_recommandees"]
+CHUNK_COLUMNS = [
+    "id",
+    "user_id",
+    "date",
+    "weight_kg",
+    "height_cm",
+    "activity_level",
+    "goal",
+    "user__gender",
+    "user__birth_date",
+    *METRIC_FIELDS,
+]
+
+
+def compute_changes(rows: list[tuple]) -> tuple[list[tuple], int]:
+    """
+    Recalcule les métriques d'un bloc de lignes (tuples dans l'ordre de CHUNK_COLUMNS)
+    avec la règle de la modification d'un enregistrement (PATCH) : sexe et âge
+    actuel du profil.
+    Retourne les lignes modifiées (id, user_id, imc, bmr, tdee, calories) et le nombre de
+    lignes ignorées faute de date de naissance.
+    Ne touche pas à la base : peut tourner dans un processus du pool.
+    """
+    total = len(rows)
+    rows = [row for row in rows if row[8] is not None]
+    skipped = total - len(rows)
+    if not rows:
+        return [], skipped
+
+    columns = list(zip(*rows))
+    today = datetime.date.today()
+    results = calculs_calories_batch(
+        columns[3],
+        columns[4],
+        [get_age(birth_date, today) for birth_date in columns[8]],
+        columns[7],
+        columns[5],
+        columns[6],
+    )
+
+    changes = []
+    for index, row in enumerate(rows):
+        new = tuple(float(results[field][index]) for field in METRIC_FIELDS)
+        if new != row[9:13]:
+            changes.append((row[0], row[1], *new))
+    return changes, skipped
+
+
+def _iter_chunks(start_after: int, chunk_size: int):
+    """
+    Parcourt la table par blocs de clé primaire croissante (id > dernier id lu).
+    """
+    last_id = start_after
+    while True:
+        rows = list(
+            ProgressRecord.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list(*CHUNK_COLUMNS)[:chunk_size]
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield last_id, rows
+
+
+def _save_changes(changes: list[tuple]):
+    records = [
+        ProgressRecord(id=record_id, **dict(zip(METRIC_FIELDS, values)))
+        for record_id, _, *values in changes
+    ]
+    with transaction.atomic():
+        ProgressRecord.objects.bulk_update(records, METRIC_FIELDS, batch_size=1000)
+        CustomUser.touch_records(*{user_id for _, user_id, *_ in changes})
+
+
+class Checkpoint:
+    """
+    Position de reprise stockée dans un fichier JSON après chaque bloc traité.
+    """
+
+    def __init__(self, path: Path | None):
+        self.path = path
+        self.state = {"last_id": 0, "scanned": 0, "changed": 0, "skipped": 0}
+        if path is not None and path.exists():
+            self.state.update(json.loads(path.read_text()))
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state))
+        # Remplacement atomique : une interruption ne laisse jamais un fichier tronqué
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path is not None and self.path.exists():
+            self.path.unlink()
+
+
+def recompute_metrics(
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    dry_run: bool = False,
+    checkpoint_path: Path | None = None,
+    progress=None,
+) -> dict:
+    """
+    Recalcule imc/bmr/tdee/calories_recommandees de tous les enregistrements.
+    Les blocs sont lus séquentiellement, calculés dans un pool de processus et
+    réécrits avec bulk_update dans l'ordre de lecture, ce qui permet d'enregistrer
+    après chaque bloc un point de reprise fiable.
+    En dry-run, rien n'est écrit (ni données ni point de reprise).
+    """
+    checkpoint = Checkpoint(None if dry_run else checkpoint_path)
+    state = checkpoint.state
+
+    def handle(last_id, scanned, changes, skipped):
+        if not dry_run and changes:
+            _save_changes(changes)
+        state["last_id"] = last_id
+        state["scanned"] += scanned
+        state["changed"] += len(changes)
+        state["skipped"] += skipped
+        checkpoint.save()
+        if progress is not None:
+            progress(state)
+
+    chunks = _iter_chunks(state["last_id"], chunk_size)
+    if workers <= 1:
+        for last_id, rows in chunks:
+            handle(last_id, len(rows), *compute_changes(rows))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            # On borne le nombre de blocs en vol pour garder une mémoire constante
+            pending: deque = deque()
+            for last_id, rows in chunks:
+                pending.append((last_id, len(rows), pool.submit(compute_changes, rows)))
+                if len(pending) >= workers * 2:
+                    last, scanned, future = pending.popleft()
+                    handle(last, scanned, *future.result())
+            while pending:
+                last, scanned, future = pending.popleft()
+                handle(last, scanned, *future.result())
+
+    if not dry_run:
+        if state["changed"]:
+            rebuild_rollups()
+        checkpoint.clear()
+    return state
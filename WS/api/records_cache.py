@@ -0,0 +1,78 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+KEY_PREFIX = "progress-records"
+STATS_KEYS = {
+    "hits": f"{KEY_PREFIX}:stats:hits",
+    "misses": f"{KEY_PREFIX}:stats:misses",
+}
+
+
+def cache_key(etag: str, query_params) -> str:
+    """
+    Clé de cache d'une liste d'enregistrements.
+    L'ETag contient l'utilisateur et la révision de ses enregistrements : chaque
+    création/modification/suppression incrémente la révision, les anciennes entrées
+    ne sont donc plus jamais lues et expirent d'elles-mêmes.
+    """
+    query = urlencode(sorted(query_params.items()))
+    digest = hashlib.md5(query.encode(), usedforsecurity=False).hexdigest()
+    version = etag.strip('"')
+    return f"{KEY_PREFIX}:{version}:{digest}"
+
+
+def _count(stat: str):
+    key = STATS_KEYS[stat]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+async def _acount(stat: str):
+    key = STATS_KEYS[stat]
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 1, timeout=None)
+
+
+def get_listing(key: str):
+    """
+    Retourne la liste sérialisée en cache ou None, et met à jour les compteurs.
+    """
+    data = cache.get(key)
+    _count("misses" if data is None else "hits")
+    return data
+
+
+def set_listing(key: str, data):
+    cache.set(key, data, timeout=settings.RECORDS_CACHE_TIMEOUT)
+
+
+async def aget_listing(key: str):
+    data = await cache.aget(key)
+    await _acount("misses" if data is None else "hits")
+    return data
+
+
+async def aset_listing(key: str, data):
+    await cache.aset(key, data, timeout=settings.RECORDS_CACHE_TIMEOUT)
+
+
+def cache_stats() -> dict:
+    """
+    Compteurs de succès/échecs du cache des listes d'enregistrements.
+    """
+    values = cache.get_many(STATS_KEYS.values())
+    stats = {stat: values.get(key, 0) for stat, key in STATS_KEYS.items()}
+    total = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / total, 3) if total else 0.0
+    return stats
+
+
+def reset_stats():
+    cache.delete_many(STATS_KEYS.values())
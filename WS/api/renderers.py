@@ -0,0 +1,55 @@
+"""
+Rendu JSON de l'API avec orjson, octet pour octet identique au JSONRenderer de DRF.
+
+Dates, heures, UUID et dictionnaires sont encodés nativement par orjson ; les autres
+types (Decimal, chaînes traduites paresseuses, timedelta, QuerySet...) passent par
+l'encodeur de DRF, appelé seulement pour ces valeurs.
+"""
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Mêmes conventions que l'encodeur de DRF : "Z" pour UTC, clés non textuelles
+# converties en chaînes
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+default = JSONEncoder().default
+
+# Séparateurs de ligne JavaScript, échappés par DRF pour rester un sous-ensemble de JS
+LINE_SEPARATORS = (
+    ("\u2028".encode(), b"\\u2028"),
+    ("\u2029".encode(), b"\\u2029"),
+)
+
+
+def dumps(data) -> bytes:
+    """
+    JSON compact en UTF-8 ; lève orjson.JSONEncodeError pour un type inconnu ou un
+    entier hors 64 bits.
+    """
+    content = orjson.dumps(data, default=default, option=OPTIONS)
+    for separator, escaped in LINE_SEPARATORS:
+        if separator in content:
+            content = content.replace(separator, escaped)
+    return content
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer de DRF accéléré par orjson pour le JSON compact. L'indentation
+    (API navigable, `Accept: application/json; indent=4`), UNICODE_JSON, COMPACT_JSON
+    ou STRICT_JSON désactivés et les valeurs refusées par orjson repassent par le
+    rendu de DRF. Seule différence : NaN et l'infini deviennent null au lieu de lever
+    une erreur.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is None and self.compact and self.strict and not self.ensure_ascii:
+            try:
+                return dumps(data)
+            except orjson.JSONEncodeError:
+                pass
+        return super().render(data, accepted_media_type, renderer_context)
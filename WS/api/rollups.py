@@ -0,0 +1,225 @@
+import calendar
+import datetime
+from collections import deque
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q, QuerySet
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import ProgressRecord, ProgressRollup
+
+GRANULARITIES = {
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+ROLLUP_FIELDS = [
+    "count",
+    "avg_weight",
+    "min_weight",
+    "max_weight",
+    "avg_imc",
+    "avg_calories",
+]
+
+
+def _round(value, digits=2):
+    return round(value, digits) if value is not None else None
+
+
+def _aggregates(prefix: str = "", condition=None) -> dict:
+    """
+    Agrégats d'une période, éventuellement restreints par `condition`.
+    """
+    return {
+        f"{prefix}count": Count("id", filter=condition),
+        f"{prefix}avg_weight": Avg("weight_kg", filter=condition),
+        f"{prefix}min_weight": Min("weight_kg", filter=condition),
+        f"{prefix}max_weight": Max("weight_kg", filter=condition),
+        f"{prefix}avg_imc": Avg("imc", filter=condition),
+        f"{prefix}avg_calories": Avg("calories_recommandees", filter=condition),
+    }
+
+
+def _rollup_values(row: dict, prefix: str = "") -> dict:
+    return {
+        "count": row[f"{prefix}count"],
+        "avg_weight": _round(row[f"{prefix}avg_weight"]),
+        "min_weight": row[f"{prefix}min_weight"],
+        "max_weight": row[f"{prefix}max_weight"],
+        "avg_imc": _round(row[f"{prefix}avg_imc"]),
+        "avg_calories": _round(row[f"{prefix}avg_calories"], 0),
+    }
+
+
+def compute_rollups(
+    queryset: QuerySet, granularity: str, by_user: bool = False
+) -> list[dict]:
+    """
+    Agrège les enregistrements par semaine ou par mois directement en SQL.
+    Une seule requête GROUP BY, le nombre de lignes renvoyées est le nombre de périodes.
+    Avec `by_user`, le regroupement se fait aussi par utilisateur.
+    """
+    trunc = GRANULARITIES[granularity]
+    group_by = ["user_id", "period"] if by_user else ["period"]
+    rows = (
+        queryset.order_by()
+        .annotate(period=trunc("date"))
+        .values(*group_by)
+        .annotate(**_aggregates())
+        .order_by(*group_by)
+    )
+    buckets = []
+    for row in rows:
+        bucket = {"period": row["period"], **_rollup_values(row)}
+        if by_user:
+            bucket["user_id"] = row["user_id"]
+        buckets.append(bucket)
+    return buckets
+
+
+def add_moving_average(buckets: list[dict], window: int) -> list[dict]:
+    """
+    Ajoute la moyenne mobile du poids sur les `window` dernières périodes.
+    Calculée sur les périodes déjà agrégées, avec une somme glissante.
+    """
+    values: deque = deque()
+    total = 0.0
+    for bucket in buckets:
+        values.append(bucket["avg_weight"])
+        total += bucket["avg_weight"]
+        if len(values) > window:
+            total -= values.popleft()
+        bucket["moving_avg_weight"] = round(total / len(values), 2)
+    return buckets
+
+
+def bucket_bounds(granularity: str, day: datetime.date):
+    """
+    Retourne le premier et le dernier jour de la période contenant `day`.
+    """
+    if granularity == "week":
+        start = day - datetime.timedelta(days=day.weekday())
+        return start, start + datetime.timedelta(days=6)
+    last_day = calendar.monthrange(day.year, day.month)[1]
+    return day.replace(day=1), day.replace(day=last_day)
+
+
+def read_rollups(user, granularity: str) -> list[dict]:
+    """
+    Lit les agrégats stockés d'un utilisateur : le coût dépend du nombre de périodes.
+    """
+    return list(
+        ProgressRollup.objects.filter(user=user, granularity=granularity)
+        .order_by("period")
+        .values("period", *ROLLUP_FIELDS)
+    )
+
+
+def refresh_rollups(user, day: datetime.date):
+    """
+    Recalcule uniquement la semaine et le mois contenant `day` pour cet utilisateur :
+    un seul agrégat conditionnel pour les deux périodes, puis un upsert (et une
+    suppression des périodes devenues vides).
+    À appeler dans la transaction qui crée, modifie ou supprime l'enregistrement,
+    pour que les agrégats ne soient jamais visibles décalés.
+    """
+    bounds = {
+        granularity: bucket_bounds(granularity, day) for granularity in GRANULARITIES
+    }
+    aggregates = {}
+    for granularity, period in bounds.items():
+        aggregates.update(_aggregates(f"{granularity}_", Q(date__range=period)))
+    row = ProgressRecord.objects.filter(
+        user=user,
+        date__gte=min(start for start, _ in bounds.values()),
+        date__lte=max(end for _, end in bounds.values()),
+    ).aggregate(**aggregates)
+
+    rollups, empty = [], Q()
+    for granularity, (start, _) in bounds.items():
+        values = _rollup_values(row, f"{granularity}_")
+        if values["count"]:
+            rollups.append(
+                ProgressRollup(
+                    user=user, granularity=granularity, period=start, **values
+                )
+            )
+        else:
+            empty |= Q(granularity=granularity, period=start)
+    if empty:
+        ProgressRollup.objects.filter(empty, user=user).delete()
+    if rollups:
+        ProgressRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=["user", "granularity", "period"],
+            update_fields=ROLLUP_FIELDS,
+        )
+
+
+def expected_rollups(user=None) -> dict:
+    """
+    Calcule les agrégats attendus depuis ProgressRecord, indexés par
+    (user_id, granularity, period).
+    """
+    records = ProgressRecord.objects.all()
+    if user is not None:
+        records = records.filter(user=user)
+    expected = {}
+    for granularity in GRANULARITIES:
+        for bucket in compute_rollups(records, granularity, by_user=True):
+            key = (bucket["user_id"], granularity, bucket["period"])
+            expected[key] = {field: bucket[field] for field in ROLLUP_FIELDS}
+    return expected
+
+
+def rebuild_rollups(user=None) -> int:
+    """
+    Reconstruit entièrement la table des agrégats (pour un utilisateur ou pour tous).
+    Retourne le nombre d'agrégats créés.
+    """
+    expected = expected_rollups(user)
+    rollups = ProgressRollup.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+    with transaction.atomic():
+        rollups.delete()
+        ProgressRollup.objects.bulk_create(
+            [
+                ProgressRollup(
+                    user_id=user_id, granularity=granularity, period=period, **values
+                )
+                for (user_id, granularity, period), values in expected.items()
+            ],
+            batch_size=1000,
+        )
+    return len(expected)
+
+
+def find_rollup_drift(user=None) -> list[str]:
+    """
+    Compare les agrégats stockés à ceux recalculés et décrit chaque écart.
+    """
+    expected = expected_rollups(user)
+    rollups = ProgressRollup.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+    stored = {
+        (row["user_id"], row["granularity"], row["period"]): {
+            field: row[field] for field in ROLLUP_FIELDS
+        }
+        for row in rollups.values("user_id", "granularity", "period", *ROLLUP_FIELDS)
+    }
+
+    drift = []
+    for key in sorted(expected.keys() | stored.keys()):
+        user_id, granularity, period = key
+        label = f"user={user_id} {granularity} {period}"
+        if key not in stored:
+            drift.append(f"{label} : agrégat manquant")
+        elif key not in expected:
+            drift.append(f"{label} : agrégat orphelin")
+        elif stored[key] != expected[key]:
+            drift.append(f"{label} : {stored[key]} != {expected[key]}")
+    return drift
@@ -1,8 +1,13 @@
 from typing import cast
 
-from api.models import CustomUser, ProgressRecord
+from api.authentication import add_user_claims
+from api.hashing import check_user_password, hash_password
+from api.models import ACTIVITY_CHOICES, CustomUser, ProgressRecord
+from api.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from api.rollups import refresh_rollups
 from api.utils import calculs_calories
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -43,9 +48,14 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """
-        Crée un nouvel utilisateur (Gestion aut du hash du mot de passe)
+        Crée un nouvel utilisateur (hash du mot de passe dans le pool de hachage)
         """
-        user = User.objects.create_user(**validated_data)
+        password = validated_data.pop("password")
+        user = User(**validated_data)
+        user.username = User.normalize_username(user.username)
+        user.email = User.objects.normalize_email(user.email)
+        user.password = hash_password(password)
+        user.save()
         return user
 
 
@@ -66,10 +76,10 @@ class LoginSerializer(serializers.Serializer):
         # Récupérer l'utilisateur correspondant à l'email
         user = User.objects.filter(email=email).first()
         user = cast(CustomUser, user)
-        if user is None or not user.check_password(password):
+        if user is None or not check_user_password(user, password):
             raise serializers.ValidationError("Identifiants incorrects.")
         # Générer un Token JWT pour l'utilisateur.
-        refresh = RefreshToken.for_user(user)
+        refresh = add_user_claims(RefreshToken.for_user(user), user)
         return {
             "refresh": str(refresh),
             "access": str(refresh.access_token),
@@ -146,7 +156,7 @@ class UpdateProfileSerializer(serializers.ModelSerializer):
         password = validated_data.pop("password", None)
 
         if password:
-            instance.set_password(password)
+            instance.password = hash_password(password)
         # Si l'email est mis à jour, mettre aussi à jour le username.
         new_email = validated_data.get("email", None)
 
@@ -158,23 +168,30 @@ class UpdateProfileSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
-class EmailCodeRequestRegistrationSerializer(serializers.Serializer):
+class EmailCodeRequestSerializer(serializers.Serializer):
+    """
+    Format de l'email seul, sans requête : utilisé par les vues asynchrones qui font
+    la vérification en base avec l'ORM asynchrone.
+    """
+
     email = serializers.EmailField()
 
+
+class EmailCodeRequestRegistrationSerializer(EmailCodeRequestSerializer):
+    EMAIL_TAKEN = "Il existe déjà un utilisateur avec ce mail."
+
     def validate_email(self, value):
         if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError(
-                "Il existe déjà un utilisateur avec ce mail."
-            )
+            raise serializers.ValidationError(self.EMAIL_TAKEN)
         return value
 
 
-class EmailCodeRequestResetPasswordSerializer(serializers.Serializer):
-    email = serializers.EmailField()
+class EmailCodeRequestResetPasswordSerializer(EmailCodeRequestSerializer):
+    EMAIL_UNKNOWN = "Aucun utilisateur avec cet email."
 
     def validate_email(self, value):
         if not User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Aucun utilisateur avec cet email.")
+            raise serializers.ValidationError(self.EMAIL_UNKNOWN)
         return value
 
 
@@ -196,7 +213,7 @@ class ResetPasswordSerializer(serializers.Serializer):
         email = self.validated_data["email"]
         password = self.validated_data["password"]
         user = User.objects.get(email=email)
-        user.set_password(password)
+        user.password = hash_password(password)
         user.save()
         return user
 
@@ -261,18 +278,23 @@ class CaloriesRecordSerializer(serializers.ModelSerializer):
 
         result = calculs_calories(weight, height, age, gender, activity_level, goal)
 
-        return ProgressRecord.objects.create(
-            user=user,
-            weight_kg=weight,
-            height_cm=height,
-            imc=result["imc"],
-            bmr=result["bmr"],
-            tdee=result["tdee"],
-            calories_recommandees=result["calories_recommandees"],
-            goal=goal,
-            activity_level=activity_level,
-            date=timezone.localdate(),
-        )
+        # Enregistrement, agrégats et révision validés ensemble
+        with transaction.atomic():
+            record = ProgressRecord.objects.create(
+                user=user,
+                weight_kg=weight,
+                height_cm=height,
+                imc=result["imc"],
+                bmr=result["bmr"],
+                tdee=result["tdee"],
+                calories_recommandees=result["calories_recommandees"],
+                goal=goal,
+                activity_level=activity_level,
+                date=timezone.localdate(),
+            )
+            refresh_rollups(user, record.date)
+            CustomUser.touch_records(user.pk)
+        return record
 
 
 class ProgressRecordSerializer(serializers.ModelSerializer):
@@ -323,7 +345,10 @@ class ProgressRecordSerializer(serializers.ModelSerializer):
         instance.tdee = result["tdee"]
         instance.calories_recommandees = result["calories_recommandees"]
 
-        instance.save()
+        with transaction.atomic():
+            instance.save()
+            refresh_rollups(user, instance.date)
+            CustomUser.touch_records(user.pk)
         return instance
 
     def _get_age(self, birth_date):
@@ -337,6 +362,103 @@ class ProgressRecordSerializer(serializers.ModelSerializer):
         )
 
 
+class ProgressRecordFilterSerializer(serializers.Serializer):
+    """
+    Serializer pour les paramètres de filtre et de pagination de la liste des enregistrements
+    """
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    goal = serializers.ChoiceField(
+        choices=["maintien", "perte", "prise"], required=False
+    )
+    activity_level = serializers.ChoiceField(choices=ACTIVITY_CHOICES, required=False)
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=MAX_PAGE_SIZE, default=DEFAULT_PAGE_SIZE
+    )
+
+    def validate(self, data):
+        return validate_date_range(data)
+
+
+def validate_date_range(data):
+    """
+    Période date_from / date_to des filtres de l'historique.
+    """
+    date_from = data.get("date_from")
+    date_to = data.get("date_to")
+    if date_from and date_to and date_from > date_to:
+        raise serializers.ValidationError(
+            "La date de début doit précéder la date de fin."
+        )
+    return data
+
+
+class ProgressRecordRollupSerializer(serializers.Serializer):
+    """
+    Serializer pour les paramètres des agrégats hebdomadaires/mensuels
+    """
+
+    granularity = serializers.ChoiceField(choices=["week", "month"], default="week")
+    window = serializers.IntegerField(min_value=1, max_value=52, default=4)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        return validate_date_range(data)
+
+
+class ProgressRecordImportRowSerializer(serializers.Serializer):
+    """
+    Serializer pour une ligne d'un fichier d'import d'historique
+    """
+
+    date = serializers.DateField()
+    weight_kg = serializers.FloatField(min_value=1)
+    height_cm = serializers.FloatField(min_value=1)
+    activity_level = serializers.ChoiceField(choices=ACTIVITY_CHOICES, default="modere")
+    goal = serializers.ChoiceField(
+        choices=["maintien", "perte", "prise"], default="maintien"
+    )
+
+    def validate_date(self, value):
+        if value > timezone.localdate():
+            raise serializers.ValidationError("La date ne peut pas être dans le futur.")
+        return value
+
+
+class ProgressRecordImportSerializer(serializers.Serializer):
+    """
+    Serializer pour l'envoi d'un fichier d'import (CSV ou JSONL)
+    """
+
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=["csv", "jsonl"], required=False)
+
+    def validate(self, data):
+        if "file_format" not in data:
+            name = data["file"].name.lower()
+            if name.endswith(".csv"):
+                data["file_format"] = "csv"
+            elif name.endswith((".jsonl", ".ndjson")):
+                data["file_format"] = "jsonl"
+            else:
+                raise serializers.ValidationError(
+                    "Format de fichier inconnu, précisez file_format (csv ou jsonl)."
+                )
+        return data
+
+
+class ProgressRecordExportSerializer(serializers.Serializer):
+    """
+    Serializer pour les paramètres de l'export de l'historique
+    """
+
+    file_format = serializers.ChoiceField(choices=["csv", "ndjson"], default="csv")
+    gzip = serializers.BooleanField(default=False)
+
+
 class ContactFormSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=100)
     email = serializers.EmailField()
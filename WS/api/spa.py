@@ -0,0 +1,107 @@
+"""
+Coquille de la SPA (index.html) servie depuis la mémoire.
+
+Le fichier produit par Vite ne contient aucune balise de template : il est lu et
+compressé (gzip, brotli si disponible) une seule fois par processus, puis servi avec
+un ETag fort. La coquille référence des assets hachés (cache permanent) : elle-même
+est revalidée à chaque chargement, ce qui coûte un 304 sans corps.
+"""
+
+import gzip
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:  # Variante brotli facultative, comme pour WhiteNoise
+    brotli = None
+
+# Encodages proposés, par ordre de préférence
+ENCODINGS = ("br", "gzip")
+REFUSED = re.compile(r";\s*q=0(\.0*)?\s*$")
+
+
+class Shell:
+    __slots__ = ("path", "mtime", "digest", "variants")
+
+    def __init__(self, path: str, mtime: float, content: bytes):
+        self.path = path
+        self.mtime = mtime
+        self.digest = hashlib.sha256(content).hexdigest()[:32]
+        self.variants = {"identity": content, "gzip": gzip.compress(content, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(content)
+
+    def etag(self, encoding: str) -> str:
+        # Un ETag par représentation, comme les serveurs qui précompressent
+        if encoding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+
+_shell: Shell | None = None
+
+
+def get_shell() -> Shell:
+    """
+    Coquille en mémoire ; relue si le chemin change, ou si le fichier change en DEBUG.
+    """
+    global _shell
+    path = str(settings.SPA_INDEX_FILE)
+    shell = _shell
+    if shell is not None and shell.path == path and not settings.DEBUG:
+        return shell
+    try:
+        mtime = os.stat(path).st_mtime
+        if shell is None or shell.path != path or shell.mtime != mtime:
+            with open(path, "rb") as index:
+                shell = _shell = Shell(path, mtime, index.read())
+    except FileNotFoundError:
+        raise Http404("Interface non construite (UI/dist/index.html).")
+    return shell
+
+
+def negotiate(request, variants: dict) -> str:
+    accepted = {
+        part.split(";")[0].strip()
+        for part in request.headers.get("Accept-Encoding", "").split(",")
+        if not REFUSED.search(part)
+    }
+    for encoding in ENCODINGS:
+        if encoding in variants and encoding in accepted:
+            return encoding
+    return "identity"
+
+
+@require_safe
+def spa_shell(request):
+    shell = get_shell()
+    encoding = negotiate(request, shell.variants)
+    etag = shell.etag(encoding)
+
+    # Toutes les représentations ont le même contenu : n'importe lequel de nos
+    # ETags suffit à revalider
+    known = {shell.etag(name) for name in shell.variants}
+    client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+    if "*" in client_etags or known.intersection(
+        tag.removeprefix("W/") for tag in client_etags
+    ):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(
+            shell.variants[encoding], content_type="text/html; charset=utf-8"
+        )
+        if encoding != "identity":
+            response["Content-Encoding"] = encoding
+        response["Content-Length"] = str(len(shell.variants[encoding]))
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
@@ -0,0 +1,24 @@
+import re
+
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+# Fichiers de UI/dist/assets nommés par Vite : <nom>-<hash de 8 caractères>.<ext>
+VITE_ASSET = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8}\.\w+$")
+# Coquille de la SPA, servie par api.spa sous son nom d'origine
+UNHASHED_FILES = {"index.html"}
+
+
+class SPAStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    collectstatic : noms hachés dans le manifest et variantes gzip/brotli
+    précompressées à côté de chaque fichier.
+    Les assets déjà hachés par Vite gardent leur nom : index.html et les imports
+    dynamiques les référencent tels quels.
+    """
+
+    manifest_strict = False
+
+    def hashed_name(self, name, content=None, filename=None):
+        if name in UNHASHED_FILES or VITE_ASSET.match(name):
+            return name
+        return super().hashed_name(name, content, filename)
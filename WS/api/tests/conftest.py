@@ -1,9 +1,18 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Le cache locmem survit d'un test à l'autre, contrairement à la base
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def test_user(db):
     return User.objects.create_user(
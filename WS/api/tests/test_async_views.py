@@ -0,0 +1,233 @@
+import asyncio
+import datetime
+
+import pytest
+from api.authentication import add_user_claims, user_cache
+from api.models import CustomUser, EmailOutbox, EmailVerificationCode, ProgressRecord
+from api.views import ProgressRecordsView
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient, RequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+# Les vues async sont montées sans le préfixe /api/ par api.async_urls
+pytestmark = pytest.mark.urls("api.async_urls")
+
+
+def run(coroutine_function):
+    return async_to_sync(coroutine_function)()
+
+
+@pytest.fixture
+def user(db):
+    user = CustomUser.objects.create_user(
+        email="async@test.com", username="async@test.com", password="password"
+    )
+    for i in range(3):
+        ProgressRecord.objects.create(
+            user=user,
+            date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i),
+            weight_kg=80,
+            height_cm=180,
+            imc=24.7,
+            bmr=1800,
+            tdee=2700,
+            calories_recommandees=2700,
+        )
+    return user
+
+
+def authenticated(client, user):
+    client.cookies["access_token"] = str(AccessToken.for_user(user))
+    return client
+
+
+# Test que la liste async renvoie les mêmes octets que la vue DRF
+@pytest.mark.django_db
+def test_async_progress_records_matches_sync(user, settings):
+    # Aucune liste en cache : chaque vue calcule sa propre réponse
+    settings.RECORDS_CACHE_TIMEOUT = 0
+    cache.clear()
+    request = RequestFactory().get("/api/progress-records/")
+    request.COOKIES["access_token"] = str(AccessToken.for_user(user))
+    sync_response = ProgressRecordsView.as_view()(request)
+
+    async def scenario():
+        client = authenticated(AsyncClient(), user)
+        page = await client.get("/progress-records/", {"limit": 2})
+        return await client.get("/progress-records/"), page
+
+    response, page = run(scenario)
+
+    assert sync_response.status_code == 200
+    assert response.status_code == 200
+    assert sync_response["X-Cache"] == response["X-Cache"] == "MISS"
+    assert response.content == sync_response.content
+    assert len(response.json()) == 3
+    assert response["ETag"]
+    assert len(page.json()["results"]) == 2 and page.json()["next_cursor"]
+
+
+# Test du 401 et de la vérification d'authentification sans cookie
+@pytest.mark.django_db
+def test_async_views_unauthenticated():
+    async def scenario():
+        client = AsyncClient()
+        return (
+            await client.get("/progress-records/"),
+            await client.get("/check-authentication/"),
+        )
+
+    records, check = run(scenario)
+
+    assert records.status_code == 401
+    assert check.json() == {"authenticated": False}
+
+
+# Test que le JSON indenté est délégué à la vue DRF
+@pytest.mark.django_db
+def test_async_progress_records_delegates_other_renderers(user):
+    async def scenario():
+        return await authenticated(AsyncClient(), user).get(
+            "/progress-records/", headers={"Accept": "application/json; indent=4"}
+        )
+
+    response = run(scenario)
+
+    assert response.status_code == 200
+    assert b"\n    " in response.content
+    assert "X-Cache" not in response
+
+
+# Test de l'envoi et de la vérification d'un code par les vues async
+@pytest.mark.django_db
+def test_async_send_and_verify_code():
+    async def scenario():
+        client = AsyncClient()
+        sent = await client.post(
+            "/send-code-registration/",
+            {"email": "new@test.com"},
+            content_type="application/json",
+        )
+        code = (await EmailVerificationCode.objects.aget(email="new@test.com")).code
+        verified = await client.post(
+            "/verify-code/", {"email": "new@test.com", "code": code}
+        )
+        return sent, verified
+
+    sent, verified = run(scenario)
+
+    assert sent.json()["message"] == "Code envoyé avec succès."
+    assert verified.json()["data"] == {"valid": True}
+    assert EmailOutbox.objects.filter(to_email="new@test.com").exists()
+
+
+# Test des erreurs de validation identiques aux vues DRF
+@pytest.mark.django_db
+def test_async_send_code_errors(user):
+    async def scenario():
+        client = AsyncClient()
+        taken = await client.post(
+            "/send-code-registration/", {"email": "async@test.com"}
+        )
+        unknown = await client.post(
+            "/send-code-reset-password/", {"email": "nobody@test.com"}
+        )
+        return taken, unknown
+
+    taken, unknown = run(scenario)
+
+    assert taken.status_code == 400
+    assert taken.json()["errors"]["email"] == [
+        "Il existe déjà un utilisateur avec ce mail."
+    ]
+    assert unknown.json()["errors"]["email"] == ["Aucun utilisateur avec cet email."]
+
+
+# Test de la limite de débit sur les vues async
+@pytest.mark.django_db
+def test_async_contact_throttled(settings):
+    settings.DEFAULT_FROM_EMAIL = "contact@test.com"
+    settings.RATE_LIMITS = {"contact": {"ip": "1/min"}}
+    payload = {"name": "A", "email": "a@test.com", "message": "Bonjour"}
+
+    async def scenario():
+        client = AsyncClient()
+        return [await client.post("/contact/", payload) for _ in range(2)]
+
+    first, second = run(scenario)
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert second["Retry-After"] == "60"
+
+
+# Test qu'un JSON invalide renvoie la même erreur 400 que les vues DRF
+@pytest.mark.django_db
+def test_async_views_malformed_json():
+    async def scenario():
+        return await AsyncClient().post(
+            "/verify-code/", b'{"email": ', content_type="application/json"
+        )
+
+    response = run(scenario)
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("JSON parse error - ")
+
+
+# Test qu'un corps JSON qui n'est pas un objet est refusé au lieu de devenir {}
+@pytest.mark.django_db
+@pytest.mark.parametrize("body", [b'["a@test.com"]', b'"a@test.com"', b"42"])
+def test_async_views_json_not_an_object(body):
+    async def scenario():
+        return await AsyncClient().post(
+            "/send-code-registration/", body, content_type="application/json"
+        )
+
+    response = run(scenario)
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("JSON parse error - ")
+    assert not EmailOutbox.objects.exists()
+
+
+# Test que la limite de débit lit le cache hors de la boucle d'événements
+@pytest.mark.django_db
+def test_async_throttle_runs_outside_event_loop(monkeypatch):
+    calls = []
+
+    def check_rate_limit(scope, ident, email=None):
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        calls.append((scope, email))
+        return 0
+
+    monkeypatch.setattr("api.async_views.check_rate_limit", check_rate_limit)
+
+    async def scenario():
+        return await AsyncClient().post(
+            "/verify-code/", {"email": "a@test.com", "code": "123456"}
+        )
+
+    assert run(scenario).status_code == 200
+    assert calls == [("verify_code", "a@test.com")]
+
+
+# Test qu'un compte supprimé n'est plus authentifié par les vues async
+@pytest.mark.django_db
+def test_async_deleted_user_is_unauthenticated(user, settings):
+    settings.AUTH_USER_CACHE = True
+    user_cache.clear()
+    user.gender = "H"
+    user.birth_date = datetime.date(1990, 1, 1)
+    token = str(add_user_claims(AccessToken.for_user(user), user))
+    user.delete()
+    user_cache.clear()
+
+    async def scenario():
+        client = AsyncClient()
+        client.cookies["access_token"] = token
+        return await client.get("/check-authentication/")
+
+    assert run(scenario).json() == {"authenticated": False}
@@ -1,8 +1,12 @@
+import datetime
+import time
+
 import pytest
-from api.authentication import CookieJWTAuthentication
+from api.authentication import CookieJWTAuthentication, add_user_claims, user_cache
+from api.checks import check_shared_cache
 from api.models import CustomUser
 from rest_framework.request import Request
-from rest_framework.test import APIRequestFactory
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework_simplejwt.tokens import AccessToken
 
 
@@ -32,3 +36,147 @@ def test_authenticate_with_no_cookie_token():
     authentication = CookieJWTAuthentication()
     result = authentication.authenticate(request)
     assert result is None
+
+
+# Mode sans requête : claims signés + cache LRU du processus
+@pytest.mark.django_db
+def test_authenticate_with_user_cache_makes_no_query(
+    settings, django_assert_num_queries
+):
+    settings.AUTH_USER_CACHE = True
+    user_cache.clear()
+    user = CustomUser.objects.create_user(
+        email="cache@test.com",
+        username="cache@test.com",
+        password="test",
+        gender="F",
+        birth_date=datetime.date(1995, 3, 2),
+    )
+    token = str(add_user_claims(AccessToken.for_user(user), user))
+    factory = APIRequestFactory()
+    request = Request(factory.get("/"))
+    request.COOKIES["access_token"] = token
+
+    with django_assert_num_queries(0):
+        result = CookieJWTAuthentication().authenticate(request)
+
+    assert result is not None
+    assert result[0].pk == user.pk
+    assert result[0].birth_date == datetime.date(1995, 3, 2)
+
+
+# Un token sans claims passe par la base une seule fois puis par le cache
+@pytest.mark.django_db
+def test_authenticate_with_user_cache_without_claims(
+    settings, django_assert_num_queries
+):
+    settings.AUTH_USER_CACHE = True
+    user_cache.clear()
+    user = CustomUser.objects.create_user(
+        email="legacy@test.com", username="legacy@test.com", password="test"
+    )
+    token = str(AccessToken.for_user(user))
+    factory = APIRequestFactory()
+    request = Request(factory.get("/"))
+    request.COOKIES["access_token"] = token
+
+    with django_assert_num_queries(1):
+        CookieJWTAuthentication().authenticate(request)
+    with django_assert_num_queries(0):
+        result = CookieJWTAuthentication().authenticate(request)
+    assert result is not None and result[0] == user
+
+
+# La modification du profil invalide le cache et renvoie des claims à jour
+@pytest.mark.django_db
+def test_profile_update_invalidates_user_cache(settings):
+    settings.AUTH_USER_CACHE = True
+    user_cache.clear()
+    user = CustomUser.objects.create_user(
+        email="profile@test.com",
+        username="profile@test.com",
+        password="test",
+        first_name="Old",
+    )
+    client = APIClient()
+    client.cookies["access_token"] = str(
+        add_user_claims(AccessToken.for_user(user), user)
+    )
+
+    response = client.patch("/api/profile/", {"first_name": "New"})
+    assert response.status_code == 200
+    assert user_cache.get(user.pk) is None
+    user.refresh_from_db()
+    assert user.check_password("test")
+
+    new_token = AccessToken(response.cookies["access_token"].value)
+    assert new_token["first_name"] == "New"
+
+
+# Un compte supprimé perd l'accès même avec un token dont les claims suffisent
+@pytest.mark.django_db
+def test_deleted_user_token_is_revoked(settings):
+    settings.AUTH_USER_CACHE = True
+    user_cache.clear()
+    user = CustomUser.objects.create_user(
+        email="deleted@test.com",
+        username="deleted@test.com",
+        password="test",
+        gender="F",
+        birth_date=datetime.date(1995, 3, 2),
+    )
+    token = str(add_user_claims(AccessToken.for_user(user), user))
+    client = APIClient()
+    client.cookies["access_token"] = token
+
+    assert client.get("/api/progress-records/").status_code == 200
+    assert client.delete("/api/delete-account/").status_code == 200
+    user_cache.clear()  # Comme dans un autre worker
+
+    response = client.post("/api/calculate-calories/", {"weight_kg": 70})
+    assert response.status_code == 401
+
+
+# Un compte désactivé perd l'accès, un token émis après réactivation est accepté
+@pytest.mark.django_db
+def test_deactivated_user_token_is_revoked(settings, monkeypatch):
+    settings.AUTH_USER_CACHE = True
+    user_cache.clear()
+    user = CustomUser.objects.create_user(
+        email="inactive@test.com", username="inactive@test.com", password="test"
+    )
+    now = time.time()
+    token = add_user_claims(AccessToken.for_user(user), user)
+    token["iat"] = int(now) - 10
+    factory = APIRequestFactory()
+    request = Request(factory.get("/"))
+    request.COOKIES["access_token"] = str(token)
+    authentication = CookieJWTAuthentication()
+    assert authentication.authenticate(request) is not None
+
+    # Désactivation avant l'émission du prochain token
+    with monkeypatch.context() as patch:
+        patch.setattr(time, "time", lambda: now - 5)
+        user.is_active = False
+        user.save()
+    assert authentication.authenticate(request) is None
+
+    user.is_active = True
+    user.save()
+    assert authentication.authenticate(request) is None
+    request.COOKIES["access_token"] = str(
+        add_user_claims(AccessToken.for_user(user), user)
+    )
+    assert authentication.authenticate(request) is not None
+
+
+# Sans cache partagé, AUTH_USER_CACHE est refusé hors DEBUG
+def test_auth_user_cache_requires_shared_cache(settings):
+    settings.DEBUG = False
+    settings.AUTH_USER_CACHE = True
+
+    assert "api.E001" in [error.id for error in check_shared_cache(None)]
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}
+    }
+    assert check_shared_cache(None) == []
@@ -0,0 +1,20 @@
+import gc
+import sys
+
+from api.boot import STEPS, freeze_heap, warm_up
+
+
+# Test du préchauffage : toutes les étapes chargent sans erreur
+def test_warm_up():
+    timings = warm_up()
+
+    assert list(timings) == list(STEPS)
+    assert "api.views" in sys.modules
+
+
+# Test du gel du tas avant le fork
+def test_freeze_heap():
+    try:
+        assert freeze_heap() > 0
+    finally:
+        gc.unfreeze()
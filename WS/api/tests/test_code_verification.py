@@ -1,7 +1,9 @@
 import datetime
 
 import pytest
+from api.checks import check_shared_cache
 from api.models import CustomUser, EmailVerificationCode
+from api.verification_codes import get_code, store_code
 from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.test import APIClient
@@ -152,3 +154,74 @@ def test_reset_password_success():
         response.data
         and response.data["message"] == "Mot de passe mis à jour avec succès"
     )
+
+
+# Test que l'envoi d'un nouveau code purge les codes expirés
+@pytest.mark.django_db
+def test_store_code_purges_expired_codes():
+    old = EmailVerificationCode.objects.create(email="old@test.com", code="123456")
+    EmailVerificationCode.objects.filter(pk=old.pk).update(
+        created_at=timezone.now() - datetime.timedelta(minutes=11)
+    )
+
+    store_code("new@test.com", "654321")
+
+    assert list(EmailVerificationCode.objects.values_list("email", flat=True)) == [
+        "new@test.com"
+    ]
+
+
+# Test de la vérification avec le stockage en cache, sans table
+@pytest.mark.django_db
+def test_verify_code_cache_store(settings):
+    settings.VERIFICATION_CODE_STORE = "cache"
+    client = APIClient()
+
+    client.post("/api/send-code-registration/", {"email": "cache@test.com"})
+    code = get_code("cache@test.com").code
+    response = client.post(
+        "/api/verify-code/", {"email": "cache@test.com", "code": code}
+    )
+
+    assert not EmailVerificationCode.objects.exists()
+    assert response.data["data"]["valid"] is True
+
+
+# Test qu'un code en cache au-delà de sa validité est signalé expiré
+@pytest.mark.django_db
+def test_verify_code_cache_store_expired(settings, monkeypatch):
+    settings.VERIFICATION_CODE_STORE = "cache"
+    store_code("late@test.com", "111111")
+    later = timezone.now() + datetime.timedelta(minutes=11)
+    monkeypatch.setattr("api.models.timezone.now", lambda: later)
+
+    response = APIClient().post(
+        "/api/verify-code/", {"email": "late@test.com", "code": "111111"}
+    )
+
+    assert response.data["message"] == "Code expiré"
+
+
+# Test que l'adresse est normalisée de la même façon à l'envoi et à la vérification
+@pytest.mark.django_db
+@pytest.mark.parametrize("store", ["db", "cache"])
+def test_verify_code_ignores_email_case(settings, store):
+    settings.VERIFICATION_CODE_STORE = store
+    store_code("Mixed.Case@Test.com", "222222")
+
+    response = APIClient().post(
+        "/api/verify-code/", {"email": "mixed.case@test.com", "code": "222222"}
+    )
+
+    assert response.data["data"]["valid"] is True
+    assert get_code("MIXED.CASE@TEST.COM").code == "222222"
+
+
+# Test que le stockage en cache est refusé sans cache partagé hors DEBUG
+def test_cache_store_requires_shared_cache(settings):
+    settings.DEBUG = False
+    settings.VERIFICATION_CODE_STORE = "cache"
+
+    assert "api.E002" in [error.id for error in check_shared_cache(None)]
+    settings.VERIFICATION_CODE_STORE = "db"
+    assert "api.E002" not in [error.id for error in check_shared_cache(None)]
@@ -0,0 +1,48 @@
+import pytest
+from api.db_pool import pool_stats, summarize_pool_stats
+from api.models import CustomUser
+from rest_framework.test import APIClient
+
+
+# Test de la mise en forme des statistiques de psycopg_pool
+def test_summarize_pool_stats():
+    stats = summarize_pool_stats(
+        {
+            "pool_min": 2,
+            "pool_max": 10,
+            "pool_size": 4,
+            "pool_available": 1,
+            "requests_num": 8,
+            "requests_wait_ms": 20,
+            "requests_errors": 1,
+        }
+    )
+
+    assert stats["in_use"] == 3
+    assert stats["utilization"] == 0.3
+    assert stats["checkout_wait_ms_avg"] == 2.5
+    assert stats["checkout_timeouts"] == 1
+    assert stats["requests_waiting"] == 0
+
+
+# Test du mode sans pool
+@pytest.mark.django_db
+def test_pool_stats_off(settings):
+    settings.DB_POOL = "off"
+
+    assert pool_stats() == {"mode": "off"}
+
+
+# Test que les statistiques du pool sont réservées aux admins
+@pytest.mark.django_db
+def test_db_pool_stats_view_admin_only():
+    user = CustomUser.objects.create_user(
+        email="admin@test.com", username="admin@test.com", password="password"
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+
+    assert client.get("/api/db-pool-stats/").status_code == 403
+    user.is_staff = True
+    user.save()
+    assert client.get("/api/db-pool-stats/").json()["mode"] == "off"
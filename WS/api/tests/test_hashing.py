@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+from api.hashing import HashingExecutor, HashingUnavailable, check_user_password
+from api.models import CustomUser
+from django.contrib.auth.hashers import make_password
+
+
+def test_executor_runs_and_reports_stats():
+    executor = HashingExecutor(workers=1, max_pending=2, queue_timeout=1)
+    assert executor.run(make_password, "secret").startswith("pbkdf2_sha256$")
+    stats = executor.stats()
+    assert stats["completed"] == 1
+    assert stats["in_flight"] == 0
+
+
+# Au-delà de max_pending, refus immédiat sans attendre
+def test_executor_rejects_when_full():
+    executor = HashingExecutor(workers=1, max_pending=1, queue_timeout=1)
+    release = threading.Event()
+    future = executor.submit(release.wait)
+    try:
+        with pytest.raises(HashingUnavailable):
+            executor.run(make_password, "secret")
+        assert executor.stats()["rejected"] == 1
+        assert executor.stats()["in_flight"] == 1
+    finally:
+        release.set()
+        future.result()
+
+
+# Une tâche qui n'a pas démarré à temps est annulée
+def test_executor_queue_timeout():
+    executor = HashingExecutor(workers=1, max_pending=4, queue_timeout=0.05)
+    release = threading.Event()
+    future = executor.submit(release.wait)
+    try:
+        with pytest.raises(HashingUnavailable):
+            executor.run(make_password, "secret")
+        assert executor.stats()["timeouts"] == 1
+    finally:
+        release.set()
+        future.result()
+
+
+# Le hash PBKDF2 est recalculé en Argon2 à la connexion quand Argon2 devient le défaut
+@pytest.mark.django_db
+def test_login_rehashes_with_argon2(settings):
+    user = CustomUser.objects.create_user(
+        email="argon@test.com", username="argon@test.com", password="password"
+    )
+    assert user.password.startswith("pbkdf2_sha256$")
+
+    settings.PASSWORD_HASHERS = [
+        "api.hashing.TunableArgon2PasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    ]
+    assert check_user_password(user, "password")
+    user.refresh_from_db()
+    assert user.password.startswith("argon2$")
+    assert check_user_password(user, "password")
+    assert not check_user_password(user, "wrong")
@@ -0,0 +1,184 @@
+import datetime
+import io
+
+import pytest
+from api.imports import DEFAULT_CHUNK_SIZE, import_progress_records
+from api.models import CustomUser, ProgressRecord, ProgressRollup
+from api.rollups import find_rollup_drift
+from api.utils import calculs_calories_batch
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def import_user(db):
+    return CustomUser.objects.create_user(
+        email="import@test.com",
+        username="import@test.com",
+        password="password",
+        gender="F",
+        birth_date=datetime.date(1990, 6, 15),
+    )
+
+
+def late_decode_error_csv(rows: int = 600) -> bytes:
+    """
+    CSV valide sur plus d'un bloc d'import et du tampon de lecture, puis un octet
+    non UTF-8.
+    """
+    header = "date,weight_kg,height_cm,activity_level,goal\n"
+    start = datetime.date(2023, 1, 1)
+    lines = "".join(
+        f"{start + datetime.timedelta(days=i)},70,165,leger,perte\n"
+        for i in range(rows)
+    )
+    return (header + lines).encode() + b"2024-09-01,70,165,l\xe9ger,perte\n"
+
+
+# Import CSV par petits blocs avec rapport d'erreurs par ligne
+@pytest.mark.django_db
+def test_import_csv_reports_row_errors(import_user):
+    content = (
+        "date,weight_kg,height_cm,activity_level,goal\n"
+        "2024-01-01,70,165,leger,perte\n"
+        "2024-01-02,-3,165,leger,perte\n"
+        "2024-01-03,69.5,165,inconnu,perte\n"
+        "2024-01-01,69,165,leger,perte\n"
+        "2024-01-04,69,165,,\n"
+    )
+    report = import_progress_records(
+        import_user, io.BytesIO(content.encode()), "csv", chunk_size=2
+    )
+
+    assert report["created"] == 2
+    assert report["error_count"] == 3
+    assert [error["line"] for error in report["errors"]] == [3, 4, 5]
+    assert "weight_kg" in report["errors"][0]["errors"]
+    assert "activity_level" in report["errors"][1]["errors"]
+    assert "date" in report["errors"][2]["errors"]
+    assert ProgressRecord.objects.filter(user=import_user).count() == 2
+
+    record = ProgressRecord.objects.get(user=import_user, date="2024-01-04")
+    assert record.activity_level == "modere"
+    assert record.goal == "maintien"
+    assert record.imc == 25.34
+    assert ProgressRollup.objects.filter(user=import_user).count() == 2
+
+
+# Import JSONL via l'API
+@pytest.mark.django_db
+def test_import_jsonl_endpoint(import_user):
+    lines = [
+        '{"date": "2024-03-01", "weight_kg": 70, "height_cm": 165}',
+        "pas du json",
+        '{"date": "2024-03-02", "weight_kg": 69.8, "height_cm": 165, "goal": "prise"}',
+    ]
+    upload = SimpleUploadedFile("history.jsonl", "\n".join(lines).encode())
+
+    client = APIClient()
+    client.force_authenticate(import_user)
+    response = client.post(
+        "/api/progress-records/import/", {"file": upload}, format="multipart"
+    )
+
+    assert isinstance(response, Response)
+    assert response.status_code == 201
+    assert response.data is not None
+    assert response.data["data"]["created"] == 2
+    assert response.data["data"]["errors"][0]["line"] == 2
+    assert ProgressRecord.objects.filter(user=import_user).count() == 2
+
+
+@pytest.mark.django_db
+def test_import_unknown_extension(import_user):
+    upload = SimpleUploadedFile("history.txt", b"")
+
+    client = APIClient()
+    client.force_authenticate(import_user)
+    response = client.post(
+        "/api/progress-records/import/", {"file": upload}, format="multipart"
+    )
+
+    assert isinstance(response, Response)
+    assert response.status_code == 400
+
+
+# Une erreur d'encodage en cours de fichier laisse agrégats et révision à jour
+@pytest.mark.django_db
+def test_import_decode_error_keeps_rollups_in_sync(import_user):
+    revision = import_user.records_revision
+
+    report = import_progress_records(
+        import_user, io.BytesIO(late_decode_error_csv()), "csv", chunk_size=50
+    )
+
+    created = ProgressRecord.objects.filter(user=import_user).count()
+    import_user.refresh_from_db()
+    assert report["created"] == created > 0
+    assert report["errors"][-1] == {
+        "line": None,
+        "errors": {"file": ["Le fichier doit être encodé en UTF-8."]},
+    }
+    assert import_user.records_revision == revision + 1
+    assert find_rollup_drift(import_user) == []
+
+
+# Via l'API : compte rendu habituel avec les lignes créées, refus si rien n'est écrit
+@pytest.mark.django_db
+def test_import_endpoint_decode_error_after_first_chunk(import_user):
+    client = APIClient()
+    client.force_authenticate(import_user)
+
+    response = client.post(
+        "/api/progress-records/import/",
+        {"file": SimpleUploadedFile("late.csv", late_decode_error_csv())},
+        format="multipart",
+    )
+    assert response.status_code == 201
+    data = response.json()["data"]
+    # Premier bloc (DEFAULT_CHUNK_SIZE lignes) enregistré avant l'octet invalide
+    assert data["created"] == DEFAULT_CHUNK_SIZE
+    assert data["errors"] == [
+        {"line": None, "errors": {"file": ["Le fichier doit être encodé en UTF-8."]}}
+    ]
+
+    response = client.post(
+        "/api/progress-records/import/",
+        {"file": SimpleUploadedFile("bad.csv", b"date,weight_kg\n\xe9,70\n")},
+        format="multipart",
+    )
+    assert response.status_code == 400
+    assert ProgressRecord.objects.filter(user=import_user).count() == DEFAULT_CHUNK_SIZE
+
+
+# Une date insérée en parallèle devient une erreur de ligne, pas une erreur 500
+@pytest.mark.django_db
+def test_import_concurrent_insert_reported_as_row_error(import_user, monkeypatch):
+    def insert_concurrently(*args):
+        ProgressRecord.objects.create(
+            user=import_user,
+            date=datetime.date(2024, 1, 2),
+            weight_kg=70,
+            height_cm=165,
+            activity_level="leger",
+            goal="perte",
+            imc=25.7,
+            bmr=1400,
+            tdee=1900,
+            calories_recommandees=1500,
+        )
+        return calculs_calories_batch(*args)
+
+    monkeypatch.setattr("api.imports.calculs_calories_batch", insert_concurrently)
+    content = (
+        "date,weight_kg,height_cm,activity_level,goal\n"
+        "2024-01-01,70,165,leger,perte\n"
+        "2024-01-02,69,165,leger,perte\n"
+    )
+
+    report = import_progress_records(import_user, io.BytesIO(content.encode()), "csv")
+
+    assert report["created"] == 1
+    assert [error["line"] for error in report["errors"]] == [3]
+    assert find_rollup_drift(import_user) == []
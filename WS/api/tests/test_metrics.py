@@ -0,0 +1,181 @@
+import json
+import os
+
+import pytest
+from api import metrics
+from api.models import CustomUser
+from asgiref.sync import async_to_sync
+from django.http import StreamingHttpResponse
+from django.test import AsyncClient, Client
+from django.urls import path
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    metrics.registry.reset()
+    yield metrics.registry
+    metrics.registry.reset()
+
+
+# Test de la mesure par route : statut, requêtes SQL et taille de la réponse
+@pytest.mark.django_db
+def test_metrics_middleware_records_route():
+    user = CustomUser.objects.create_user(
+        email="metrics@test.com", username="metrics@test.com", password="password"
+    )
+    client = Client()
+    client.cookies["access_token"] = str(AccessToken.for_user(user))
+    client.get("/api/progress-records/")
+    client.get("/api/progress-records/")
+
+    route = ("api/progress-records/", "GET")
+    assert metrics.registry.requests[route + ("200",)] == 2
+    assert metrics.registry.queries[route] > 0
+    assert sum(metrics.registry.latency[route][:-1]) == 2
+    assert metrics.registry.response_bytes[route] > 0
+
+
+# Test du comptage des requêtes SQL pendant une requête HTTP seulement
+@pytest.mark.django_db
+def test_query_counting_scoped_to_request():
+    CustomUser.objects.count()
+    token = metrics.start_request()
+    CustomUser.objects.count()
+    CustomUser.objects.exists()
+    stats = metrics.finish_request(token)
+
+    assert stats.queries == 2
+    assert stats.query_seconds > 0
+
+
+# Test de l'attribution des sections coûteuses à la route ou au travail de fond
+def test_timed_section():
+    with metrics.timed_section("email"):
+        pass
+    token = metrics.start_request()
+    with metrics.timed_section("password_hashing"):
+        pass
+    stats = metrics.finish_request(token)
+
+    assert metrics.registry.sections[("background", "email")][0] == 1
+    assert "password_hashing" in stats.sections
+
+
+# Test de l'exposition Prometheus et du jeton d'accès
+@pytest.mark.django_db
+def test_metrics_endpoint(settings):
+    settings.METRICS_TOKEN = "secret"
+    client = Client()
+    client.get("/api/check-authentication/")
+
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = response.content.decode()
+    assert (
+        'http_requests_total{route="api/check-authentication/",method="GET",status="200"} 1'
+        in body
+    )
+    assert (
+        'http_request_duration_seconds_bucket{route="api/check-authentication/"' in body
+    )
+    assert "# TYPE password_hashing_in_flight gauge" in body
+    assert "# TYPE records_cache_hits_total counter" in body
+    assert "# TYPE throttle_shed_total counter" in body
+
+
+# Test de l'accès : sans jeton l'endpoint n'existe pas hors DEBUG
+@pytest.mark.django_db
+def test_metrics_endpoint_requires_token(settings):
+    settings.METRICS_TOKEN = ""
+    settings.DEBUG = False
+    client = Client()
+
+    assert client.get("/metrics").status_code == 404
+    settings.METRICS_TOKEN = "secret"
+    assert (
+        client.get("/metrics", headers={"Authorization": "Bearer secreT"}).status_code
+        == 401
+    )
+
+
+# Test de l'agrégation des workers : compteurs des instantanés, jauges des vivants
+@pytest.mark.django_db
+def test_metrics_shared_across_workers(settings, tmp_path):
+    settings.METRICS_TOKEN = "secret"
+    settings.METRICS_DIR = str(tmp_path)
+    other = metrics.Registry()
+    other.requests[("api/check-authentication/", "GET", "200")] = 5
+    dead_pid = 2**22 + 1
+    snapshot = other.snapshot()
+    snapshot.update(pid=dead_pid, gauges={"db_pool_size": ["Pool size.", 4]})
+    (tmp_path / f"{dead_pid}.json").write_text(json.dumps(snapshot))
+    client = Client()
+    client.get("/api/check-authentication/")
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+
+    body = response.content.decode()
+    assert (
+        'http_requests_total{route="api/check-authentication/",method="GET",status="200"} 6'
+        in body
+    )
+    assert f'password_hashing_in_flight{{pid="{os.getpid()}"}}' in body
+    assert f'pid="{dead_pid}"' not in body
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+
+
+# Test des requêtes SQL faites pendant l'itération d'une réponse en streaming
+@pytest.mark.django_db
+def test_streaming_response_queries_counted():
+    user = CustomUser.objects.create_user(
+        email="export@test.com", username="export@test.com", password="password"
+    )
+    client = Client()
+    client.cookies["access_token"] = str(AccessToken.for_user(user))
+    response = client.get("/api/progress-records/export/")
+
+    route = ("api/progress-records/export/", "GET")
+    assert route + ("200",) not in metrics.registry.requests
+    content = b"".join(response.streaming_content)
+
+    assert metrics.registry.requests[route + ("200",)] == 1
+    # Authentification pendant la vue, lecture des lignes pendant le streaming
+    assert metrics.registry.queries[route] == 2
+    assert metrics.registry.response_bytes[route] == len(content)
+
+
+async def async_stream_view(request):
+    async def content():
+        yield b"users="
+        yield str(await CustomUser.objects.acount()).encode()
+
+    return StreamingHttpResponse(content())
+
+
+urlpatterns = [path("stream/", async_stream_view)]
+
+
+# Test d'une réponse en streaming asynchrone (ASGI) : comptée à sa fermeture
+@pytest.mark.django_db
+@pytest.mark.urls(__name__)
+def test_async_streaming_response_counted():
+    async def scenario():
+        response = await AsyncClient().get("/stream/")
+        route = ("stream/", "GET")
+        counted_before = route + ("200",) in metrics.registry.requests
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        return counted_before, content
+
+    counted_before, content = async_to_sync(scenario)()
+
+    route = ("stream/", "GET")
+    assert not counted_before
+    assert content == b"users=0"
+    assert metrics.registry.requests[route + ("200",)] == 1
+    assert metrics.registry.queries[route] == 1
+    assert metrics.registry.response_bytes[route] == len(content)
+    assert sum(metrics.registry.latency[route][:-1]) == 1
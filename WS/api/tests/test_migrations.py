@@ -0,0 +1,42 @@
+import datetime
+
+import pytest
+from api.models import CustomUser
+from api.rollups import find_rollup_drift, read_rollups
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE = [("api", "0006_verification_code_indexes")]
+AFTER = [("api", "0007_backfill_progress_rollups")]
+
+
+# Test que les enregistrements existants ont leurs agrégats après la migration
+@pytest.mark.django_db(transaction=True)
+def test_backfill_progress_rollups():
+    executor = MigrationExecutor(connection)
+    executor.migrate(BEFORE)
+    apps = executor.loader.project_state(BEFORE).apps
+    user = apps.get_model("api", "CustomUser").objects.create(
+        email="old@test.com", username="old@test.com"
+    )
+    for day, weight in ((1, 80.0), (2, 79.0), (9, 78.0)):
+        apps.get_model("api", "ProgressRecord").objects.create(
+            user_id=user.pk,
+            date=datetime.date(2024, 1, day),
+            weight_kg=weight,
+            height_cm=180,
+            activity_level="modere",
+            goal="perte",
+            imc=24.0,
+            bmr=1800,
+            tdee=2700,
+            calories_recommandees=2400,
+        )
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(AFTER)
+
+    user = CustomUser.objects.get(pk=user.pk)
+    assert find_rollup_drift(user) == []
+    assert [bucket["count"] for bucket in read_rollups(user, "month")] == [3]
+    assert len(read_rollups(user, "week")) == 2
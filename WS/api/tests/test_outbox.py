@@ -0,0 +1,198 @@
+import datetime
+import io
+import smtplib
+
+import pytest
+from api.models import EmailOutbox
+from api.outbox import SMTPConnection, drain_batch, enqueue_email, purge_sent
+from benchmarks.smtp_sink import SMTPSink
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+
+class FakeSMTP:
+    """
+    Serveur SMTP factice : garde les messages envoyés, peut échouer sur demande.
+    """
+
+    instances: list = []
+    fail_with = None
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        FakeSMTP.instances.append(self)
+
+    def starttls(self, context=None):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, msg):
+        if FakeSMTP.fail_with is not None:
+            raise FakeSMTP.fail_with
+        self.sent.append(msg)
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.instances = []
+    FakeSMTP.fail_with = None
+    monkeypatch.setattr("smtplib.SMTP", FakeSMTP)
+    return FakeSMTP
+
+
+# Test que l'envoi d'un code passe par l'outbox au lieu d'un envoi direct
+@pytest.mark.django_db
+def test_send_code_writes_outbox():
+    response = APIClient().post(
+        "/api/send-code-registration/", {"email": "outbox@test.com"}
+    )
+
+    assert response.status_code == 200
+    email = EmailOutbox.objects.get(to_email="outbox@test.com")
+    assert email.status == "pending"
+    assert email.attempts == 0
+
+
+# Test qu'un lot est envoyé sur une seule connexion SMTP réutilisée
+@pytest.mark.django_db
+def test_drain_batch_reuses_connection(fake_smtp):
+    for i in range(5):
+        enqueue_email("Sujet", f"user{i}@test.com", "<p>Bonjour</p>")
+    connection = SMTPConnection()
+
+    counts = drain_batch(connection, batch_size=3)
+    counts_next = drain_batch(connection, batch_size=3)
+
+    assert counts["sent"] == 3 and counts_next["sent"] == 2
+    assert connection.opened == 1
+    assert len(fake_smtp.instances[0].sent) == 5
+    assert not EmailOutbox.objects.exclude(status="sent").exists()
+    assert EmailOutbox.objects.filter(sent_at__isnull=False).count() == 5
+
+
+# Test qu'un échec temporaire est retenté plus tard avec un délai croissant
+@pytest.mark.django_db
+def test_drain_batch_retries_with_backoff(fake_smtp, settings):
+    settings.EMAIL_OUTBOX_RETRY_DELAY = 10
+    email = enqueue_email("Sujet", "retry@test.com", "<p>Bonjour</p>")
+    fake_smtp.fail_with = smtplib.SMTPServerDisconnected("down")
+
+    counts = drain_batch(SMTPConnection(), max_attempts=3)
+
+    email.refresh_from_db()
+    assert counts["retried"] == 1
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert "SMTPServerDisconnected" in email.last_error
+    delay = (email.next_attempt_at - timezone.now()).total_seconds()
+    assert 5 < delay <= 10
+
+    # Pas encore dû : rien n'est repris
+    assert drain_batch(SMTPConnection()) == {"sent": 0, "retried": 0, "failed": 0}
+
+
+# Test qu'un email passe en échec après le nombre maximal de tentatives
+@pytest.mark.django_db
+def test_drain_batch_gives_up_after_max_attempts(fake_smtp):
+    email = enqueue_email("Sujet", "fail@test.com", "<p>Bonjour</p>")
+    EmailOutbox.objects.filter(pk=email.pk).update(attempts=2)
+    fake_smtp.fail_with = smtplib.SMTPDataError(451, b"try later")
+
+    counts = drain_batch(SMTPConnection(), max_attempts=3)
+
+    email.refresh_from_db()
+    assert counts["failed"] == 1
+    assert email.status == "failed"
+    assert email.attempts == 3
+
+
+# Test qu'un refus définitif (5xx) n'est pas retenté
+@pytest.mark.django_db
+def test_drain_batch_permanent_error(fake_smtp):
+    email = enqueue_email("Sujet", "bad@test.com", "<p>Bonjour</p>")
+    fake_smtp.fail_with = smtplib.SMTPRecipientsRefused(
+        {"bad@test.com": (550, b"no such user")}
+    )
+
+    drain_batch(SMTPConnection(), max_attempts=5)
+
+    email.refresh_from_db()
+    assert email.status == "failed"
+    assert email.attempts == 1
+
+
+# Test qu'un email réservé par un worker arrêté est repris à l'expiration du bail
+@pytest.mark.django_db
+def test_drain_batch_recovers_expired_lease(fake_smtp):
+    email = enqueue_email("Sujet", "lease@test.com", "<p>Bonjour</p>")
+    EmailOutbox.objects.filter(pk=email.pk).update(
+        status="sending", attempts=1, next_attempt_at=timezone.now()
+    )
+
+    counts = drain_batch(SMTPConnection())
+
+    email.refresh_from_db()
+    assert counts["sent"] == 1
+    assert email.status == "sent"
+    assert email.attempts == 2
+
+
+# Test de la commande worker en mode --once
+@pytest.mark.django_db
+def test_send_outbox_command_once(fake_smtp):
+    enqueue_email("Sujet", "cmd@test.com", "<p>Bonjour</p>")
+
+    call_command("send_outbox", "--once")
+
+    assert EmailOutbox.objects.get(to_email="cmd@test.com").status == "sent"
+
+
+# Test que le worker supprime les emails envoyés au-delà de la rétention
+@pytest.mark.django_db
+def test_send_outbox_purges_old_sent_emails(fake_smtp, settings):
+    settings.EMAIL_OUTBOX_RETENTION_DAYS = 7
+    old = timezone.now() - datetime.timedelta(days=8)
+    for status in ("sent", "failed"):
+        email = enqueue_email("Ancien", f"{status}@test.com", "<p>Bonjour</p>")
+        EmailOutbox.objects.filter(pk=email.pk).update(status=status, sent_at=old)
+    enqueue_email("Récent", "recent@test.com", "<p>Bonjour</p>")
+
+    call_command("send_outbox", "--once", stdout=io.StringIO())
+
+    assert sorted(EmailOutbox.objects.values_list("to_email", flat=True)) == [
+        "failed@test.com",
+        "recent@test.com",
+    ]
+    settings.EMAIL_OUTBOX_RETENTION_DAYS = 0
+    assert purge_sent() == 0
+
+
+# Test de bout en bout contre le serveur SMTP local, avec échecs simulés
+@pytest.mark.django_db
+def test_drain_batch_against_smtp_sink(settings):
+    with SMTPSink(failure_rate=0.5, seed=1) as sink:
+        settings.EMAIL_HOST = sink.host
+        settings.EMAIL_PORT = sink.port
+        settings.EMAIL_USE_TLS = False
+        settings.EMAIL_HOST_USER = ""
+        settings.DEFAULT_FROM_EMAIL = "noreply@test.com"
+        for i in range(10):
+            enqueue_email("Sujet", f"sink{i}@test.com", "<p>Bonjour</p>")
+        connection = SMTPConnection()
+
+        counts = drain_batch(connection, max_attempts=5)
+        connection.close()
+
+    assert counts["sent"] == len(sink.messages) == sink.stats["accepted"]
+    assert counts["retried"] == sink.stats["rejected"] > 0
+    assert sink.stats["connections"] == 1
+    assert EmailOutbox.objects.filter(status="pending").count() == counts["retried"]
@@ -0,0 +1,288 @@
+"""
+Nombre exact de requêtes SQL par vue et par chemin de serializer : un N+1 introduit
+plus tard (accès paresseux à une relation, requête par ligne) fait échouer ces tests,
+une optimisation aussi, pour que le nombre attendu reste à jour.
+Les listes portent sur RECORDS enregistrements, le nombre ne doit pas en dépendre.
+"""
+
+import datetime
+
+import pytest
+from api.models import CustomUser, EmailVerificationCode, ProgressRecord
+from api.rollups import rebuild_rollups
+from api.serializers import (
+    CaloriesRecordSerializer,
+    ProgressRecordSerializer,
+    RegisterSerializer,
+    UpdateProfileSerializer,
+)
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+RECORDS = 20
+
+
+@pytest.fixture(autouse=True)
+def budget_settings(settings):
+    settings.RATE_LIMIT_ENABLED = False
+    settings.EMAIL_OUTBOX = True
+    settings.DEFAULT_FROM_EMAIL = "noreply@test.com"
+
+
+@pytest.fixture
+def account(db):
+    user = CustomUser.objects.create_user(
+        email="budget@test.com",
+        username="budget@test.com",
+        password="password",
+        gender="H",
+        birth_date=datetime.date(1990, 1, 1),
+    )
+    start = datetime.date(2024, 1, 1)
+    ProgressRecord.objects.bulk_create(
+        ProgressRecord(
+            user=user,
+            date=start + datetime.timedelta(days=i),
+            weight_kg=80 - i * 0.1,
+            height_cm=180,
+            imc=24.7,
+            bmr=1800,
+            tdee=2700,
+            calories_recommandees=2400,
+        )
+        for i in range(RECORDS)
+    )
+    rebuild_rollups(user)
+    EmailVerificationCode.objects.create(email=user.email, code="123456")
+    return user
+
+
+def client_for(user=None) -> APIClient:
+    client = APIClient()
+    if user is not None:
+        refresh = RefreshToken.for_user(user)
+        client.cookies["access_token"] = str(refresh.access_token)
+        client.cookies["refresh_token"] = str(refresh)
+    return client
+
+
+def first_record(user) -> str:
+    return str(ProgressRecord.objects.filter(user=user).order_by("date").first().id)
+
+
+# (libellé, méthode, URL, données, format, authentifié, requêtes)
+VIEW_BUDGETS = [
+    (
+        "register",
+        "post",
+        "/api/register/",
+        {"email": "new@test.com", "password": "password", "first_name": "A"},
+        None,
+        False,
+        2,
+    ),
+    (
+        "login",
+        "post",
+        "/api/login/",
+        {"email": "budget@test.com", "password": "password"},
+        None,
+        False,
+        1,
+    ),
+    ("logout", "post", "/api/logout/", {}, None, True, 1),
+    ("check-authentication", "get", "/api/check-authentication/", None, None, True, 1),
+    ("refresh-access", "post", "/api/refresh-access/", {}, None, True, 1),
+    ("profile", "patch", "/api/profile/", {"first_name": "B"}, None, True, 3),
+    ("delete-account", "delete", "/api/delete-account/", None, None, True, 7),
+    (
+        "send-code-registration",
+        "post",
+        "/api/send-code-registration/",
+        {"email": "new@test.com"},
+        None,
+        False,
+        4,
+    ),
+    (
+        "send-code-reset-password",
+        "post",
+        "/api/send-code-reset-password/",
+        {"email": "budget@test.com"},
+        None,
+        False,
+        4,
+    ),
+    (
+        "verify-code",
+        "post",
+        "/api/verify-code/",
+        {"email": "budget@test.com", "code": "123456"},
+        None,
+        False,
+        1,
+    ),
+    (
+        "reset-password",
+        "post",
+        "/api/reset-password/",
+        {"email": "budget@test.com", "password": "newPassword"},
+        None,
+        False,
+        3,
+    ),
+    (
+        "calculate-calories",
+        "post",
+        "/api/calculate-calories/",
+        {
+            "weight_kg": 80,
+            "height_cm": 180,
+            "goal": "maintien",
+            "gender": "H",
+            "age": 30,
+            "activity_level": "modere",
+        },
+        None,
+        True,
+        8,
+    ),
+    ("progress-records", "get", "/api/progress-records/", None, None, True, 3),
+    (
+        "progress-records-page",
+        "get",
+        "/api/progress-records/?limit=5",
+        None,
+        None,
+        True,
+        3,
+    ),
+    (
+        "progress-record-patch",
+        "patch",
+        "/api/progress-records/{record}/",
+        {"weight_kg": 79},
+        None,
+        True,
+        8,
+    ),
+    (
+        "progress-record-delete",
+        "delete",
+        "/api/progress-records/{record}/",
+        None,
+        None,
+        True,
+        8,
+    ),
+    ("rollups", "get", "/api/progress-records/rollups/", None, None, True, 3),
+    ("export", "get", "/api/progress-records/export/", None, None, True, 2),
+    ("import", "post", "/api/progress-records/import/", "file", "multipart", True, 12),
+    (
+        "contact",
+        "post",
+        "/api/contact/",
+        {"name": "A", "email": "a@test.com", "message": "Bonjour"},
+        None,
+        False,
+        1,
+    ),
+]
+
+
+# Test du nombre de requêtes de chaque vue de api/views.py
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "label,method,url,data,data_format,authenticated,queries",
+    VIEW_BUDGETS,
+    ids=[case[0] for case in VIEW_BUDGETS],
+)
+def test_view_query_budget(
+    account,
+    django_assert_num_queries,
+    label,
+    method,
+    url,
+    data,
+    data_format,
+    authenticated,
+    queries,
+):
+    client = client_for(account if authenticated else None)
+    url = url.format(record=first_record(account))
+    if data == "file":
+        content = "\n".join(
+            f'{{"date": "2023-01-{day:02d}", "weight_kg": 70, "height_cm": 165}}'
+            for day in range(1, 11)
+        )
+        data = {"file": SimpleUploadedFile("history.jsonl", content.encode())}
+
+    with django_assert_num_queries(queries):
+        response = getattr(client, method)(url, data, format=data_format)
+        if response.streaming:
+            b"".join(response.streaming_content)
+
+    assert response.status_code < 400, response.content
+
+
+# Test du nombre de requêtes de la vue réservée aux administrateurs
+@pytest.mark.django_db
+def test_db_pool_stats_query_budget(django_assert_num_queries):
+    admin = CustomUser.objects.create_user(
+        email="admin@test.com",
+        username="admin@test.com",
+        password="password",
+        is_staff=True,
+    )
+    client = client_for(admin)
+
+    with django_assert_num_queries(1):
+        response = client.get("/api/db-pool-stats/")
+
+    assert response.status_code == 200
+
+
+# Test du nombre de requêtes des chemins de serializer qui écrivent en base
+@pytest.mark.django_db
+def test_serializer_query_budgets(account, django_assert_num_queries):
+    request = APIRequestFactory().post("/")
+    request.user = account
+
+    # Comme ProgressRecordsView.patch : l'utilisateur est chargé avec l'enregistrement
+    record = ProgressRecord.objects.select_related("user").filter(user=account).first()
+    serializer = ProgressRecordSerializer(
+        record, data={"goal": "prise"}, partial=True, context={"request": request}
+    )
+    assert serializer.is_valid()
+    with django_assert_num_queries(6):
+        serializer.save()
+
+    serializer = CaloriesRecordSerializer(
+        data={
+            "weight_kg": 80,
+            "height_cm": 180,
+            "goal": "maintien",
+            "gender": "H",
+            "age": 30,
+            "activity_level": "modere",
+        },
+        context={"request": request},
+    )
+    with django_assert_num_queries(7):
+        assert serializer.is_valid()
+        serializer.save()
+
+    serializer = UpdateProfileSerializer(
+        account, data={"phone_number": "0600000000"}, partial=True
+    )
+    with django_assert_num_queries(3):
+        assert serializer.is_valid()
+        serializer.save()
+
+    serializer = RegisterSerializer(
+        data={"email": "other@test.com", "password": "password"}
+    )
+    with django_assert_num_queries(2):
+        assert serializer.is_valid()
+        serializer.save()
@@ -0,0 +1,146 @@
+import datetime
+import io
+import json
+from io import StringIO
+
+import pytest
+from api.imports import import_progress_records
+from api.models import CustomUser, ProgressRecord
+from api.recompute import recompute_metrics
+from api.utils import calculs_calories, get_age
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def stale_records(db):
+    user = CustomUser.objects.create_user(
+        email="stale@test.com",
+        username="stale@test.com",
+        password="password",
+        gender="H",
+        birth_date=datetime.date(1990, 1, 1),
+    )
+    no_birth_date = CustomUser.objects.create_user(
+        email="nobirth@test.com", username="nobirth@test.com", password="password"
+    )
+    for i in range(6):
+        ProgressRecord.objects.create(
+            user=user,
+            date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i),
+            weight_kg=80,
+            height_cm=180,
+            activity_level="modere",
+            goal="maintien",
+            imc=0,
+            bmr=0,
+            tdee=0,
+            calories_recommandees=0,
+        )
+    ProgressRecord.objects.create(
+        user=no_birth_date,
+        date=datetime.date(2024, 1, 1),
+        weight_kg=60,
+        height_cm=160,
+        goal="maintien",
+        imc=0,
+        bmr=0,
+        tdee=0,
+        calories_recommandees=0,
+    )
+    return user
+
+
+@pytest.mark.django_db
+def test_recompute_metrics_dry_run(stale_records, tmp_path):
+    out = StringIO()
+    call_command(
+        "recompute_metrics",
+        "--dry-run",
+        "--workers=1",
+        "--chunk-size=4",
+        f"--checkpoint={tmp_path / 'checkpoint.json'}",
+        stdout=out,
+    )
+    assert "6 would change" in out.getvalue()
+    assert "1 skipped" in out.getvalue()
+    assert not (tmp_path / "checkpoint.json").exists()
+    assert ProgressRecord.objects.filter(imc=0).count() == 7
+
+
+@pytest.mark.django_db
+def test_recompute_metrics_updates_and_resumes(stale_records, tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    records = list(ProgressRecord.objects.filter(user=stale_records).order_by("id"))
+    # Simule une exécution interrompue après les deux premiers enregistrements
+    checkpoint.write_text(
+        json.dumps({"last_id": records[1].id, "scanned": 2, "changed": 0})
+    )
+
+    state = recompute_metrics(chunk_size=2, checkpoint_path=checkpoint)
+
+    assert state["scanned"] == 7
+    assert state["changed"] == 4
+    assert not checkpoint.exists()
+    expected = calculs_calories(
+        80, 180, get_age(stale_records.birth_date), "H", "modere", "maintien"
+    )
+    for record in records[:2]:
+        record.refresh_from_db()
+        assert record.imc == 0
+    for record in records[2:]:
+        record.refresh_from_db()
+        assert record.imc == expected["imc"]
+        assert record.calories_recommandees == expected["calories_recommandees"]
+
+    # Une nouvelle exécution complète rattrape les deux premiers enregistrements
+    assert recompute_metrics(chunk_size=2, checkpoint_path=checkpoint)["changed"] == 2
+
+
+# PATCH et import suivent la même règle : rien à recalculer ensuite ; un âge saisi
+# dans calculate-calories différent du profil est signalé comme modifié
+@pytest.mark.django_db
+def test_recompute_metrics_matches_write_paths(stale_records):
+    client = APIClient()
+    client.force_authenticate(stale_records)
+    for record in ProgressRecord.objects.filter(user=stale_records):
+        response = client.patch(
+            f"/api/progress-records/{record.id}/", {"weight_kg": 81}, format="json"
+        )
+        assert response.status_code == 200
+    import_progress_records(
+        stale_records,
+        io.BytesIO(b"date,weight_kg,height_cm\n2023-06-01,82,180\n"),
+        "csv",
+    )
+    assert recompute_metrics(dry_run=True)["changed"] == 0
+
+    response = client.post(
+        "/api/calculate-calories/",
+        {
+            "weight_kg": 81,
+            "height_cm": 180,
+            "goal": "perte",
+            "gender": "H",
+            "age": get_age(stale_records.birth_date) + 5,
+            "activity_level": "leger",
+        },
+        format="json",
+    )
+    assert response.status_code == 201
+    assert recompute_metrics(dry_run=True)["changed"] == 1
+
+
+# Sans --checkpoint, le fichier de reprise est rangé dans BASE_DIR
+@pytest.mark.django_db
+def test_recompute_metrics_default_checkpoint(settings, tmp_path, monkeypatch):
+    settings.BASE_DIR = tmp_path
+    monkeypatch.chdir(tmp_path.parent)
+    (tmp_path / "recompute_metrics.checkpoint.json").write_text(
+        json.dumps({"last_id": 0})
+    )
+
+    out = StringIO()
+    call_command("recompute_metrics", "--workers=1", stdout=out)
+    assert f"Resuming from checkpoint {tmp_path}" in out.getvalue()
+    assert not (tmp_path / "recompute_metrics.checkpoint.json").exists()
@@ -0,0 +1,83 @@
+import datetime
+import decimal
+import io
+import uuid
+import zoneinfo
+
+import pytest
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+PARIS = zoneinfo.ZoneInfo("Europe/Paris")
+
+PAYLOADS = [
+    {
+        "success": True,
+        "message": gettext_lazy("This field is required."),
+        "data": {
+            "date": datetime.date(2024, 1, 2),
+            "created": datetime.datetime(2024, 1, 2, 8, 30, 0, 123456),
+            "utc": datetime.datetime(2024, 1, 2, 8, 30, tzinfo=datetime.timezone.utc),
+            "paris": datetime.datetime(2024, 7, 2, 8, 30, tzinfo=PARIS),
+            "time": datetime.time(7, 45),
+            "duration": datetime.timedelta(minutes=90),
+            "weight_kg": decimal.Decimal("72.50"),
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "tags": ("perte", "modere"),
+            "note": "Pâtes et œufs\u2028fin\u2029",
+            1: None,
+        },
+    },
+    [{"id": 1, "imc": 22.86, "bmr": 1700.0}, {"id": 2, "imc": None}],
+    2**70,
+]
+
+
+# Test du rendu : identique au JSONRenderer de DRF, y compris les types non natifs
+@pytest.mark.parametrize("data", PAYLOADS)
+def test_render_like_drf(data):
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+# Test du rendu indenté (API navigable) et des réponses sans contenu
+def test_render_indent_and_empty():
+    data = {"a": [1, 2]}
+    renderer = ORJSONRenderer()
+
+    assert renderer.render(data, "application/json; indent=4") == (
+        JSONRenderer().render(data, "application/json; indent=4")
+    )
+    assert renderer.render(None) == b""
+
+
+# Test du parser : même résultat que le JSONParser de DRF, même erreur
+def test_parse_like_drf():
+    body = '{"email": "léa@test.com", "weight_kg": 72.5, "tags": [1, null]}'.encode()
+
+    assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(
+        io.BytesIO(body)
+    )
+    for invalid in (b"{", b'{"a": NaN}', b"\xff"):
+        with pytest.raises(ParseError, match="JSON parse error"):
+            ORJSONParser().parse(io.BytesIO(invalid))
+
+
+# Test de la configuration : les vues DRF lisent et rendent avec orjson
+def test_api_uses_orjson(test_user):
+    client = APIClient()
+    client.force_authenticate(test_user)
+    response = client.post(
+        "/api/calculate-calories/",
+        {"weight_kg": "soixante-dix", "height_cm": 175},
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert "weight_kg" in response.json()["errors"]
+    assert isinstance(response.accepted_renderer, ORJSONRenderer)
+    assert response.content == JSONRenderer().render(response.data)
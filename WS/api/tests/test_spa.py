@@ -0,0 +1,97 @@
+import gzip
+
+import brotli
+import pytest
+from api.middleware import WhiteNoiseMiddleware
+from api.storage import SPAStaticFilesStorage
+from django.core.management import call_command
+from django.test import override_settings
+
+SHELL = b'<!doctype html><script type="module" src="/assets/assets/index-AbC12_-9.js">'
+
+
+@pytest.fixture
+def index_file(tmp_path, settings):
+    path = tmp_path / "index.html"
+    path.write_bytes(SHELL)
+    settings.SPA_INDEX_FILE = path
+    return path
+
+
+# Test de la coquille : ETag fort, revalidation sans cache, sans base de données
+def test_spa_shell(client, index_file):
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert response.content == SHELL
+    assert response["Cache-Control"] == "no-cache"
+    assert response["Vary"] == "Accept-Encoding"
+    assert response["ETag"].startswith('"')
+
+
+# Test de la revalidation : 304 sans corps, quel que soit l'encodage de l'ETag
+def test_spa_shell_not_modified(client, index_file):
+    etag = client.get("/", HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+
+    response = client.get("/", HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert client.get("/", HTTP_IF_NONE_MATCH='"other"').status_code == 200
+
+
+# Test de la négociation : brotli, puis gzip, puis identité
+@pytest.mark.parametrize(
+    "accept, encoding, decompress",
+    [
+        ("gzip, deflate, br", "br", brotli.decompress),
+        ("gzip, br;q=0", "gzip", gzip.decompress),
+        ("deflate", None, bytes),
+    ],
+)
+def test_spa_shell_encoding(client, index_file, accept, encoding, decompress):
+    response = client.get("/", HTTP_ACCEPT_ENCODING=accept)
+
+    assert response.get("Content-Encoding") == encoding
+    assert int(response["Content-Length"]) == len(response.content)
+    assert decompress(response.content) == SHELL
+
+
+# Test de l'absence de build de l'interface
+def test_spa_shell_missing(client, tmp_path, settings):
+    settings.SPA_INDEX_FILE = tmp_path / "missing.html"
+
+    assert client.get("/").status_code == 404
+
+
+# Test de collectstatic : les assets de Vite gardent leur nom, les autres sont hachés
+def test_spa_storage(tmp_path, settings):
+    dist = tmp_path / "dist"
+    (dist / "assets").mkdir(parents=True)
+    (dist / "index.html").write_bytes(SHELL)
+    (dist / "assets" / "index-AbC12_-9.js").write_text("console.log(1);" * 100)
+    (dist / "favicon.svg").write_text("<svg></svg>" * 100)
+    root = tmp_path / "static"
+    storage = {"BACKEND": "api.storage.SPAStaticFilesStorage"}
+
+    with override_settings(
+        STATICFILES_DIRS=[dist],
+        STATIC_ROOT=root,
+        STORAGES={**settings.STORAGES, "staticfiles": storage},
+    ):
+        call_command("collectstatic", interactive=False, verbosity=0)
+        hashed = SPAStaticFilesStorage().stored_name("favicon.svg")
+
+    assert (root / "index.html").exists()
+    assert (root / "assets" / "index-AbC12_-9.js.gz").exists()
+    assert (root / "assets" / "index-AbC12_-9.js.br").exists()
+    assert hashed != "favicon.svg" and (root / hashed).exists()
+
+
+# Test du cache permanent pour les assets hachés par Vite
+def test_immutable_vite_assets(settings):
+    middleware = WhiteNoiseMiddleware(lambda request: None)
+
+    assert middleware.immutable_file_test("", "/assets/assets/index-AbC12_-9.js")
+    assert not middleware.immutable_file_test("", "/assets/favicon.svg")
+    assert not middleware.immutable_file_test("", "/assets/index.html")
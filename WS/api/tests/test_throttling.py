@@ -0,0 +1,156 @@
+import hashlib
+import threading
+import time
+
+import pytest
+from api.checks import check_shared_cache
+from api.throttling import parse_rate, take_token, throttle_stats
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+# Test du format des débits
+def test_parse_rate():
+    assert parse_rate("10/min") == (10, 10 / 60)
+    assert parse_rate("3/s") == (3, 3)
+
+
+# Test que le seau se vide puis se remplit avec le temps
+def test_take_token_refills(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("api.throttling.time.time", lambda: now[0])
+
+    assert [take_token("bucket", 2, 1.0) for _ in range(3)] == [0, 0, 1.0]
+    now[0] += 1
+    assert take_token("bucket", 2, 1.0) == 0
+
+
+class SlowCache:
+    """Cache qui attend entre la lecture et l'écriture du seau."""
+
+    def __getattr__(self, name):
+        return getattr(cache, name)
+
+    def get_many(self, keys):
+        values = cache.get_many(keys)
+        time.sleep(0.05)
+        return values
+
+
+# Test que deux prises simultanées sur un seau d'un jeton n'en laissent passer qu'une
+def test_take_token_interleaved(monkeypatch):
+    monkeypatch.setattr("api.throttling.cache", SlowCache())
+    waits = []
+    threads = [
+        threading.Thread(target=lambda: waits.append(take_token("burst", 1, 0.01)))
+        for _ in range(2)
+    ]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(waits)[0] == 0
+    assert sorted(waits)[1] > 0
+
+
+# Test du 429 avec Retry-After sur les envois de code, par email
+@pytest.mark.django_db
+def test_send_code_throttled_by_email(settings):
+    settings.RATE_LIMITS = {"send_code": {"email": "2/min"}}
+    client = APIClient()
+
+    statuses = [
+        client.post("/api/send-code-registration/", {"email": "a@test.com"}).status_code
+        for _ in range(3)
+    ]
+    other = client.post("/api/send-code-registration/", {"email": "b@test.com"})
+
+    assert statuses == [200, 200, 429]
+    assert other.status_code == 200
+    assert throttle_stats()["shed"]["send_code"] == 1
+
+
+# Test qu'une requête rejetée ne fait aucune requête en base (ni hachage)
+@pytest.mark.django_db
+def test_login_throttled_before_db_work(settings):
+    settings.RATE_LIMITS = {"login": {"ip": "1/min"}}
+    client = APIClient()
+    client.post("/api/login/", {"email": "x@test.com", "password": "wrong"})
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post("/api/login/", {"email": "x@test.com", "password": "x"})
+
+    assert response.status_code == 429
+    assert int(response["Retry-After"]) == 60
+    assert len(queries) == 0
+
+
+# Test que la limite peut être désactivée
+@pytest.mark.django_db
+def test_rate_limit_disabled(settings):
+    settings.RATE_LIMIT_ENABLED = False
+    settings.DEFAULT_FROM_EMAIL = "contact@test.com"
+    settings.RATE_LIMITS = {"contact": {"ip": "1/min"}}
+    client = APIClient()
+    payload = {"name": "A", "email": "a@test.com", "message": "Bonjour"}
+
+    assert [client.post("/api/contact/", payload).status_code for _ in range(2)] == [
+        200,
+        200,
+    ]
+
+
+# Test qu'un X-Forwarded-For envoyé par le client ne change pas de seau
+@pytest.mark.django_db
+def test_forwarded_for_is_ignored_without_proxy(settings):
+    settings.RATE_LIMITS = {"register": {"ip": "1/min"}}
+    client = APIClient()
+
+    statuses = [
+        client.post(
+            "/api/register/", {}, HTTP_X_FORWARDED_FOR=f"10.0.0.{n}"
+        ).status_code
+        for n in range(3)
+    ]
+
+    assert statuses == [400, 429, 429]
+
+
+# Test qu'une requête rejetée par le seau email ne consomme pas le jeton IP
+@pytest.mark.django_db
+def test_rejected_request_keeps_ip_token(settings):
+    settings.RATE_LIMITS = {"send_code": {"ip": "2/min", "email": "1/min"}}
+    client = APIClient()
+
+    statuses = [
+        client.post("/api/send-code-registration/", {"email": "a@test.com"}).status_code
+        for _ in range(3)
+    ]
+    other = client.post("/api/send-code-registration/", {"email": "b@test.com"})
+
+    assert statuses == [200, 429, 429]
+    assert other.status_code == 200
+
+
+# Test que l'adresse n'apparaît pas en clair dans la clé du seau
+@pytest.mark.django_db
+def test_email_key_is_hashed(settings):
+    settings.RATE_LIMITS = {"send_code": {"email": "1/min"}}
+    digest = hashlib.sha256(b"a@test.com").hexdigest()
+
+    APIClient().post("/api/send-code-registration/", {"email": " A@Test.com "})
+
+    assert cache.get(f"throttle:send_code:email:{digest}") is not None
+    assert cache.get("throttle:send_code:email:a@test.com") is None
+
+
+# Test de l'avertissement au démarrage sans cache partagé
+def test_rate_limit_warns_without_shared_cache(settings):
+    settings.DEBUG = False
+    settings.RATE_LIMIT_ENABLED = True
+
+    assert "api.W001" in [warning.id for warning in check_shared_cache(None)]
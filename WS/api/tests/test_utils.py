@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+import pytest
+from api.utils import (
+    ACTIVITY_FACTORS,
+    _round_like_python,
+    calculs_calories,
+    calculs_calories_batch,
+)
+
+
+# La version vectorisée doit donner exactement les mêmes arrondis que la version scalaire
+def test_calculs_calories_batch_matches_scalar():
+    rng = random.Random(42)
+    rows = [
+        (
+            round(rng.uniform(35, 180), rng.choice([0, 1, 2])),
+            round(rng.uniform(140, 210), rng.choice([0, 1])),
+            rng.randint(10, 100),
+            rng.choice(["H", "F"]),
+            rng.choice(list(ACTIVITY_FACTORS) + ["inconnu"]),
+            rng.choice(["maintien", "perte", "prise"]),
+        )
+        for _ in range(20000)
+    ]
+
+    batch = calculs_calories_batch(*zip(*rows))
+
+    for index, row in enumerate(rows):
+        expected = calculs_calories(*row)
+        for key, value in expected.items():
+            assert batch[key][index] == value, (row, key)
+
+
+@pytest.mark.parametrize("value", [0.125, 2.675, 24.005, 1.5, 2.5, -0.5])
+def test_calculs_calories_batch_rounding_ties(value):
+    assert _round_like_python(np.array([value]), 2)[0] == round(value, 2)
+    assert _round_like_python(np.array([value]), 0)[0] == round(value)
@@ -0,0 +1,350 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+
+import pytest
+from api import records_cache
+from api.models import CustomUser, ProgressRecord, ProgressRollup
+from api.rollups import find_rollup_drift, rebuild_rollups
+from api.serializers import ProgressRecordSerializer
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def user_with_records(db):
+    user = CustomUser.objects.create_user(
+        email="records@test.com",
+        username="records@test.com",
+        password="password",
+        gender="H",
+        birth_date=datetime.date(1990, 1, 1),
+    )
+    start = datetime.date(2024, 1, 1)
+    for i in range(10):
+        ProgressRecord.objects.create(
+            user=user,
+            date=start + datetime.timedelta(days=i),
+            weight_kg=80 - i * 0.5,
+            height_cm=180,
+            activity_level="modere" if i % 2 else "intense",
+            goal="perte" if i < 5 else "maintien",
+            imc=24.0,
+            bmr=1800,
+            tdee=2700,
+            calories_recommandees=2400,
+        )
+    rebuild_rollups(user)
+    return user
+
+
+# Liste complète sans paramètres de pagination
+@pytest.mark.django_db
+def test_progress_records_list_without_pagination(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    response = client.get("/api/progress-records/")
+    assert response.status_code == 200
+    records = response.json()
+    assert len(records) == 10
+    assert records[0]["date"] == "2024-01-10"
+
+
+# Parcours complet des pages par curseur
+@pytest.mark.django_db
+def test_progress_records_keyset_pagination(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    dates = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 4}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/progress-records/", params)
+        assert response.status_code == 200
+        page = response.json()
+        dates += [record["date"] for record in page["results"]]
+        cursor = page["next_cursor"]
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert len(dates) == 10
+    assert dates == sorted(dates, reverse=True)
+
+
+# Filtres par période, objectif et niveau d'activité
+@pytest.mark.django_db
+def test_progress_records_filters(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    response = client.get(
+        "/api/progress-records/",
+        {"from": "2024-01-03", "to": "2024-01-08", "goal": "perte"},
+    )
+    assert response.status_code == 200
+    assert [record["date"] for record in response.json()] == [
+        "2024-01-05",
+        "2024-01-04",
+        "2024-01-03",
+    ]
+
+    response = client.get("/api/progress-records/", {"activity_level": "intense"})
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+
+
+@pytest.mark.django_db
+def test_progress_records_invalid_params(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    response = client.get("/api/progress-records/", {"cursor": "not-a-cursor"})
+    assert isinstance(response, Response)
+    assert response.status_code == 400
+    assert response.data is not None and "cursor" in response.data
+
+    response = client.get(
+        "/api/progress-records/", {"from": "2024-02-01", "to": "2024-01-01"}
+    )
+    assert isinstance(response, Response)
+    assert response.status_code == 400
+
+
+# Agrégats hebdomadaires avec moyenne mobile
+@pytest.mark.django_db
+def test_progress_records_rollups_weekly(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    response = client.get(
+        "/api/progress-records/rollups/", {"granularity": "week", "window": 2}
+    )
+    assert isinstance(response, Response)
+    assert response.status_code == 200
+    assert response.data is not None
+    buckets = response.data["buckets"]
+    # 2024-01-01 est un lundi : 7 jours puis 3 jours
+    assert [bucket["count"] for bucket in buckets] == [7, 3]
+    assert buckets[0]["max_weight"] == 80
+    assert buckets[0]["min_weight"] == 77
+    assert buckets[0]["avg_weight"] == 78.5
+    assert buckets[0]["moving_avg_weight"] == 78.5
+    assert buckets[1]["avg_weight"] == 76
+    assert buckets[1]["moving_avg_weight"] == 77.25
+
+
+@pytest.mark.django_db
+def test_progress_records_rollups_invalid_granularity(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    response = client.get("/api/progress-records/rollups/", {"granularity": "day"})
+    assert isinstance(response, Response)
+    assert response.status_code == 400
+
+    response = client.get(
+        "/api/progress-records/rollups/", {"from": "2024-02-01", "to": "2024-01-01"}
+    )
+    assert isinstance(response, Response)
+    assert response.status_code == 400
+    assert response.data is not None and "non_field_errors" in response.data
+
+
+# Agrégats stockés maintenus à chaque écriture
+@pytest.mark.django_db
+def test_progress_rollups_maintained_on_write(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    record = ProgressRecord.objects.get(
+        user=user_with_records, date=datetime.date(2024, 1, 1)
+    )
+    response = client.patch(
+        f"/api/progress-records/{record.id}/", {"weight_kg": 90}, format="json"
+    )
+    assert isinstance(response, Response)
+    assert response.status_code == 200
+    rollup = ProgressRollup.objects.get(
+        user=user_with_records, granularity="week", period=datetime.date(2024, 1, 1)
+    )
+    assert rollup.max_weight == 90
+
+    last = ProgressRecord.objects.get(
+        user=user_with_records, date=datetime.date(2024, 1, 10)
+    )
+    response = client.delete(f"/api/progress-records/{last.id}/")
+    assert isinstance(response, Response)
+    assert response.status_code == 204
+    assert find_rollup_drift() == []
+
+    response = client.get("/api/progress-records/rollups/", {"granularity": "month"})
+    assert isinstance(response, Response)
+    assert response.data is not None
+    assert [bucket["count"] for bucket in response.data["buckets"]] == [9]
+
+
+# Une période vidée par une suppression perd son agrégat
+@pytest.mark.django_db
+def test_progress_rollups_removed_when_period_empty(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+    ProgressRecord.objects.filter(
+        user=user_with_records, date__gt=datetime.date(2024, 1, 1)
+    ).delete()
+    rebuild_rollups(user_with_records)
+
+    record = ProgressRecord.objects.get(user=user_with_records)
+    response = client.delete(f"/api/progress-records/{record.id}/")
+
+    assert response.status_code == 204
+    assert not ProgressRollup.objects.filter(user=user_with_records).exists()
+
+
+# L'enregistrement et ses agrégats sont validés dans la même transaction
+@pytest.mark.django_db
+def test_progress_record_write_rolled_back_with_rollups(user_with_records, monkeypatch):
+    def broken_refresh(user, day):
+        raise RuntimeError("rollups")
+
+    monkeypatch.setattr("api.serializers.refresh_rollups", broken_refresh)
+    monkeypatch.setattr("api.views.refresh_rollups", broken_refresh)
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+    record = ProgressRecord.objects.get(
+        user=user_with_records, date=datetime.date(2024, 1, 1)
+    )
+
+    with pytest.raises(RuntimeError):
+        client.patch(
+            f"/api/progress-records/{record.id}/", {"weight_kg": 90}, format="json"
+        )
+    with pytest.raises(RuntimeError):
+        client.delete(f"/api/progress-records/{record.id}/")
+
+    record.refresh_from_db()
+    assert record.weight_kg == 80
+    assert find_rollup_drift() == []
+
+
+@pytest.mark.django_db
+def test_rebuild_rollups_command_detects_drift(user_with_records):
+    ProgressRollup.objects.filter(granularity="week").first().delete()
+
+    with pytest.raises(CommandError):
+        call_command("rebuild_rollups", "--check", stdout=io.StringIO())
+
+    call_command("rebuild_rollups", stdout=io.StringIO())
+    call_command("rebuild_rollups", "--check", stdout=io.StringIO())
+
+
+# Export en streaming (CSV, NDJSON compressé)
+@pytest.mark.django_db
+def test_progress_records_export_csv(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    response = client.get("/api/progress-records/export/")
+    assert response.status_code == 200
+    assert response.streaming
+    rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+    assert rows[0][:3] == ["id", "date", "weight_kg"]
+    assert len(rows) == 11
+    assert rows[1][1] == "2024-01-10"
+
+
+@pytest.mark.django_db
+def test_progress_records_export_ndjson_gzip(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    response = client.get(
+        "/api/progress-records/export/", {"file_format": "ndjson", "gzip": "true"}
+    )
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/gzip"
+    content = gzip.decompress(b"".join(response.streaming_content)).decode()
+    lines = [json.loads(line) for line in content.splitlines()]
+    assert len(lines) == 10
+    assert lines[-1]["date"] == "2024-01-01"
+    assert lines[-1]["weight_kg"] == 80
+
+
+# GET conditionnel : 304 tant que rien n'a changé
+@pytest.mark.django_db
+def test_progress_records_conditional_get(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    response = client.get("/api/progress-records/")
+    assert response.status_code == 200
+    etag = response["ETag"]
+
+    response = client.get("/api/progress-records/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+    record = ProgressRecord.objects.filter(user=user_with_records).first()
+    client.patch(f"/api/progress-records/{record.id}/", {"goal": "prise"})
+
+    response = client.get("/api/progress-records/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert "Last-Modified" in response
+
+
+# Cache par utilisateur invalidé par les écritures
+@pytest.mark.django_db
+def test_progress_records_listing_cache(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    first = client.get("/api/progress-records/")
+    second = client.get("/api/progress-records/")
+    assert first["X-Cache"] == "MISS"
+    assert second["X-Cache"] == "HIT"
+    assert first.content == second.content
+
+    record = ProgressRecord.objects.filter(user=user_with_records).first()
+    response = client.delete(f"/api/progress-records/{record.id}/")
+    assert response.status_code == 204
+
+    third = client.get("/api/progress-records/")
+    assert third["X-Cache"] == "MISS"
+    assert len(third.json()) == 9
+    assert records_cache.cache_stats() == {"hits": 1, "misses": 2, "hit_ratio": 0.333}
+
+
+# Le chemin rapide produit exactement les mêmes octets que le rendu DRF
+@pytest.mark.django_db
+def test_progress_records_fast_path_matches_drf(user_with_records):
+    client = APIClient()
+    client.force_authenticate(user_with_records)
+
+    for params in [{}, {"limit": 3}, {"goal": "perte", "limit": 2}]:
+        fast = client.get("/api/progress-records/", params)
+        assert fast["X-Cache"] == "MISS"
+
+        records = ProgressRecord.objects.filter(user=user_with_records)
+        if "goal" in params:
+            records = records.filter(goal=params["goal"])
+        records = records.order_by("-date", "-id")
+        if "limit" in params:
+            expected = fast.json()
+            expected["results"] = ProgressRecordSerializer(
+                records[: params["limit"]], many=True
+            ).data
+        else:
+            expected = ProgressRecordSerializer(records, many=True).data
+        assert fast.content == JSONRenderer().render(expected)
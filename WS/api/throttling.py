@@ -0,0 +1,158 @@
+import hashlib
+import math
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+KEY_PREFIX = "throttle"
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600}
+# Verrou des seaux pendant la lecture-écriture : durée de vie maximale (si le
+# processus meurt en le tenant) et attente maximale avant de rejeter la requête
+LOCK_TIMEOUT = 2
+LOCK_WAIT = 0.5
+
+
+class BucketBusy(Exception):
+    pass
+
+
+def parse_rate(rate: str) -> tuple[int, float]:
+    """
+    "10/min" -> (capacité 10, 10 jetons rendus par minute).
+    """
+    capacity, period = rate.split("/")
+    capacity = int(capacity)
+    return capacity, capacity / PERIODS[period]
+
+
+def _count_shed(scope: str):
+    key = f"{KEY_PREFIX}:stats:shed:{scope}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def throttle_stats() -> dict:
+    """
+    Nombre de requêtes rejetées (429) par scope, tous processus confondus.
+    """
+    keys = {scope: f"{KEY_PREFIX}:stats:shed:{scope}" for scope in settings.RATE_LIMITS}
+    values = cache.get_many(keys.values())
+    shed = {scope: values.get(key, 0) for scope, key in keys.items()}
+    return {"shed": shed, "shed_total": sum(shed.values())}
+
+
+@contextmanager
+def _locked(keys):
+    """
+    Verrou par seau posé avec cache.add (atomique sur Redis, Memcached et LocMem),
+    pris dans un ordre fixe pour que deux requêtes ne s'attendent pas mutuellement.
+    """
+    locks = []
+    try:
+        for key in sorted(keys):
+            lock = f"{key}:lock"
+            deadline = time.monotonic() + LOCK_WAIT
+            while not cache.add(lock, 1, timeout=LOCK_TIMEOUT):
+                if time.monotonic() > deadline:
+                    raise BucketBusy(key)
+                time.sleep(0.001)
+            locks.append(lock)
+        yield
+    finally:
+        cache.delete_many(locks)
+
+
+def take_tokens(buckets: list[tuple[str, int, float]]) -> float:
+    """
+    Retire un jeton de chaque seau (clé, capacité, débit) stocké dans le cache, ou
+    d'aucun : une requête rejetée par un seau ne consomme pas les autres.
+    Retourne 0 si la requête passe, sinon le nombre de secondes avant qu'elle passe.
+    La lecture et l'écriture se font sous verrou : des requêtes simultanées ne
+    peuvent pas toutes lire le même niveau. Si le verrou reste pris (rafale sur le
+    même seau), la requête est rejetée pour une seconde.
+    """
+    try:
+        with _locked([key for key, _, _ in buckets]):
+            return _take_tokens(buckets)
+    except BucketBusy:
+        return 1.0
+
+
+def _take_tokens(buckets: list[tuple[str, int, float]]) -> float:
+    now = time.time()
+    stored = cache.get_many([key for key, _, _ in buckets])
+    levels = {}
+    wait = 0
+    for key, capacity, refill_rate in buckets:
+        tokens, updated_at = stored.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+        if tokens < 1:
+            wait = max(wait, (1 - tokens) / refill_rate)
+        levels[key] = tokens
+    if wait:
+        return wait
+    for key, capacity, refill_rate in buckets:
+        # Un seau inutilisé expire quand il serait de nouveau plein
+        cache.set(
+            key, (levels[key] - 1, now), timeout=math.ceil(capacity / refill_rate)
+        )
+    return 0
+
+
+def take_token(key: str, capacity: int, refill_rate: float) -> float:
+    return take_tokens([(key, capacity, refill_rate)])
+
+
+def check_rate_limit(scope: str, ident: str, email=None) -> float:
+    """
+    Consomme un jeton dans chaque seau du scope (adresse IP, et email s'il est
+    fourni). Retourne 0 si la requête passe, sinon le délai d'attente en secondes.
+    `ident` est l'adresse du client selon NUM_PROXIES (BaseThrottle.get_ident) :
+    X-Forwarded-For n'est lu que derrière un proxy déclaré.
+    """
+    rates = settings.RATE_LIMITS.get(scope, {})
+    if not settings.RATE_LIMIT_ENABLED or not rates:
+        return 0
+    buckets = []
+    if "ip" in rates:
+        buckets.append((f"{KEY_PREFIX}:{scope}:ip:{ident}", *parse_rate(rates["ip"])))
+    if "email" in rates and isinstance(email, str) and email:
+        # Empreinte de l'adresse : clé de longueur fixe, sans espace ni caractère
+        # refusé par Memcached
+        digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        buckets.append(
+            (f"{KEY_PREFIX}:{scope}:email:{digest}", *parse_rate(rates["email"]))
+        )
+    wait = take_tokens(buckets) if buckets else 0
+    if wait:
+        _count_shed(scope)
+    return wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Limite par seau à jetons, par adresse IP et par email du corps de la requête.
+    Les vues indiquent leur `throttle_scope` ; les débits sont dans RATE_LIMITS.
+    Appliquée par DRF avant le traitement de la vue : une requête rejetée ne fait ni
+    requête en base ni hachage, et reçoit un 429 avec Retry-After.
+    """
+
+    def __init__(self):
+        self.wait_seconds = 0
+
+    def allow_request(self, request, view) -> bool:
+        scope = getattr(view, "throttle_scope", None)
+        if scope is None:
+            return True
+        data = request.data
+        email = data.get("email") if hasattr(data, "get") else None
+        self.wait_seconds = check_rate_limit(scope, self.get_ident(request), email)
+        return not self.wait_seconds
+
+    def wait(self) -> float:
+        return self.wait_seconds
@@ -5,9 +5,13 @@ from .views import (
     CaloriesRecordView,
     CheckAuthenticationView,
     ContactView,
+    DatabasePoolStatsView,
     DeleteAccountView,
     LoginView,
     LogoutView,
+    ProgressRecordRollupsView,
+    ProgressRecordsExportView,
+    ProgressRecordsImportView,
     ProgressRecordsView,
     RefreshAccessView,
     RegisterView,
@@ -48,6 +52,21 @@ urlpatterns = [
         "calculate-calories/", CaloriesRecordView.as_view(), name="calculate-calories"
     ),
     path("progress-records/", ProgressRecordsView.as_view(), name="progress-records"),
+    path(
+        "progress-records/rollups/",
+        ProgressRecordRollupsView.as_view(),
+        name="progress-record-rollups",
+    ),
+    path(
+        "progress-records/export/",
+        ProgressRecordsExportView.as_view(),
+        name="progress-records-export",
+    ),
+    path(
+        "progress-records/import/",
+        ProgressRecordsImportView.as_view(),
+        name="progress-records-import",
+    ),
     path(
         "progress-records/<int:primary_key>/",
         ProgressRecordsView.as_view(),
@@ -58,4 +77,5 @@ urlpatterns = [
         ContactView.as_view(),
         name="contact",
     ),
+    path("db-pool-stats/", DatabasePoolStatsView.as_view(), name="db-pool-stats"),
 ]
@@ -1,13 +1,16 @@
-import smtplib
-import ssl
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import datetime
+from typing import TYPE_CHECKING
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.utils.crypto import get_random_string
-from next_shape_ws.settings import ENV
 
-from .models import EmailVerificationCode
+from .outbox import SMTPConnection, aenqueue_email, build_message, enqueue_email
+from .verification_codes import astore_code, store_code
+
+# NumPy ne sert qu'aux calculs par lots (import, recalcul) : importé à la demande
+if TYPE_CHECKING:
+    import numpy as np
 
 
 def send_html_email(
@@ -18,30 +21,31 @@ def send_html_email(
     """
 
     # On ne tente pas d’envoyer d’email en CI/tests
-    if ENV == "test":
+    if settings.ENV == "test":
         return
 
-    from_email = settings.DEFAULT_FROM_EMAIL
-
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = from_email
-    msg["To"] = to_email
-    if reply_to:
-        msg["Reply-To"] = reply_to
+    connection = SMTPConnection()
+    try:
+        connection.send(build_message(subject, to_email, html_content, reply_to))
+    finally:
+        connection.close()
 
-    msg.attach(MIMEText(html_content, "html"))
 
-    context = ssl._create_unverified_context()
-    with smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT) as server:
-        server.starttls(context=context)
-        server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-        server.sendmail(from_email, [to_email], msg.as_string())
+def deliver_email(
+    subject: str, to_email: str, html_content: str, reply_to: str | None = None
+):
+    """
+    Passe par l'outbox si EMAIL_OUTBOX est activé, sinon envoie directement.
+    """
+    if settings.EMAIL_OUTBOX:
+        enqueue_email(subject, to_email, html_content, reply_to)
+    else:
+        send_html_email(subject, to_email, html_content, reply_to)
 
 
-def send_verification_email(email: str, code: str):
+def verification_email(email: str, code: str) -> tuple:
     """
-    Email de vérification de compte.
+    Email de vérification de compte : (sujet, destinataire, contenu, reply_to).
     """
     subject = "NextShape - Vérification de votre adresse email"
     html_content = f"""
@@ -58,12 +62,12 @@ def send_verification_email(email: str, code: str):
     </body>
     </html>
     """
-    send_html_email(subject, email, html_content)
+    return subject, email, html_content, None
 
 
-def send_contact_email(data: dict):
+def contact_email(data: dict) -> tuple:
     """
-    Email envoyé depuis le formulaire de contact.
+    Email envoyé depuis le formulaire de contact : (sujet, destinataire, contenu, reply_to).
     """
     subject = f"[Contact] Message de {data['name']}"
     to_email = getattr(settings, "CONTACT_INBOX", settings.DEFAULT_FROM_EMAIL)
@@ -79,15 +83,74 @@ def send_contact_email(data: dict):
     </body>
     </html>
     """
-    send_html_email(subject, to_email, html_content, reply_to=data["email"])
+    return subject, to_email, html_content, data["email"]
+
+
+def send_verification_email(email: str, code: str):
+    deliver_email(*verification_email(email, code))
+
+
+def send_contact_email(data: dict):
+    deliver_email(*contact_email(data))
 
 
 def generate_and_send_verification_code(email):
     code = get_random_string(length=6, allowed_chars="0123456789")
-    EmailVerificationCode.objects.create(email=email, code=code)
+    store_code(email, code)
     send_verification_email(email, code)
 
 
+async def adeliver_email(
+    subject: str, to_email: str, html_content: str, reply_to: str | None = None
+):
+    """
+    Équivalent asynchrone de deliver_email. L'envoi direct (smtplib, bloquant) se fait
+    dans un thread à part pour ne pas bloquer la boucle.
+    """
+    if settings.EMAIL_OUTBOX:
+        await aenqueue_email(subject, to_email, html_content, reply_to)
+    else:
+        await sync_to_async(send_html_email, thread_sensitive=False)(
+            subject, to_email, html_content, reply_to
+        )
+
+
+async def asend_contact_email(data: dict):
+    await adeliver_email(*contact_email(data))
+
+
+async def agenerate_and_send_verification_code(email):
+    code = get_random_string(length=6, allowed_chars="0123456789")
+    await astore_code(email, code)
+    await adeliver_email(*verification_email(email, code))
+
+
+def get_age(birth_date: datetime.date, on_date: datetime.date | None = None) -> int:
+    """
+    Âge en années révolues à une date donnée (aujourd'hui par défaut).
+    """
+    on_date = on_date or datetime.date.today()
+    return (
+        on_date.year
+        - birth_date.year
+        - ((on_date.month, on_date.day) < (birth_date.month, birth_date.day))
+    )
+
+
+ACTIVITY_FACTORS = {
+    "sedentaire": 1.2,
+    "leger": 1.375,
+    "modere": 1.55,
+    "intense": 1.725,
+    "tres_intense": 1.9,
+}
+
+GOAL_OFFSETS = {
+    "perte": -300,
+    "prise": 300,
+}
+
+
 def calculs_calories(weight, height, age, gender, activity_level, goal):
     # BMR (Mifflin-St Jeor)
     if gender == "H":
@@ -95,14 +158,7 @@ def calculs_calories(weight, height, age, gender, activity_level, goal):
     else:
         bmr = 10 * weight + 6.25 * height - 5 * age - 161
 
-    activity_factors = {
-        "sedentaire": 1.2,
-        "leger": 1.375,
-        "modere": 1.55,
-        "intense": 1.725,
-        "tres_intense": 1.9,
-    }
-    tdee = bmr * activity_factors.get(activity_level, 1.2)
+    tdee = bmr * ACTIVITY_FACTORS.get(activity_level, 1.2)
 
     if goal == "perte":
         calories = tdee - 300
@@ -119,3 +175,64 @@ def calculs_calories(weight, height, age, gender, activity_level, goal):
         "tdee": round(tdee),
         "calories_recommandees": round(calories),
     }
+
+
+def _lookup(values, mapping: dict, default) -> "np.ndarray":
+    """
+    Traduit un tableau de libellés via `mapping`, une comparaison vectorisée par clé.
+    """
+    import numpy as np
+
+    values = np.asarray(values)
+    result = np.full(values.shape, default, dtype=float)
+    for key, value in mapping.items():
+        result[values == key] = value
+    return result
+
+
+def _round_like_python(values: "np.ndarray", digits: int) -> "np.ndarray":
+    """
+    Arrondi identique à round() de Python.
+    np.round passe par une multiplication qui peut trancher différemment les cas
+    proches de ...5 : ces rares valeurs sont recalculées avec round().
+    """
+    import numpy as np
+
+    if digits == 0:
+        # np.rint arrondit au pair le plus proche, comme round(x)
+        return np.rint(values)
+    rounded = np.round(values, digits)
+    scaled = values * 10**digits
+    ambiguous = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for index in ambiguous:
+        rounded[index] = round(float(values[index]), digits)
+    return rounded
+
+
+def calculs_calories_batch(weight, height, age, gender, activity_level, goal):
+    """
+    Version vectorisée de calculs_calories pour des colonnes entières.
+    Prend des tableaux NumPy (ou des listes) de même longueur et renvoie un dict de
+    tableaux, avec exactement les mêmes arrondis que la version scalaire.
+    """
+    import numpy as np
+
+    weight = np.asarray(weight, dtype=float)
+    height = np.asarray(height, dtype=float)
+    age = np.asarray(age, dtype=float)
+
+    # BMR (Mifflin-St Jeor), mêmes opérations et même ordre que la version scalaire
+    bmr = 10 * weight + 6.25 * height - 5 * age
+    bmr = np.where(np.asarray(gender) == "H", bmr + 5, bmr - 161)
+
+    tdee = bmr * _lookup(activity_level, ACTIVITY_FACTORS, 1.2)
+    calories = tdee + _lookup(goal, GOAL_OFFSETS, 0)
+
+    imc = weight / ((height / 100) ** 2)
+
+    return {
+        "imc": _round_like_python(imc, 2),
+        "bmr": _round_like_python(bmr, 0),
+        "tdee": _round_like_python(tdee, 0),
+        "calories_recommandees": _round_like_python(calories, 0),
+    }
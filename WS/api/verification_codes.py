@@ -0,0 +1,103 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import EmailVerificationCode
+
+CACHE_PREFIX = "verification-code"
+
+
+def _normalize(email: str) -> str:
+    # Même clé en cache et en base, quelle que soit la casse saisie
+    return email.lower()
+
+
+def _cache_key(email: str) -> str:
+    return f"{CACHE_PREFIX}:{email}"
+
+
+def _expired_before() -> datetime.datetime:
+    return timezone.now() - datetime.timedelta(seconds=settings.VERIFICATION_CODE_TTL)
+
+
+def purge_expired_codes() -> int:
+    """
+    Supprime les codes de plus de VERIFICATION_CODE_TTL secondes (parcours d'index).
+    """
+    deleted, _ = EmailVerificationCode.objects.filter(
+        created_at__lt=_expired_before()
+    ).delete()
+    return deleted
+
+
+def store_code(email: str, code: str):
+    """
+    Enregistre le dernier code envoyé à une adresse.
+    En base, les codes expirés sont purgés au passage : la table ne contient que les
+    codes des dernières VERIFICATION_CODE_TTL secondes.
+    Avec le stockage "cache", l'entrée expire d'elle-même ; elle est gardée deux fois
+    la durée de validité pour pouvoir encore répondre "Code expiré".
+    """
+    email = _normalize(email)
+    if settings.VERIFICATION_CODE_STORE == "cache":
+        cache.set(
+            _cache_key(email),
+            (code, timezone.now()),
+            timeout=settings.VERIFICATION_CODE_TTL * 2,
+        )
+        return
+    purge_expired_codes()
+    EmailVerificationCode.objects.create(email=email, code=code)
+
+
+def get_code(email: str) -> EmailVerificationCode | None:
+    """
+    Dernier code envoyé à une adresse, ou None.
+    """
+    email = _normalize(email)
+    if settings.VERIFICATION_CODE_STORE == "cache":
+        entry = cache.get(_cache_key(email))
+        if entry is None:
+            return None
+        code, created_at = entry
+        return EmailVerificationCode(email=email, code=code, created_at=created_at)
+    return (
+        EmailVerificationCode.objects.filter(email=email)
+        .order_by("-created_at")
+        .first()
+    )
+
+
+async def astore_code(email: str, code: str):
+    """
+    Équivalent asynchrone de store_code (ORM et cache asynchrones).
+    """
+    email = _normalize(email)
+    if settings.VERIFICATION_CODE_STORE == "cache":
+        await cache.aset(
+            _cache_key(email),
+            (code, timezone.now()),
+            timeout=settings.VERIFICATION_CODE_TTL * 2,
+        )
+        return
+    await EmailVerificationCode.objects.filter(
+        created_at__lt=_expired_before()
+    ).adelete()
+    await EmailVerificationCode.objects.acreate(email=email, code=code)
+
+
+async def aget_code(email: str) -> EmailVerificationCode | None:
+    email = _normalize(email)
+    if settings.VERIFICATION_CODE_STORE == "cache":
+        entry = await cache.aget(_cache_key(email))
+        if entry is None:
+            return None
+        code, created_at = entry
+        return EmailVerificationCode(email=email, code=code, created_at=created_at)
+    return (
+        await EmailVerificationCode.objects.filter(email=email)
+        .order_by("-created_at")
+        .afirst()
+    )
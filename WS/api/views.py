@@ -1,13 +1,28 @@
-from api.models import EmailVerificationCode, ProgressRecord
+import hmac
+
+from api.models import CustomUser, ProgressRecord
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from next_shape_ws.settings import COOKIE_PARAMS
 from rest_framework import generics, status
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from . import metrics, records_cache
+from .authentication import add_user_claims, user_cache
+from .conditional import not_modified, records_validators, set_validators
+from .db_pool import pool_stats
+from .exports import CONTENT_TYPES, stream_export
+from .fastpath import PROGRESS_RECORD_FIELDS, accepts_fast_json, render_json
+from .imports import ImportFileError, import_progress_records
+from .pagination import InvalidCursor, paginate_by_keyset
 from .response import error_response, success_response
+from .rollups import add_moving_average, compute_rollups, read_rollups, refresh_rollups
 from .serializers import (
     CaloriesRecordSerializer,
     ContactFormSerializer,
@@ -15,12 +30,18 @@ from .serializers import (
     EmailCodeRequestResetPasswordSerializer,
     EmailCodeVerificationSerializer,
     LoginSerializer,
+    ProgressRecordExportSerializer,
+    ProgressRecordFilterSerializer,
+    ProgressRecordImportSerializer,
+    ProgressRecordRollupSerializer,
     ProgressRecordSerializer,
     RegisterSerializer,
     ResetPasswordSerializer,
     UpdateProfileSerializer,
 )
+from .throttling import TokenBucketThrottle, throttle_stats
 from .utils import generate_and_send_verification_code, send_contact_email
+from .verification_codes import get_code
 
 
 class RegisterView(generics.CreateAPIView):
@@ -30,6 +51,8 @@ class RegisterView(generics.CreateAPIView):
 
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "register"
 
     def post(self, request):
         """
@@ -53,6 +76,8 @@ class LoginView(APIView):
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "login"
 
     def post(self, request):
         """
@@ -135,6 +160,16 @@ class RefreshAccessView(APIView):
         except TokenError:
             return error_response(message="Refresh token invalide", status_code=401)
 
+        if settings.AUTH_USER_CACHE:
+            # Les claims du refresh token peuvent dater de la connexion : on les
+            # rafraîchit pour que l'access token reflète le profil actuel
+            user = CustomUser.objects.filter(
+                pk=refresh[jwt_settings.USER_ID_CLAIM]
+            ).first()
+            if user is None or not user.is_active:
+                return error_response(message="Refresh token invalide", status_code=401)
+            add_user_claims(access_token, user)
+
         response = success_response(message="Nouveau token généré avec succès.")
 
         response.set_cookie(
@@ -158,12 +193,14 @@ class UpdateProfileView(APIView):
         """
         Gère la requête PATCH de modification de l'utilisateur.
         """
-        serializer = UpdateProfileSerializer(
-            request.user, data=request.data, partial=True
-        )
+        # L'utilisateur authentifié peut venir du cache ou des claims du token :
+        # on repart de la base pour ne jamais sauvegarder une instance incomplète
+        user = CustomUser.objects.get(pk=request.user.pk)
+        serializer = UpdateProfileSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             updated_user = serializer.save()
-            return success_response(
+            user_cache.invalidate(updated_user.pk)
+            response = success_response(
                 data={
                     "first_name": updated_user.first_name,
                     "last_name": updated_user.last_name,
@@ -175,6 +212,24 @@ class UpdateProfileView(APIView):
                 message="Profil mis à jour avec succès",
                 status_code=200,
             )
+            if settings.AUTH_USER_CACHE:
+                # Nouveaux tokens pour que les claims suivent le profil modifié
+                refresh = add_user_claims(
+                    RefreshToken.for_user(updated_user), updated_user
+                )
+                response.set_cookie(
+                    key="access_token",
+                    value=str(refresh.access_token),
+                    max_age=30 * 60,
+                    **COOKIE_PARAMS,
+                )
+                response.set_cookie(
+                    key="refresh_token",
+                    value=str(refresh),
+                    max_age=24 * 60 * 60,
+                    **COOKIE_PARAMS,
+                )
+            return response
         return error_response(
             errors=serializer.errors,
             message="Échec de la mise à jour du profil",
@@ -190,8 +245,8 @@ class DeleteAccountView(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request):
-        user = request.user
-        user.delete()
+        # Les tokens encore valides sont révoqués par le receiver post_delete
+        request.user.delete()
         return success_response(
             message="Votre compte a été supprimé avec succès.", status_code=200
         )
@@ -203,6 +258,8 @@ class SendCodeForRegistrationView(APIView):
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "send_code"
 
     def post(self, request):
         serializer = EmailCodeRequestRegistrationSerializer(data=request.data)
@@ -223,6 +280,8 @@ class SendCodeForResetPasswordView(APIView):
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "send_code"
 
     def post(self, request):
         serializer = EmailCodeRequestResetPasswordSerializer(data=request.data)
@@ -239,6 +298,8 @@ class SendCodeForResetPasswordView(APIView):
 
 class VerifyCodeView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "verify_code"
 
     def post(self, request):
         serializer = EmailCodeVerificationSerializer(data=request.data)
@@ -255,50 +316,36 @@ class VerifyCodeView(APIView):
         email = serializer.validated_data["email"]
         code = serializer.validated_data["code"]
 
-        try:
-            entry = EmailVerificationCode.objects.filter(email=email).latest(
-                "created_at"
-            )
-
-            if entry.code != code:
-                return Response(
-                    {
-                        "success": False,
-                        "message": "Code incorrect",
-                        "data": {"valid": False},
-                    },
-                    status.HTTP_200_OK,
-                )
-
-            if entry.is_expired():
-                return Response(
-                    {
-                        "success": False,
-                        "message": "Code expiré",
-                        "data": {"valid": False},
-                    },
-                    status=status.HTTP_200_OK,
-                )
-
+        entry = get_code(email)
+        if entry is None or entry.code != code:
             return Response(
                 {
-                    "success": True,
-                    "message": "Code vérifié avec succès",
-                    "data": {"valid": True},
+                    "success": False,
+                    "message": "Code incorrect",
+                    "data": {"valid": False},
                 },
-                status=status.HTTP_200_OK,
+                status.HTTP_200_OK,
             )
 
-        except EmailVerificationCode.DoesNotExist:
+        if entry.is_expired():
             return Response(
                 {
                     "success": False,
-                    "message": "Code incorrect",
+                    "message": "Code expiré",
                     "data": {"valid": False},
                 },
                 status=status.HTTP_200_OK,
             )
 
+        return Response(
+            {
+                "success": True,
+                "message": "Code vérifié avec succès",
+                "data": {"valid": True},
+            },
+            status=status.HTTP_200_OK,
+        )
+
 
 class ResetPasswordView(APIView):
     """
@@ -306,6 +353,8 @@ class ResetPasswordView(APIView):
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "reset_password"
 
     def post(self, request):
         """
@@ -371,13 +420,105 @@ class ProgressRecordsView(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    # Paramètres de requête acceptés et leur nom dans ProgressRecordFilterSerializer
+    QUERY_PARAMS = {
+        "from": "date_from",
+        "to": "date_to",
+        "goal": "goal",
+        "activity_level": "activity_level",
+        "cursor": "cursor",
+        "limit": "limit",
+    }
+
     def get(self, request):
         """
-        Récupère les enregistrements liés à l'utilisateur connecté
+        Récupère les enregistrements liés à l'utilisateur connecté.
+        Filtres optionnels : from, to, goal, activity_level.
+        Si `cursor` ou `limit` est fourni, la réponse est paginée par clé (date, id).
         """
-        records = ProgressRecord.objects.filter(user=request.user).order_by("-date")
-        serializer = ProgressRecordSerializer(records, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        params = request.query_params
+        filters = ProgressRecordFilterSerializer(
+            data={
+                key: params[param]
+                for param, key in self.QUERY_PARAMS.items()
+                if param in params
+            }
+        )
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = filters.validated_data
+
+        etag, last_modified = records_validators(request.user)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return set_validators(response, etag, last_modified)
+
+        paginate = "cursor" in params or "limit" in params
+        if not accepts_fast_json(request):
+            try:
+                body = self._list(request.user, data, paginate)
+            except InvalidCursor as exc:
+                return Response(
+                    {"cursor": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST
+                )
+            return set_validators(
+                Response(body, status=status.HTTP_200_OK), etag, last_modified
+            )
+
+        # Chemin rapide : JSON déjà rendu, mis en cache par utilisateur et révision
+        key = records_cache.cache_key(etag, params)
+        content = records_cache.get_listing(key)
+        cache_status = "HIT"
+        if content is None:
+            cache_status = "MISS"
+            try:
+                content = render_json(
+                    self._list(request.user, data, paginate, fast=True)
+                )
+            except InvalidCursor as exc:
+                return Response(
+                    {"cursor": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST
+                )
+            records_cache.set_listing(key, content)
+
+        response = HttpResponse(content, content_type="application/json")
+        response["X-Cache"] = cache_status
+        return set_validators(response, etag, last_modified)
+
+    @staticmethod
+    def filter_records(user, data):
+        records = ProgressRecord.objects.filter(user=user)
+        if "date_from" in data:
+            records = records.filter(date__gte=data["date_from"])
+        if "date_to" in data:
+            records = records.filter(date__lte=data["date_to"])
+        if "goal" in data:
+            records = records.filter(goal=data["goal"])
+        if "activity_level" in data:
+            records = records.filter(activity_level=data["activity_level"])
+        return records
+
+    def _list(self, user, data, paginate, fast=False):
+        """
+        Construit la liste (paginée ou non) des enregistrements filtrés.
+        Avec `fast`, les lignes sont lues avec values() au lieu du serializer.
+        """
+        records = self.filter_records(user, data)
+        if fast:
+            records = records.values(*PROGRESS_RECORD_FIELDS)
+
+        if not paginate:
+            records = records.order_by("-date", "-id")
+            if fast:
+                return list(records)
+            return list(ProgressRecordSerializer(records, many=True).data)
+
+        page, next_cursor = paginate_by_keyset(
+            records, data.get("cursor"), data["limit"]
+        )
+        if not fast:
+            page = list(ProgressRecordSerializer(page, many=True).data)
+        return {"results": page, "next_cursor": next_cursor}
 
     def patch(self, request, primary_key=None):
         """
@@ -385,8 +526,10 @@ class ProgressRecordsView(APIView):
         """
         try:
             record_id = self.kwargs.get("primary_key") or request.path.split("/")[-2]
-            print(record_id)
-            record = ProgressRecord.objects.get(id=record_id, user=request.user)
+            # Le serializer lit instance.user pour recalculer les besoins
+            record = ProgressRecord.objects.select_related("user").get(
+                id=record_id, user=request.user
+            )
         except ProgressRecord.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -405,19 +548,152 @@ class ProgressRecordsView(APIView):
         except ProgressRecord.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        record.delete()
+        with transaction.atomic():
+            record.delete()
+            refresh_rollups(request.user, record.date)
+            CustomUser.touch_records(request.user.pk)
         return Response(
             {"detail": "Enregistrement supprimé avec succès."},
             status=status.HTTP_204_NO_CONTENT,
         )
 
 
+class ProgressRecordRollupsView(APIView):
+    """
+    Vue pour les tendances hebdomadaires/mensuelles calculées côté serveur
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    QUERY_PARAMS = {
+        "granularity": "granularity",
+        "window": "window",
+        "from": "date_from",
+        "to": "date_to",
+    }
+
+    def get(self, request):
+        """
+        Agrège les enregistrements de l'utilisateur connecté par période,
+        avec moyenne mobile du poids sur `window` périodes.
+        """
+        params = request.query_params
+        serializer = ProgressRecordRollupSerializer(
+            data={
+                key: params[param]
+                for param, key in self.QUERY_PARAMS.items()
+                if param in params
+            }
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        etag, last_modified = records_validators(request.user)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return set_validators(response, etag, last_modified)
+
+        if "date_from" in data or "date_to" in data:
+            # Les bornes peuvent couper une période : on agrège à la volée
+            records = ProgressRecord.objects.filter(user=request.user)
+            if "date_from" in data:
+                records = records.filter(date__gte=data["date_from"])
+            if "date_to" in data:
+                records = records.filter(date__lte=data["date_to"])
+            buckets = compute_rollups(records, data["granularity"])
+        else:
+            buckets = read_rollups(request.user, data["granularity"])
+        add_moving_average(buckets, data["window"])
+        return set_validators(
+            Response(
+                {
+                    "granularity": data["granularity"],
+                    "window": data["window"],
+                    "buckets": buckets,
+                },
+                status=status.HTTP_200_OK,
+            ),
+            etag,
+            last_modified,
+        )
+
+
+class ProgressRecordsImportView(APIView):
+    """
+    Vue pour importer un historique d'enregistrements (CSV ou JSONL)
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Importe le fichier envoyé par blocs et renvoie le compte rendu ligne par ligne.
+        """
+        serializer = ProgressRecordImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return error_response(
+                errors=serializer.errors,
+                message="Échec de l'import",
+                status_code=400,
+            )
+
+        upload = serializer.validated_data["file"]
+        try:
+            report = import_progress_records(
+                request.user, upload.file, serializer.validated_data["file_format"]
+            )
+        except ImportFileError as exc:
+            return error_response(
+                errors={"file": [str(exc)]},
+                message="Échec de l'import",
+                status_code=400,
+            )
+
+        return success_response(
+            data=report,
+            message="Import terminé",
+            status_code=201 if report["created"] else 200,
+        )
+
+
+class ProgressRecordsExportView(APIView):
+    """
+    Vue pour télécharger tout l'historique de l'utilisateur (CSV ou NDJSON)
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Renvoie l'export en streaming, éventuellement compressé en gzip à la volée.
+        """
+        serializer = ProgressRecordExportSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        file_format = serializer.validated_data["file_format"]
+        gzip = serializer.validated_data["gzip"]
+
+        records = ProgressRecord.objects.filter(user=request.user)
+        filename = f"nextshape-historique.{file_format}"
+        if gzip:
+            filename += ".gz"
+        response = StreamingHttpResponse(
+            stream_export(records, file_format, gzip=gzip),
+            content_type="application/gzip" if gzip else CONTENT_TYPES[file_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
 class ContactView(APIView):
     """
     Vue pour contacter le responsable
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "contact"
 
     def post(self, request):
         serializer = ContactFormSerializer(data=request.data)
@@ -427,3 +703,51 @@ class ContactView(APIView):
                 {"detail": "Message reçu avec succès."}, status=status.HTTP_200_OK
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class DatabasePoolStatsView(APIView):
+    """
+    Utilisation des connexions PostgreSQL du worker qui répond (réservé aux admins).
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(pool_stats(), status=status.HTTP_200_OK)
+
+
+def metrics_view(request):
+    """
+    Métriques de tous les workers au format Prometheus (voir api/metrics.py).
+    Hors DEBUG, l'endpoint n'existe que si METRICS_TOKEN est défini.
+    """
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            raise Http404
+    elif not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(),
+        f"Bearer {settings.METRICS_TOKEN}".encode(),
+    ):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+
+    # Compteurs déjà partagés entre les workers par le cache
+    cache = records_cache.cache_stats()
+    counters = {
+        "records_cache_hits_total": (
+            "Progress records listing cache hits.",
+            cache["hits"],
+        ),
+        "records_cache_misses_total": (
+            "Progress records listing cache misses.",
+            cache["misses"],
+        ),
+        "throttle_shed_total": (
+            "Requests rejected by rate limiting.",
+            throttle_stats()["shed_total"],
+        ),
+    }
+    source, processes = metrics.store.collect()
+    return HttpResponse(
+        metrics.render(source, counters, processes),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,199 @@
+"""
+Benchmark : concurrence par worker, vues DRF sous WSGI contre vues async sous ASGI.
+
+Chaque profil tourne dans son propre processus (ASYNC_VIEWS choisit les URLs) :
+- wsgi : un worker gunicorn sync traite une requête à la fois (Client, en série) ;
+- asgi : une seule boucle d'évènements avec `--concurrency` requêtes en vol
+  (AsyncClient).
+L'envoi des codes se fait en direct vers SMTPSink avec `--smtp-latency` : c'est l'E/S
+hors base que la boucle recouvre. La concurrence effective est débit x latence
+moyenne (loi de Little).
+
+Usage : python -m benchmarks.bench_asgi --requests 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ENDPOINTS = [
+    ("check-auth", "get", "check-authentication/"),
+    ("records", "get", "progress-records/"),
+    ("verify-code", "post", "verify-code/"),
+    ("send-code", "post", "send-code-registration/"),
+]
+
+
+def payload(name: str, i: int):
+    if name == "verify-code":
+        return {"email": "bench@test.com", "code": "123456"}
+    if name == "send-code":
+        return {"email": f"new{i}@bench.test"}
+    return None
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    throughput = len(latencies) / elapsed
+    mean = statistics.fmean(latencies)
+    return {
+        "rps": throughput,
+        "mean_ms": mean * 1000,
+        "p99_ms": statistics.quantiles(latencies, n=100, method="inclusive")[98] * 1000,
+        "concurrency": throughput * mean,
+    }
+
+
+def run_wsgi(requests: int) -> dict:
+    from django.test import Client
+
+    results = {}
+    for name, method, path in ENDPOINTS:
+        client = Client()
+        client.cookies.load(COOKIES)
+        latencies = []
+        start = time.perf_counter()
+        for i in range(requests):
+            began = time.perf_counter()
+            getattr(client, method)(f"/api/{path}", payload(name, i))
+            latencies.append(time.perf_counter() - began)
+        results[name] = summarize(latencies, time.perf_counter() - start)
+    return results
+
+
+async def run_asgi(requests: int, concurrency: int) -> dict:
+    from django.test import AsyncClient
+
+    results = {}
+    for name, method, path in ENDPOINTS:
+        client = AsyncClient()
+        client.cookies.load(COOKIES)
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(i):
+            async with semaphore:
+                began = time.perf_counter()
+                await getattr(client, method)(f"/api/{path}", payload(name, i))
+                latencies.append(time.perf_counter() - began)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        results[name] = summarize(latencies, time.perf_counter() - start)
+    return results
+
+
+COOKIES: dict = {}
+
+
+def child(args):
+    import datetime
+
+    import django
+
+    django.setup()
+
+    from api.models import CustomUser, ProgressRecord
+    from benchmarks.smtp_sink import SMTPSink
+    from django.db import connection
+    from django.test.utils import (
+        override_settings,
+        setup_test_environment,
+        teardown_test_environment,
+    )
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    sink = SMTPSink(latency=args.smtp_latency).start()
+    try:
+        with override_settings(
+            ENV="bench",
+            EMAIL_OUTBOX=False,
+            EMAIL_HOST=sink.host,
+            EMAIL_PORT=sink.port,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            DEFAULT_FROM_EMAIL="noreply@bench.test",
+            RATE_LIMIT_ENABLED=False,
+            RECORDS_CACHE_TIMEOUT=0,
+            ALLOWED_HOSTS=["*"],
+        ):
+            user = CustomUser.objects.create(
+                email="bench@test.com", username="bench@test.com"
+            )
+            ProgressRecord.objects.bulk_create(
+                ProgressRecord(
+                    user=user,
+                    date=datetime.date(2020, 1, 1) + datetime.timedelta(days=i),
+                    weight_kg=80,
+                    height_cm=180,
+                    imc=24.7,
+                    bmr=1800,
+                    tdee=2700,
+                    calories_recommandees=2700,
+                )
+                for i in range(100)
+            )
+            COOKIES["access_token"] = str(AccessToken.for_user(user))
+            if args.mode == "wsgi":
+                results = run_wsgi(args.requests)
+            else:
+                results = asyncio.run(run_asgi(args.requests, args.concurrency))
+    finally:
+        sink.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--smtp-latency", type=float, default=0.05)
+    parser.add_argument("--mode", choices=["wsgi", "asgi"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "next_shape_ws.settings")
+    if args.mode:
+        child(args)
+        return
+
+    profiles = {}
+    for mode in ("wsgi", "asgi"):
+        env = dict(os.environ, ASYNC_VIEWS=str(mode == "asgi"))
+        process = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_asgi", "--mode", mode]
+            + sys.argv[1:],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode:
+            sys.exit(process.stderr)
+        profiles[mode] = json.loads(process.stdout.strip().splitlines()[-1])
+
+    print(
+        f"requests={args.requests} asgi_concurrency={args.concurrency} "
+        f"smtp_latency={args.smtp_latency}s"
+    )
+    print(
+        f"{'endpoint':<12} {'profile':<5} {'req/s':>8} {'mean ms':>8} "
+        f"{'p99 ms':>8} {'conc.':>6}"
+    )
+    for name, *_ in ENDPOINTS:
+        for mode, results in profiles.items():
+            r = results[name]
+            print(
+                f"{name:<12} {mode:<5} {r['rps']:>8.1f} {r['mean_ms']:>8.1f} "
+                f"{r['p99_ms']:>8.1f} {r['concurrency']:>6.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark : calculs_calories (scalaire, en boucle) contre calculs_calories_batch.
+
+Usage : python -m benchmarks.bench_calculs_calories --rows 1000000
+"""
+
+import argparse
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "next_shape_ws.settings")
+django.setup()
+
+import numpy as np  # noqa: E402
+from api.utils import (  # noqa: E402
+    ACTIVITY_FACTORS,
+    calculs_calories,
+    calculs_calories_batch,
+)
+
+
+def generate_columns(rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return (
+        np.round(rng.uniform(40, 150, rows), 1),
+        np.round(rng.uniform(150, 200, rows), 0),
+        rng.integers(10, 100, rows),
+        rng.choice(["H", "F"], rows),
+        rng.choice(list(ACTIVITY_FACTORS), rows),
+        rng.choice(["maintien", "perte", "prise"], rows),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    columns = generate_columns(args.rows)
+    # La boucle scalaire reçoit des types Python, comme dans les appels réels
+    rows = list(zip(*(column.tolist() for column in columns)))
+
+    start = time.perf_counter()
+    scalar = [calculs_calories(*row) for row in rows]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = calculs_calories_batch(*columns)
+    batch_time = time.perf_counter() - start
+
+    mismatches = sum(
+        scalar[index][key] != batch[key][index]
+        for index in range(args.rows)
+        for key in scalar[index]
+    )
+
+    print(f"rows            : {args.rows}")
+    print(f"scalar loop     : {scalar_time:.3f} s")
+    print(f"vectorized      : {batch_time:.3f} s")
+    print(f"speedup         : {scalar_time / batch_time:.1f}x")
+    print(f"mismatches      : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
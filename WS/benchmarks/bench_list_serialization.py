@@ -0,0 +1,99 @@
+"""
+Benchmark : ProgressRecordSerializer(many=True) + JSONRenderer contre le chemin
+rapide values() + orjson de la liste des enregistrements, tels que les construit
+ProgressRecordsView (GET /api/progress-records/ sans filtre ni pagination).
+
+Les données sont générées dans une base de test temporaire (créée puis détruite).
+Usage : python -m benchmarks.bench_list_serialization --sizes 100 10000 100000
+"""
+
+import argparse
+import datetime
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "next_shape_ws.settings")
+django.setup()
+
+from api.fastpath import render_json  # noqa: E402
+from api.models import CustomUser, ProgressRecord  # noqa: E402
+from api.views import ProgressRecordsView  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+
+def create_records(size: int) -> CustomUser:
+    user = CustomUser.objects.create_user(
+        email=f"bench{size}@test.com", username=f"bench{size}@test.com"
+    )
+    start = datetime.date(1750, 1, 1)
+    ProgressRecord.objects.bulk_create(
+        (
+            ProgressRecord(
+                user=user,
+                date=start + datetime.timedelta(days=i),
+                weight_kg=round(60 + (i % 400) / 10, 1),
+                height_cm=175,
+                activity_level="modere",
+                goal="maintien",
+                imc=round(20 + (i % 500) / 100, 2),
+                bmr=1700 + i % 100,
+                tdee=2600 + i % 100,
+                calories_recommandees=2600 + i % 100,
+            )
+            for i in range(size)
+        ),
+        batch_size=5000,
+    )
+    return user
+
+
+def best_of(func, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"{'rows':>8} {'drf (s)':>10} {'fast (s)':>10} {'speedup':>8} identical")
+        for size in args.sizes:
+            user = create_records(size)
+            view = ProgressRecordsView()
+
+            drf_time, drf_content = best_of(
+                lambda: JSONRenderer().render(view._list(user, {}, paginate=False)),
+                args.repeat,
+            )
+            fast_time, fast_content = best_of(
+                lambda: render_json(view._list(user, {}, paginate=False, fast=True)),
+                args.repeat,
+            )
+            print(
+                f"{size:>8} {drf_time:>10.4f} {fast_time:>10.4f} "
+                f"{drf_time / fast_time:>7.1f}x {drf_content == fast_content}"
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
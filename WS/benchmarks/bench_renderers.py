@@ -0,0 +1,161 @@
+"""
+Benchmark : JSONRenderer / JSONParser de DRF contre ORJSONRenderer / ORJSONParser
+(api/renderers.py, api/parsers.py) sur des réponses typiques des enregistrements :
+
+- list : sortie de ProgressRecordSerializer(many=True) (dates déjà en chaînes) ;
+- rows : lignes values() du chemin rapide (objets date et float) ;
+- envelope : success_response de calculate-calories (date, Decimal) ;
+- errors : error_response avec des ErrorDetail et des messages traduits paresseux.
+
+Les enregistrements sont construits en mémoire, sans base de données.
+Usage : python -m benchmarks.bench_renderers --sizes 1 100 10000 --repeat 5
+"""
+
+import argparse
+import datetime
+import decimal
+import io
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "next_shape_ws.settings")
+django.setup()
+
+from api.fastpath import PROGRESS_RECORD_FIELDS  # noqa: E402
+from api.models import ProgressRecord  # noqa: E402
+from api.parsers import ORJSONParser  # noqa: E402
+from api.renderers import ORJSONRenderer  # noqa: E402
+from api.serializers import ProgressRecordSerializer  # noqa: E402
+from django.utils.translation import gettext_lazy  # noqa: E402
+from rest_framework.exceptions import ErrorDetail  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+
+def build_records(size: int) -> list[ProgressRecord]:
+    start = datetime.date(2020, 1, 1)
+    today = datetime.date(2024, 6, 1)
+    return [
+        ProgressRecord(
+            id=i + 1,
+            date=start + datetime.timedelta(days=i),
+            weight_kg=round(60 + (i % 400) / 10, 1),
+            height_cm=175,
+            activity_level="modere",
+            goal="maintien",
+            imc=round(20 + (i % 500) / 100, 2),
+            bmr=1700 + i % 100,
+            tdee=2600 + i % 100,
+            calories_recommandees=2600 + i % 100,
+            created_at=today,
+            modified_at=today,
+        )
+        for i in range(size)
+    ]
+
+
+def build_payloads(size: int) -> dict:
+    records = build_records(size)
+    return {
+        "list": ProgressRecordSerializer(records, many=True).data,
+        "rows": [
+            {field: getattr(record, field) for field in PROGRESS_RECORD_FIELDS}
+            for record in records
+        ],
+        "envelope": [
+            {
+                "success": True,
+                "message": "Enregistrement calorique effectué avec succès",
+                "data": {
+                    "weight_kg": decimal.Decimal(str(record.weight_kg)),
+                    "height_cm": record.height_cm,
+                    "imc": record.imc,
+                    "date": record.date,
+                    "bmr": record.bmr,
+                    "tdee": record.tdee,
+                    "calories_recommandees": record.calories_recommandees,
+                    "goal": record.goal,
+                },
+            }
+            for record in records
+        ],
+        "errors": [
+            {
+                "success": False,
+                "message": gettext_lazy("Invalid data."),
+                "errors": {
+                    "weight_kg": [
+                        ErrorDetail("A valid number is required.", "invalid")
+                    ],
+                    "goal": [gettext_lazy("This field is required.")],
+                },
+            }
+            for _ in records
+        ],
+    }
+
+
+def best_of(func, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    renderers = JSONRenderer(), ORJSONRenderer()
+    parsers = JSONParser(), ORJSONParser()
+    print(
+        f"{'operation':<16} {'records':>8} {'kB':>8} {'drf (ms)':>10} "
+        f"{'orjson (ms)':>12} {'speedup':>8} identical"
+    )
+    for size in args.sizes:
+        for name, payload in build_payloads(size).items():
+            # Une réponse par enregistrement pour les enveloppes, comme en production
+            items = payload if name in ("envelope", "errors") else [payload]
+            results = [
+                best_of(
+                    lambda renderer=renderer: [renderer.render(item) for item in items],
+                    args.repeat,
+                )
+                for renderer in renderers
+            ]
+            report(f"render {name}", size, results)
+
+            contents = results[0][1]
+            results = [
+                best_of(
+                    lambda parser=parser: [
+                        parser.parse(io.BytesIO(content)) for content in contents
+                    ],
+                    args.repeat,
+                )
+                for parser in parsers
+            ]
+            report(f"parse {name}", size, results)
+
+
+def report(operation, size, results):
+    (drf_time, drf_result), (fast_time, fast_result) = results
+    kilobytes = ""
+    if operation.startswith("render"):
+        kilobytes = f"{sum(len(content) for content in drf_result) / 1024:.0f}"
+    print(
+        f"{operation:<16} {size:>8} {kilobytes:>8} {drf_time * 1000:>10.2f} "
+        f"{fast_time * 1000:>12.2f} {drf_time / fast_time:>7.1f}x "
+        f"{drf_result == fast_result}"
+    )
+
+
+if __name__ == "__main__":
+    main()
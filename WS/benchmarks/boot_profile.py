@@ -0,0 +1,216 @@
+"""
+Mesure du démarrage des workers : temps d'import de la pile, démarrage à froid de
+gunicorn (lancement -> première réponse) et mémoire de chaque worker, pour plusieurs
+profils de next_shape_ws/gunicorn.conf.py :
+
+- baseline : ni preload, ni préchauffage, ni gc.freeze ;
+- warmup : chaque worker se préchauffe avant d'accepter des connexions ;
+- preload : application chargée et préchauffée dans le master avant le fork ;
+- preload+freeze : idem, puis tas gelé (gc.freeze) avant le fork.
+
+La mémoire vient de /proc/<pid>/smaps_rollup (Linux) : RSS, PSS (pages partagées
+réparties entre les processus) et pages privées, après `--requests` requêtes.
+
+Usage : python -m benchmarks.boot_profile --workers 4 --requests 200
+"""
+
+import argparse
+import collections
+import os
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+WS_DIR = Path(__file__).resolve().parent.parent
+URL_PATH = "/api/check-authentication/"
+
+PROFILES = {
+    "baseline": {"GUNICORN_PRELOAD": "False", "BOOT_WARMUP": "False"},
+    "warmup": {"GUNICORN_PRELOAD": "False", "BOOT_WARMUP": "True"},
+    "preload": {
+        "GUNICORN_PRELOAD": "True",
+        "BOOT_WARMUP": "True",
+        "BOOT_GC_FREEZE": "False",
+    },
+    "preload+freeze": {
+        "GUNICORN_PRELOAD": "True",
+        "BOOT_WARMUP": "True",
+        "BOOT_GC_FREEZE": "True",
+    },
+}
+
+
+def import_profile(top: int):
+    """
+    Temps d'import de la pile complète (django.setup + URLconf), par paquet.
+    """
+    code = (
+        "import django; django.setup(); "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    )
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=WS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if process.returncode:
+        sys.exit(process.stderr)
+    packages: collections.Counter = collections.Counter()
+    for line in process.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+\d+ \|\s+(\S+)", line)
+        if match:
+            packages[match.group(2).split(".")[0]] += int(match.group(1))
+    print(
+        f"import: {sum(packages.values()) / 1e6:.3f}s in imports, "
+        f"{elapsed:.3f}s for the whole process"
+    )
+    for package, micros in packages.most_common(top):
+        print(f"  {package:<28} {micros / 1000:>8.1f} ms")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url: str) -> float:
+    # Host autorisé par défaut (DJANGO_ALLOWED_HOSTS), sinon Django répond 400
+    request = urllib.request.Request(url, headers={"Host": "localhost"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def memory(pid: int) -> dict:
+    """
+    Compteurs de smaps_rollup en Mo.
+    """
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, value = line.split(":", 1)
+        values[key] = int(value.split()[0]) / 1024
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "private": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def children(pid: int) -> list[int]:
+    path = Path(f"/proc/{pid}/task/{pid}/children")
+    return [int(child) for child in path.read_text().split()]
+
+
+def run_profile(name: str, workers: int, requests: int) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{URL_PATH}"
+    env = dict(os.environ, **PROFILES[name])
+    log = tempfile.TemporaryFile(mode="w+")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "next_shape_ws.wsgi:application",
+            "-c",
+            "next_shape_ws/gunicorn.conf.py",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(workers),
+        ],
+        cwd=WS_DIR,
+        env=env,
+        stdout=log,
+        stderr=log,
+    )
+    try:
+        # Démarrage à froid : jusqu'à la première réponse complète
+        while True:
+            if process.poll() is not None or time.perf_counter() - start > 60:
+                log.seek(0)
+                sys.exit(log.read())
+            try:
+                first = get(url)
+                break
+            except urllib.error.HTTPError as error:
+                sys.exit(f"{name}: {url} answered {error.code}")
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        cold_start = time.perf_counter() - start
+        while len(children(process.pid)) < workers:
+            time.sleep(0.05)
+        latencies = [get(url) for _ in range(requests)]
+        master = memory(process.pid)
+        worker_memory = [memory(pid) for pid in children(process.pid)]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+    log.seek(0)
+    warm_up = [line for line in log.read().splitlines() if "warm-up" in line][:1]
+    return {
+        "cold_start": cold_start,
+        "first": first,
+        "median": statistics.median(latencies),
+        "max": max(latencies),
+        "master": master,
+        "workers": worker_memory,
+        "warm_up": warm_up[0].split("] ", 2)[-1] if warm_up else "",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument(
+        "--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES)
+    )
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "next_shape_ws.settings")
+
+    import_profile(args.top)
+    print(
+        f"\nworkers={args.workers} requests={args.requests} "
+        "(memory in MB, per worker = average)"
+    )
+    print(
+        f"{'profile':<15} {'cold s':>7} {'1st ms':>7} {'p50 ms':>7} {'max ms':>7} "
+        f"{'master rss':>10} {'wrk rss':>8} {'wrk pss':>8} {'wrk priv':>8} "
+        f"{'total pss':>9}"
+    )
+    for name in args.profiles:
+        result = run_profile(name, args.workers, args.requests)
+        workers = result["workers"]
+        average = {
+            key: statistics.fmean(worker[key] for worker in workers)
+            for key in ("rss", "pss", "private")
+        }
+        total_pss = result["master"]["pss"] + sum(worker["pss"] for worker in workers)
+        print(
+            f"{name:<15} {result['cold_start']:>7.2f} {result['first'] * 1000:>7.1f} "
+            f"{result['median'] * 1000:>7.1f} {result['max'] * 1000:>7.1f} "
+            f"{result['master']['rss']:>10.1f} {average['rss']:>8.1f} "
+            f"{average['pss']:>8.1f} {average['private']:>8.1f} {total_pss:>9.1f}"
+        )
+        if result["warm_up"]:
+            print(f"  {result['warm_up']}")
+
+
+if __name__ == "__main__":
+    main()
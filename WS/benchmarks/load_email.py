@@ -0,0 +1,184 @@
+"""
+Test de charge des parcours qui envoient des emails (codes d'inscription et de
+réinitialisation, formulaire de contact) contre le serveur SMTP local SMTPSink.
+
+En mode "outbox", les requêtes écrivent dans l'outbox puis le worker la vide : on
+mesure séparément la latence des requêtes et le débit d'envoi. En mode "direct"
+(EMAIL_OUTBOX=False), chaque requête envoie son email avant de répondre.
+
+Les données sont créées dans une base de test temporaire (créée puis détruite).
+Usage : python -m benchmarks.load_email --requests 500 --concurrency 8 \\
+            --mode direct --smtp-latency 0.05 --failure-rate 0.05
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import threading
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "next_shape_ws.settings")
+django.setup()
+
+from api.models import CustomUser, EmailOutbox  # noqa: E402
+from api.outbox import SMTPConnection, drain_batch  # noqa: E402
+from benchmarks.smtp_sink import SMTPSink  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+SCENARIOS = {
+    "registration": (
+        "/api/send-code-registration/",
+        lambda i: {"email": f"new{i}@load.test"},
+    ),
+    "reset": (
+        "/api/send-code-reset-password/",
+        lambda i: {"email": f"user{i % 100}@load.test"},
+    ),
+    "contact": (
+        "/api/contact/",
+        lambda i: {"name": f"User {i}", "email": f"c{i}@load.test", "message": "Hi"},
+    ),
+}
+
+
+def percentiles(latencies: list[float]) -> tuple[float, float, float]:
+    if len(latencies) < 2:
+        value = latencies[0] if latencies else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def run_scenario(path, payload, requests: int, concurrency: int) -> dict:
+    """
+    Envoie `requests` POST répartis sur `concurrency` threads (un client chacun).
+    """
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(offset):
+        nonlocal errors
+        client = Client(raise_request_exception=False)
+        local, failed = [], 0
+        for i in range(offset, requests, concurrency):
+            start = time.perf_counter()
+            response = client.post(path, payload(i), content_type="application/json")
+            local.append(time.perf_counter() - start)
+            failed += response.status_code >= 400
+        connections.close_all()
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+
+def drain_outbox() -> tuple[dict, float, int]:
+    """
+    Vide l'outbox comme le worker send_outbox (sans attendre les nouvelles tentatives).
+    """
+    smtp = SMTPConnection()
+    totals = {"sent": 0, "retried": 0, "failed": 0}
+    start = time.perf_counter()
+    try:
+        while True:
+            counts = drain_batch(smtp)
+            if not any(counts.values()):
+                break
+            for key, value in counts.items():
+                totals[key] += value
+    finally:
+        smtp.close()
+    return totals, time.perf_counter() - start, smtp.opened
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--mode", choices=["outbox", "direct"], default="outbox")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--smtp-latency", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    # Les erreurs 500 du mode direct sont comptées, pas journalisées
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    sink = SMTPSink(
+        latency=args.smtp_latency, failure_rate=args.failure_rate, seed=0
+    ).start()
+    try:
+        with override_settings(
+            ENV="load",
+            EMAIL_OUTBOX=args.mode == "outbox",
+            EMAIL_HOST=sink.host,
+            EMAIL_PORT=sink.port,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            DEFAULT_FROM_EMAIL="noreply@load.test",
+            ALLOWED_HOSTS=["*"],
+            RATE_LIMIT_ENABLED=False,
+        ):
+            for i in range(100):
+                CustomUser.objects.create(
+                    email=f"user{i}@load.test", username=f"user{i}@load.test"
+                )
+
+            print(
+                f"mode={args.mode} concurrency={args.concurrency} "
+                f"smtp_latency={args.smtp_latency}s failure_rate={args.failure_rate}"
+            )
+            print(
+                f"{'scenario':<13} {'req':>6} {'err':>5} {'req/s':>8} "
+                f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+            )
+            for name in args.scenarios:
+                path, payload = SCENARIOS[name]
+                result = run_scenario(path, payload, args.requests, args.concurrency)
+                done = len(result["latencies"])
+                p50, p95, p99 = percentiles(result["latencies"])
+                print(
+                    f"{name:<13} {done:>6} {result['errors']:>5} "
+                    f"{done / result['elapsed']:>8.1f} {p50 * 1000:>8.1f} "
+                    f"{p95 * 1000:>8.1f} {p99 * 1000:>8.1f}"
+                )
+
+            if args.mode == "outbox":
+                queued = EmailOutbox.objects.count()
+                totals, elapsed, opened = drain_outbox()
+                print(
+                    f"outbox: {queued} queued, {totals['sent']} sent, "
+                    f"{totals['retried']} retried, {totals['failed']} failed in "
+                    f"{elapsed:.2f}s ({totals['sent'] / elapsed:.1f} emails/s, "
+                    f"{opened} SMTP connection(s))"
+                )
+            print(f"smtp sink: {sink.stats}")
+    finally:
+        sink.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,528 @@
+"""
+Test de charge de bout en bout : des parcours utilisateur complets rejoués contre
+l'URLconf réelle (middlewares, authentification par cookie, outbox) :
+
+    send-code -> verify-code -> register -> login -> calculate-calories
+    -> liste des enregistrements -> patch -> refresh-access
+
+Chaque thread joue le rôle d'un worker sync avec son propre client (cookies).
+Sans `--arrival-rate`, les workers enchaînent les parcours (charge fermée) ; avec,
+les parcours arrivent selon un processus de Poisson (charge ouverte) et l'attente
+d'un worker libre mesure la saturation. Le code de vérification est relu en base,
+comme le ferait l'utilisateur dans sa boîte mail.
+
+Sous SQLite, les écritures concurrentes échouent parfois ("database table is
+locked") : les chiffres de dimensionnement se mesurent sur PostgreSQL.
+
+Rapport par endpoint : débit, erreurs, p50/p95/p99, requêtes SQL (api/metrics.py),
+puis saturation des workers, de la base et du pool de hachage.
+
+Par défaut, les parcours passent par le client de test Django dans ce processus et
+les données sont créées dans une base de test temporaire (créée puis détruite).
+Avec `--url`, ils visent en HTTP un serveur déjà lancé (gunicorn -c
+next_shape_ws/gunicorn.conf.py) : le script doit alors utiliser les mêmes settings
+que le serveur (même base, pour relire les codes), le serveur doit tourner avec
+RATE_LIMIT_ENABLED=False, et les colonnes SQL et la saturation du serveur viennent
+de deux lectures de /metrics (METRICS_TOKEN), avant et après la charge.
+
+Usage : python -m benchmarks.load_journeys --journeys 200 --concurrency 8 \\
+            --arrival-rate 10
+        python -m benchmarks.load_journeys --url http://127.0.0.1:8000 \\
+            --journeys 200 --concurrency 8
+"""
+
+import argparse
+import collections
+import http.cookiejar
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "next_shape_ws.settings")
+django.setup()
+
+from api import metrics  # noqa: E402
+from api.db_pool import pool_stats  # noqa: E402
+from api.hashing import executor as hashing_executor  # noqa: E402
+from api.verification_codes import get_code  # noqa: E402
+from benchmarks.load_email import percentiles  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import resolve  # noqa: E402
+
+STEPS = [
+    "send-code",
+    "verify-code",
+    "register",
+    "login",
+    "calculate-calories",
+    "list-records",
+    "patch-record",
+    "refresh-access",
+]
+
+# Lignes du format texte Prometheus (lecture de /metrics en mode --url)
+SAMPLE = re.compile(r"^(\w+)(?:\{(.*)\})? (\S+)$")
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+class HTTPResponse:
+    def __init__(self, status_code: int, content: bytes):
+        self.status_code = status_code
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class HTTPClient:
+    """
+    Client HTTP minimal avec l'interface du client de test utilisée par journey() :
+    un pot de cookies par client, comme un navigateur.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def _send(self, method, path, data=None, content_type="application/json"):
+        body = None if data is None else json.dumps(data).encode()
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=body,
+            method=method,
+            headers={"Content-Type": content_type} if body is not None else {},
+        )
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                return HTTPResponse(response.status, response.read())
+        except urllib.error.HTTPError as exc:
+            return HTTPResponse(exc.code, exc.read())
+
+    def get(self, path, data=None, **kwargs):
+        return self._send("GET", path)
+
+    def post(self, path, data=None, **kwargs):
+        return self._send("POST", path, data or {}, **kwargs)
+
+    def patch(self, path, data=None, **kwargs):
+        return self._send("PATCH", path, data or {}, **kwargs)
+
+
+def scrape(base_url: str, token: str) -> dict:
+    """
+    Échantillons de /metrics : {(nom, ((étiquette, valeur), ...)): valeur}.
+    """
+    request = urllib.request.Request(
+        base_url.rstrip("/") + "/metrics",
+        headers={"Authorization": f"Bearer {token}"} if token else {},
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        text = response.read().decode()
+    samples = {}
+    for line in text.splitlines():
+        match = SAMPLE.match(line)
+        if match is None:
+            continue
+        name, labels, value = match.groups()
+        key = (name, tuple(sorted(LABEL.findall(labels or ""))))
+        samples[key] = float(value)
+    return samples
+
+
+def server_metrics(before: dict, after: dict):
+    """
+    Ce que le serveur a mesuré pendant la charge : requêtes SQL par route (écart
+    entre les deux lectures), puis pool de hachage et pool de connexions additionnés
+    sur les workers (écart pour les compteurs cumulés, dernière valeur sinon).
+    """
+    server = metrics.Registry()
+    totals: dict = collections.Counter()
+    for (name, labels), value in after.items():
+        delta = value - before.get((name, labels), 0.0)
+        labels = dict(labels)
+        if name == "http_db_queries_total":
+            server.queries[(labels["route"], labels["method"])] = int(delta)
+        elif name == "http_db_query_seconds_total":
+            server.query_seconds[(labels["route"], labels["method"])] = delta
+        elif name.startswith(("password_hashing_", "db_pool_")):
+            totals[name] += value
+            totals[f"{name}:delta"] += delta
+    hashing = {
+        key: int(totals[f"password_hashing_{key}:delta"])
+        for key in ("completed", "rejected", "timeouts")
+    }
+    hashing["workers"] = int(totals["password_hashing_workers"])
+    hashing["queue_wait_seconds"] = totals["password_hashing_queue_wait_seconds:delta"]
+    pool = {"mode": "psycopg" if "db_pool_max_size" in totals else "per worker"}
+    if pool["mode"] == "psycopg":
+        checkouts = totals["db_pool_checkouts:delta"]
+        wait = totals["db_pool_checkout_wait_ms_total:delta"]
+        pool.update(
+            in_use=int(totals["db_pool_in_use"]),
+            max_size=int(totals["db_pool_max_size"]),
+            checkout_wait_ms_avg=round(wait / checkouts, 3) if checkouts else 0.0,
+            checkout_timeouts=int(totals["db_pool_checkout_timeouts:delta"]),
+        )
+    return server, hashing, pool
+
+
+class Recorder:
+    """
+    Latences et erreurs par étape, partagées entre les workers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {step: [] for step in STEPS + ["journey"]}
+        self.errors = {step: 0 for step in STEPS + ["journey"]}
+        self.reasons: collections.Counter = collections.Counter()
+        self.routes = {}
+        self.queue_waits: list[float] = []
+        self.busy = 0.0
+
+    def add(self, step, seconds, failed, reason=None):
+        with self.lock:
+            self.latencies[step].append(seconds)
+            self.errors[step] += failed
+            if reason is not None:
+                self.reasons[(step, reason)] += 1
+
+
+def request(client, recorder, step, method, path, data=None):
+    if step not in recorder.routes:
+        recorder.routes[step] = (resolve(path).route, method.upper())
+    start = time.perf_counter()
+    try:
+        response = getattr(client, method)(path, data, content_type="application/json")
+    except Exception as exc:
+        reason = f"{type(exc).__name__}: {exc}"
+        recorder.add(step, time.perf_counter() - start, True, reason)
+        raise JourneyFailed(step) from exc
+    failed = response.status_code >= 400
+    recorder.add(
+        step,
+        time.perf_counter() - start,
+        failed,
+        f"HTTP {response.status_code}" if failed else None,
+    )
+    if failed:
+        raise JourneyFailed(step)
+    return response
+
+
+def journey(client, recorder: Recorder, n: int, run_id: str):
+    # Adresses propres à l'exécution : une base réutilisée ne contient pas encore
+    email = f"user{n}.{run_id}@load.test"
+    request(
+        client,
+        recorder,
+        "send-code",
+        "post",
+        "/api/send-code-registration/",
+        {"email": email},
+    )
+    code = get_code(email).code
+    response = request(
+        client,
+        recorder,
+        "verify-code",
+        "post",
+        "/api/verify-code/",
+        {"email": email, "code": code},
+    )
+    if not response.json()["data"]["valid"]:
+        raise JourneyFailed("verify-code")
+    request(
+        client,
+        recorder,
+        "register",
+        "post",
+        "/api/register/",
+        {
+            "email": email,
+            "password": "password",
+            "first_name": f"User {n}",
+            "gender": "F" if n % 2 else "H",
+            "birth_date": "1990-01-01",
+        },
+    )
+    request(
+        client,
+        recorder,
+        "login",
+        "post",
+        "/api/login/",
+        {"email": email, "password": "password"},
+    )
+    request(
+        client,
+        recorder,
+        "calculate-calories",
+        "post",
+        "/api/calculate-calories/",
+        {
+            "weight_kg": 60 + n % 40,
+            "height_cm": 170,
+            "goal": "maintien",
+            "gender": "F" if n % 2 else "H",
+            "age": 36,
+            "activity_level": "modere",
+        },
+    )
+    records = request(
+        client, recorder, "list-records", "get", "/api/progress-records/"
+    ).json()
+    request(
+        client,
+        recorder,
+        "patch-record",
+        "patch",
+        f"/api/progress-records/{records[0]['id']}/",
+        {"weight_kg": 59 + n % 40},
+    )
+    request(client, recorder, "refresh-access", "post", "/api/refresh-access/")
+
+
+def run_load(
+    journeys: int,
+    concurrency: int,
+    arrival_rate: float,
+    seed: int,
+    make_client=Client,
+):
+    """
+    `concurrency` workers consomment une file de parcours ; la file est remplie
+    d'avance (charge fermée) ou au fil des arrivées (charge ouverte).
+    """
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    arrivals: queue.Queue = queue.Queue()
+
+    def worker():
+        busy = 0.0
+        while (item := arrivals.get()) is not None:
+            n, arrived = item
+            start = time.perf_counter()
+            if arrived is not None:
+                with recorder.lock:
+                    recorder.queue_waits.append(start - arrived)
+            failed = False
+            try:
+                journey(make_client(), recorder, n, run_id)
+            except JourneyFailed:
+                failed = True
+            spent = time.perf_counter() - start
+            busy += spent
+            recorder.add("journey", spent, failed)
+        connections.close_all()
+        with recorder.lock:
+            recorder.busy += busy
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    if arrival_rate:
+        rng = random.Random(seed)
+        next_arrival = time.perf_counter()
+        for n in range(journeys):
+            time.sleep(max(next_arrival - time.perf_counter(), 0))
+            arrivals.put((n, time.perf_counter()))
+            next_arrival += rng.expovariate(arrival_rate)
+    else:
+        for n in range(journeys):
+            arrivals.put((n, None))
+    for _ in threads:
+        arrivals.put(None)
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - start
+
+
+def report(
+    recorder: Recorder,
+    elapsed: float,
+    concurrency: int,
+    registry: metrics.Registry | None,
+    hashing: dict,
+    pool: dict,
+):
+    """
+    Sans `registry` (serveur distant sans /metrics), seules les mesures du client.
+    """
+    print(
+        f"{'endpoint':<19} {'req':>6} {'err':>5} {'err %':>6} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'sql ms':>7}"
+    )
+    for step in STEPS + ["journey"]:
+        latencies = recorder.latencies[step]
+        if not latencies:
+            continue
+        done, errors = len(latencies), recorder.errors[step]
+        p50, p95, p99 = percentiles(latencies)
+        queries = sql = ""
+        if registry is not None and step in recorder.routes:
+            key = recorder.routes[step]
+            queries = f"{registry.queries.get(key, 0) / done:.1f}"
+            sql = f"{registry.query_seconds.get(key, 0.0) / done * 1000:.1f}"
+        print(
+            f"{step:<19} {done:>6} {errors:>5} {errors / done:>6.1%} "
+            f"{done / elapsed:>8.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} "
+            f"{p99 * 1000:>8.1f} {queries:>8} {sql:>7}"
+        )
+
+    if recorder.reasons:
+        print("errors:")
+    for (step, reason), count in recorder.reasons.most_common(10):
+        print(f"  {count:>5} x {step}: {reason}")
+
+    print("saturation:")
+    line = (
+        f"  workers: {recorder.busy / (concurrency * elapsed):.0%} busy "
+        f"({recorder.busy / elapsed:.1f} of {concurrency} on average)"
+    )
+    if recorder.queue_waits:
+        _, p95, _ = percentiles(recorder.queue_waits)
+        line += f", wait for a free worker p95 {p95 * 1000:.1f} ms"
+    print(line)
+    if registry is None:
+        return
+    sql_seconds = sum(registry.query_seconds.values())
+    total_queries = sum(registry.queries.values())
+    print(
+        f"  database: {total_queries} queries, {sql_seconds:.2f}s in SQL "
+        f"({sql_seconds / elapsed:.2f} connections busy on average)"
+    )
+    completed = hashing.get("completed", 0)
+    wait = hashing.get("queue_wait_seconds", 0.0) / completed if completed else 0.0
+    print(
+        f"  password hashing: {hashing['workers']} workers, {completed} hashes, "
+        f"{wait * 1000:.1f} ms average queue wait, "
+        f"{hashing.get('rejected', 0)} rejected, {hashing.get('timeouts', 0)} timeouts"
+    )
+    if pool.get("mode") == "psycopg":
+        print(
+            f"  db pool: {pool.get('in_use')} in use of {pool.get('max_size')}, "
+            f"{pool.get('checkout_wait_ms_avg')} ms average checkout wait, "
+            f"{pool.get('checkout_timeouts')} timeouts"
+        )
+    else:
+        print(f"  db pool: {pool.get('mode')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--journeys", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--arrival-rate",
+        type=float,
+        default=0.0,
+        help="Journeys started per second (Poisson); 0 runs a closed loop",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--url",
+        help="Base URL of a running server (gunicorn -c next_shape_ws/gunicorn.conf.py); "
+        "journeys go over HTTP instead of the in-process test client",
+    )
+    parser.add_argument(
+        "--metrics-token",
+        default=settings.METRICS_TOKEN,
+        help="Bearer token of the server's /metrics (default: METRICS_TOKEN)",
+    )
+    args = parser.parse_args()
+    print(
+        f"journeys={args.journeys} concurrency={args.concurrency} "
+        f"arrival_rate={args.arrival_rate or 'closed loop'} "
+        f"target={args.url or 'in-process'}"
+    )
+    if args.url:
+        run_http(args)
+    else:
+        run_in_process(args)
+
+
+def run_http(args):
+    try:
+        before = scrape(args.url, args.metrics_token)
+    except (OSError, ValueError) as exc:
+        # Sans /metrics, seules les latences vues du client sont rapportées
+        print(f"/metrics unavailable ({exc}): no server-side figures")
+        before = None
+    recorder, elapsed = run_load(
+        args.journeys,
+        args.concurrency,
+        args.arrival_rate,
+        args.seed,
+        make_client=lambda: HTTPClient(args.url),
+    )
+    print(f"elapsed {elapsed:.2f}s")
+    if before is None:
+        report(recorder, elapsed, args.concurrency, None, {}, {})
+        return
+    # Seul le worker qui répond à /metrics publie ses compteurs sur le champ :
+    # on laisse aux autres le temps de leur écriture périodique
+    time.sleep(settings.METRICS_FLUSH_INTERVAL * 2)
+    server, hashing, pool = server_metrics(before, scrape(args.url, args.metrics_token))
+    report(recorder, elapsed, args.concurrency, server, hashing, pool)
+
+
+def run_in_process(args):
+    # Les erreurs 500 sont comptées, pas journalisées
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(
+            ENV="load",
+            EMAIL_OUTBOX=True,
+            DEFAULT_FROM_EMAIL="noreply@load.test",
+            ALLOWED_HOSTS=["*"],
+            RATE_LIMIT_ENABLED=False,
+            METRICS_ENABLED=True,
+        ):
+            metrics.registry.reset()
+            recorder, elapsed = run_load(
+                args.journeys, args.concurrency, args.arrival_rate, args.seed
+            )
+            print(f"elapsed {elapsed:.2f}s")
+            report(
+                recorder,
+                elapsed,
+                args.concurrency,
+                metrics.registry,
+                hashing_executor.stats(),
+                pool_stats(),
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
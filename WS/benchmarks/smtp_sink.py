@@ -0,0 +1,168 @@
+"""
+Serveur SMTP local qui enregistre les messages au lieu de les distribuer.
+Permet de mesurer les parcours qui envoient des emails sans vrai serveur, avec une
+latence et un taux d'échec simulés. Pas de STARTTLS : utiliser EMAIL_USE_TLS=False.
+
+Usage : python -m benchmarks.smtp_sink --port 1025 --latency 0.05 --failure-rate 0.1
+"""
+
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """
+    Sous-ensemble du protocole SMTP suffisant pour smtplib : EHLO/HELO, MAIL, RCPT,
+    DATA, RSET, NOOP, QUIT.
+    """
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server.sink
+        sink._count("connections")
+        self.reply("220 smtp-sink ready")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-smtp-sink" if verb == "EHLO" else "250 smtp-sink")
+                if verb == "EHLO":
+                    self.reply("250 8BITMIME")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self.read_data()
+                self.reply(sink._deliver(sender, recipients, data))
+                sender, recipients = None, []
+            elif verb == "RSET":
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                return b"".join(lines)
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """
+    Serveur SMTP en tâche de fond. Chaque message accepté est gardé dans `messages`.
+    `latency` (secondes) est ajoutée avant de répondre à DATA ; une proportion
+    `failure_rate` des messages est refusée avec `failure_code` (4xx : temporaire,
+    5xx : définitif).
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_code: int = 451,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_code = failure_code
+        self.messages: list[tuple[str, list[str], bytes]] = []
+        self.stats = {"connections": 0, "accepted": 0, "rejected": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _deliver(self, sender, recipients, data) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self._random.random() < self.failure_rate:
+                self.stats["rejected"] += 1
+                return f"{self.failure_code} Simulated failure"
+            self.stats["accepted"] += 1
+            self.messages.append((sender, recipients, data))
+        return "250 OK"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="smtp-sink", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-code", type=int, default=451)
+    args = parser.parse_args()
+
+    sink = SMTPSink(
+        args.host, args.port, args.latency, args.failure_rate, args.failure_code
+    )
+    print(f"SMTP sink listening on {sink.host}:{sink.port} (Ctrl+C to stop)")
+    try:
+        sink._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink._server.server_close()
+        print(f"{sink.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+"""
+Suite de benchmarks des chemins chauds de l'API : calculs_calories, chaque serializer
+de api/serializers.py et le cycle complet des vues principales via le client de test
+DRF (cookie JWT, middlewares, rendu), sur des jeux de données générés de 10, 10k et
+1M enregistrements par défaut.
+
+Les résultats sont écrits en JSON ; `compare` confronte deux exécutions et signale
+les régressions au-delà d'un seuil (code de sortie 1). Les vues qui écrivent en base
+tournent dans une transaction annulée pour que chaque tour parte du même état.
+
+Les données sont créées dans une base de test temporaire (créée puis détruite).
+Usage : python -m benchmarks.suite run --sizes 10 10000 1000000 --output base.json
+        python -m benchmarks.suite compare base.json new.json --threshold 0.1
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_SIZES = [10, 10_000, 1_000_000]
+GROUPS = ["calories", "serializers", "views"]
+# 1M dates distinctes par utilisateur : on part de l'an 1000 en sautant aujourd'hui
+# (calculate-calories refuse un second enregistrement le même jour)
+FIRST_DATE = datetime.date(1000, 1, 1)
+BATCH_SIZE = 5000
+
+IMPORT_HEADER = "date,weight_kg,height_cm,activity_level,goal"
+
+CALORIES_PAYLOAD = {
+    "weight_kg": 80,
+    "height_cm": 180,
+    "goal": "maintien",
+    "gender": "H",
+    "age": 35,
+    "activity_level": "modere",
+}
+
+
+def record_dates(size: int, today: datetime.date):
+    skip = (today - FIRST_DATE).days
+    for i in range(size):
+        yield FIRST_DATE + datetime.timedelta(days=i + (i >= skip))
+
+
+def create_dataset(size: int):
+    from api.models import CustomUser, ProgressRecord
+    from api.rollups import rebuild_rollups
+    from django.utils import timezone
+
+    user = CustomUser.objects.create_user(
+        email=f"bench{size}@test.com",
+        username=f"bench{size}@test.com",
+        password="password",
+        gender="H",
+        birth_date=datetime.date(1990, 1, 1),
+    )
+    records = (
+        ProgressRecord(
+            user=user,
+            date=date,
+            weight_kg=round(60 + (i % 400) / 10, 1),
+            height_cm=175,
+            activity_level="modere",
+            goal="maintien",
+            imc=round(20 + (i % 500) / 100, 2),
+            bmr=1700 + i % 100,
+            tdee=2600 + i % 100,
+            calories_recommandees=2600 + i % 100,
+        )
+        for i, date in enumerate(record_dates(size, timezone.localdate()))
+    )
+    # Par lots : bulk_create matérialiserait le million d'instances d'un coup
+    while batch := list(itertools.islice(records, BATCH_SIZE)):
+        ProgressRecord.objects.bulk_create(batch)
+    rebuild_rollups(user)
+    return user
+
+
+def calories_inputs(size: int, seed: int = 0) -> list[tuple]:
+    from api.utils import ACTIVITY_FACTORS
+
+    rng = random.Random(seed)
+    return [
+        (
+            round(rng.uniform(40, 150), 1),
+            round(rng.uniform(150, 200)),
+            rng.randint(10, 99),
+            rng.choice(["H", "F"]),
+            rng.choice(list(ACTIVITY_FACTORS)),
+            rng.choice(["maintien", "perte", "prise"]),
+        )
+        for _ in range(size)
+    ]
+
+
+def calories_cases(size: int):
+    import numpy as np
+    from api.utils import calculs_calories, calculs_calories_batch
+
+    rows = calories_inputs(size)
+    columns = [np.array(column) for column in zip(*rows)]
+    yield "calculs_calories", size, lambda: [calculs_calories(*row) for row in rows]
+    yield "calculs_calories_batch", size, lambda: calculs_calories_batch(*columns)
+
+
+def serializer_cases(user, size: int, iterations: int):
+    from api import serializers
+    from api.models import ProgressRecord
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from rest_framework.test import APIRequestFactory
+
+    request = APIRequestFactory().get("/")
+    request.user = user
+    lines = "\n".join(
+        [IMPORT_HEADER]
+        + [f"2020-01-{day:02d},70,165,modere,perte" for day in range(1, 29)]
+    ).encode()
+
+    # (serializer, données, contexte, itérations par tour)
+    validations = [
+        (
+            serializers.RegisterSerializer,
+            lambda: {"email": "new@test.com", "password": "password"},
+            {},
+            iterations,
+        ),
+        # Hachage complet du mot de passe à chaque validation (algorithme de
+        # PASSWORD_HASHER, noté dans les métadonnées)
+        (
+            serializers.LoginSerializer,
+            lambda: {"email": user.email, "password": "password"},
+            {},
+            1,
+        ),
+        (
+            serializers.EmailCodeRequestSerializer,
+            lambda: {"email": "new@test.com"},
+            {},
+            iterations,
+        ),
+        (
+            serializers.EmailCodeRequestRegistrationSerializer,
+            lambda: {"email": "new@test.com"},
+            {},
+            iterations,
+        ),
+        (
+            serializers.EmailCodeRequestResetPasswordSerializer,
+            lambda: {"email": user.email},
+            {},
+            iterations,
+        ),
+        (
+            serializers.EmailCodeVerificationSerializer,
+            lambda: {"email": user.email, "code": "123456"},
+            {},
+            iterations,
+        ),
+        (
+            serializers.ResetPasswordSerializer,
+            lambda: {"email": user.email, "password": "password"},
+            {},
+            iterations,
+        ),
+        (
+            serializers.CaloriesRecordSerializer,
+            lambda: CALORIES_PAYLOAD,
+            {"context": {"request": request}},
+            iterations,
+        ),
+        (
+            serializers.ProgressRecordFilterSerializer,
+            lambda: {"date_from": "2020-01-01", "date_to": "2020-12-31", "limit": 50},
+            {},
+            iterations,
+        ),
+        (
+            serializers.ProgressRecordRollupSerializer,
+            lambda: {"granularity": "month", "window": 3},
+            {},
+            iterations,
+        ),
+        (
+            serializers.ProgressRecordImportRowSerializer,
+            lambda: {"date": "2020-01-01", "weight_kg": 70, "height_cm": 165},
+            {},
+            iterations,
+        ),
+        (
+            serializers.ProgressRecordImportSerializer,
+            lambda: {"file": SimpleUploadedFile("history.csv", lines)},
+            {},
+            iterations,
+        ),
+        (
+            serializers.ProgressRecordExportSerializer,
+            lambda: {"file_format": "ndjson", "gzip": True},
+            {},
+            iterations,
+        ),
+        (
+            serializers.ContactFormSerializer,
+            lambda: {"name": "A", "email": "a@test.com", "message": "Bonjour"},
+            {},
+            iterations,
+        ),
+    ]
+    for serializer_class, data, kwargs, ops in validations:
+
+        def validate(
+            serializer_class=serializer_class, data=data, kwargs=kwargs, ops=ops
+        ):
+            for _ in range(ops):
+                serializer_class(data=data(), **kwargs).is_valid(raise_exception=True)
+
+        yield serializer_class.__name__, ops, validate
+
+    profile = serializers.UpdateProfileSerializer
+
+    def update_profile():
+        for _ in range(iterations):
+            profile(user, data={"first_name": "Bench"}, partial=True).is_valid(
+                raise_exception=True
+            )
+
+    yield profile.__name__, iterations, update_profile
+
+    records = ProgressRecord.objects.filter(user=user).order_by("-date", "-id")
+    yield (
+        serializers.ProgressRecordSerializer.__name__,
+        size,
+        lambda: serializers.ProgressRecordSerializer(records, many=True).data,
+    )
+
+
+def rolled_back(func):
+    from django.db import transaction
+
+    def run():
+        with transaction.atomic():
+            func()
+            transaction.set_rollback(True)
+
+    return run
+
+
+def view_cases(user, size: int):
+    from api.models import ProgressRecord
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    client = APIClient()
+    client.cookies["access_token"] = str(AccessToken.for_user(user))
+    record = ProgressRecord.objects.filter(user=user).latest("date")
+    # Dates postérieures au jeu de données : chaque ligne est créée (pas de doublon)
+    # et l'import reconstruit les agrégats comme en production
+    upload = "\n".join(
+        [IMPORT_HEADER]
+        + [
+            f"{record.date + datetime.timedelta(days=i)},70,165,modere,perte"
+            for i in range(1, 101)
+        ]
+    ).encode()
+
+    def call(method, url, data=None, **kwargs):
+        def run():
+            response = getattr(client, method)(url, data, **kwargs)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method.upper()} {url}: {response.status_code}")
+
+        return run
+
+    yield "check_authentication", 1, call("get", "/api/check-authentication/")
+    yield "login", 1, call(
+        "post", "/api/login/", {"email": user.email, "password": "password"}
+    )
+    yield "progress_records", size, call("get", "/api/progress-records/")
+    yield "progress_records_page", min(size, 50), call(
+        "get", "/api/progress-records/", {"limit": 50}
+    )
+    yield "progress_records_rollups", 1, call(
+        "get", "/api/progress-records/rollups/", {"granularity": "month"}
+    )
+    yield "progress_records_export", size, call("get", "/api/progress-records/export/")
+    yield "calculate_calories", 1, rolled_back(
+        call("post", "/api/calculate-calories/", CALORIES_PAYLOAD)
+    )
+    yield "progress_record_patch", 1, rolled_back(
+        call("patch", f"/api/progress-records/{record.pk}/", {"weight_kg": 79})
+    )
+    yield "progress_records_import", 100, rolled_back(
+        lambda: call(
+            "post",
+            "/api/progress-records/import/",
+            {"file": SimpleUploadedFile("history.csv", upload)},
+            format="multipart",
+        )()
+    )
+
+
+def measure(func, rounds: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "rounds": rounds,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if rounds > 1 else 0.0,
+    }
+
+
+def environment() -> dict:
+    import django
+    from django.conf import settings
+    from django.db import connection
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "password_hasher": settings.PASSWORD_HASHERS[0],
+        "machine": platform.machine(),
+    }
+
+
+def run(args):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "next_shape_ws.settings")
+    import django
+
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import (
+        override_settings,
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    results = {}
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        # Sans cache des listes ni limite de débit : on mesure le travail réel
+        with override_settings(
+            ENV="bench",
+            RATE_LIMIT_ENABLED=False,
+            RECORDS_CACHE_TIMEOUT=0,
+            ALLOWED_HOSTS=["*"],
+        ):
+            print(f"{'benchmark':<52} {'median ms':>11} {'per op µs':>11}")
+            for size in args.sizes:
+                start = time.perf_counter()
+                user = create_dataset(size)
+                print(f"# dataset {size}: {time.perf_counter() - start:.1f}s")
+                cases = {
+                    "calories": lambda: calories_cases(size),
+                    "serializers": lambda: serializer_cases(
+                        user, size, args.iterations
+                    ),
+                    "views": lambda: view_cases(user, size),
+                }
+                for group in args.groups:
+                    for name, ops, func in cases[group]():
+                        key = f"{group}.{name}[{size}]"
+                        stats = measure(func, args.rounds, args.warmup)
+                        stats["ops"] = ops
+                        stats["per_op"] = stats["median"] / max(ops, 1)
+                        results[key] = stats
+                        print(
+                            f"{key:<52} {stats['median'] * 1000:>11.3f} "
+                            f"{stats['per_op'] * 1e6:>11.2f}"
+                        )
+        meta = environment()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    meta.update(
+        sizes=args.sizes,
+        rounds=args.rounds,
+        warmup=args.warmup,
+        iterations=args.iterations,
+    )
+    with open(args.output, "w") as output:
+        json.dump({"meta": meta, "results": results}, output, indent=2)
+    print(f"# results written to {args.output}")
+
+
+def compare_results(base: dict, new: dict, threshold: float) -> list[dict]:
+    """
+    Écart relatif des médianes pour chaque benchmark présent dans les deux exécutions.
+    """
+    rows = []
+    for key in [key for key in base if key in new]:
+        before, after = base[key]["median"], new[key]["median"]
+        change = after / before - 1 if before else 0.0
+        if change > threshold:
+            verdict = "REGRESSION"
+        elif change < -threshold:
+            verdict = "faster"
+        else:
+            verdict = ""
+        rows.append(
+            {
+                "benchmark": key,
+                "base": before,
+                "new": after,
+                "change": change,
+                "verdict": verdict,
+            }
+        )
+    return rows
+
+
+def compare(args):
+    with open(args.base) as base, open(args.new) as new:
+        base, new = json.load(base), json.load(new)
+    rows = compare_results(base["results"], new["results"], args.threshold)
+
+    print(f"base: {base['meta'].get('commit')}  new: {new['meta'].get('commit')}")
+    print(f"{'benchmark':<52} {'base ms':>10} {'new ms':>10} {'change':>8}")
+    for row in rows:
+        print(
+            f"{row['benchmark']:<52} {row['base'] * 1000:>10.3f} "
+            f"{row['new'] * 1000:>10.3f} {row['change']:>+8.1%} {row['verdict']}"
+        )
+    for key in sorted(base["results"].keys() ^ new["results"].keys()):
+        print(f"{key:<52} only in {'base' if key in base['results'] else 'new'}")
+
+    regressions = [row for row in rows if row["verdict"] == "REGRESSION"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and write JSON results")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    run_parser.add_argument("--groups", nargs="+", choices=GROUPS, default=GROUPS)
+    run_parser.add_argument("--rounds", type=int, default=5)
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument(
+        "--iterations",
+        type=int,
+        default=100,
+        help="Validations per round for single-payload serializers",
+    )
+    run_parser.add_argument("--output", default="bench_results.json")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser(
+        "compare", help="Compare two result files and flag regressions"
+    )
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown of the median flagged as a regression",
+    )
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,9 @@ python manage.py migrate
 echo "Collect static files"
 python manage.py collectstatic --noinput
 
+# The email outbox worker runs as its own service: outbox in docker-compose.yml
+# (worker profile), started by outbox.sh
+
 if [ "$ENV" = "local" ]; then
     echo "Local mode (Docker local)"
     echo "Seeding the database..."
@@ -26,7 +29,11 @@ elif [ "$ENV" = "test" ]; then
     exec pytest --disable-warnings --cov=api
 elif [ "$ENV" = "prod" ]; then
     echo "Production mode"
-    exec gunicorn next_shape_ws.wsgi:application --bind 0.0.0.0:8000 --workers 3 --timeout 120
+    # Bind, workers, preloading and warm-up: see next_shape_ws/gunicorn.conf.py
+    if [ "$SERVER" = "asgi" ]; then
+        exec gunicorn next_shape_ws.asgi:application -k uvicorn.workers.UvicornWorker -c next_shape_ws/gunicorn.conf.py
+    fi
+    exec gunicorn next_shape_ws.wsgi:application -c next_shape_ws/gunicorn.conf.py
 else
     echo "Unknown ENV : $ENV"
     exit 1
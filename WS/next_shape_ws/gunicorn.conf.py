@@ -0,0 +1,72 @@
+"""
+Profil de démarrage de production pour gunicorn (workers sync et uvicorn).
+
+Avec GUNICORN_PRELOAD, l'application est importée et préchauffée une seule fois dans
+le master, puis le tas est gelé (gc.freeze) juste avant le fork : les workers
+héritent de ces pages en copie sur écriture et n'ont plus rien à charger.
+Sans preload, chaque worker se préchauffe avant d'accepter des connexions.
+
+Usage : gunicorn next_shape_ws.wsgi:application -c next_shape_ws/gunicorn.conf.py
+"""
+
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS") or 3)
+timeout = int(os.getenv("GUNICORN_TIMEOUT") or 120)
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+
+BOOT_WARMUP = os.getenv("BOOT_WARMUP", "True") == "True"
+BOOT_GC_FREEZE = os.getenv("BOOT_GC_FREEZE", "True") == "True"
+
+# Instantanés des métriques de chaque worker, additionnés par /metrics (api/metrics.py).
+# Lu par les settings au chargement de l'application, après ce fichier.
+METRICS_DIR = os.environ.setdefault(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "next_shape_ws_metrics")
+)
+
+
+def _warm_up(log, label):
+    from api.boot import warm_up
+
+    timings = warm_up()
+    log.info(
+        "%s warm-up: %s",
+        label,
+        ", ".join(
+            f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()
+        ),
+    )
+
+
+def on_starting(server):
+    # Compteurs remis à zéro à chaque démarrage du master, comme un processus unique
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def when_ready(server):
+    # Master : application déjà chargée (preload), workers pas encore forkés
+    if not server.cfg.preload_app:
+        return
+    if BOOT_WARMUP:
+        _warm_up(server.log, "master")
+    if BOOT_GC_FREEZE:
+        from api.boot import freeze_heap
+
+        server.log.info("master: %d objects frozen before fork", freeze_heap())
+
+
+def post_worker_init(worker):
+    # Worker : application chargée, avant la première connexion acceptée
+    if BOOT_WARMUP and not worker.cfg.preload_app:
+        _warm_up(worker.log, f"worker {worker.pid}")
+
+
+def worker_exit(server, worker):
+    # Dernières mesures du worker avant sa sortie (max_requests, arrêt, timeout)
+    from api.metrics import store
+
+    store.flush()
@@ -14,13 +14,15 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
-from dotenv import load_dotenv
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Le .env n'existe qu'en local (exclu de l'image) : pas d'import de dotenv sinon
 dotenv_path = BASE_DIR / ".env"
-load_dotenv(dotenv_path, override=True)
+if dotenv_path.exists():
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path, override=True)
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -51,7 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.WhiteNoiseMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -81,10 +84,52 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "next_shape_ws.wsgi.application"
+ASGI_APPLICATION = "next_shape_ws.asgi.application"
+
+# Serveur de production : "wsgi" (gunicorn sync) ou "asgi" (gunicorn + uvicorn).
+# Sous ASGI, les vues d'E/S passent par leurs versions async (api/async_views.py).
+SERVER = os.getenv("SERVER", "wsgi")
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", str(SERVER == "asgi")) == "True"
+
+# Métriques par route exposées sur /metrics (format Prometheus).
+# METRICS_TOKEN doit être envoyé en "Authorization: Bearer <token>" ; sans lui,
+# l'endpoint n'est servi qu'en DEBUG. METRICS_DIR (défini par gunicorn.conf.py)
+# partage les compteurs entre les workers, écrits toutes les METRICS_FLUSH_INTERVAL s.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL") or 1)
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": ("api.authentication.CookieJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # Nombre de proxies de confiance devant gunicorn : 0 ignore X-Forwarded-For
+    # (envoyé par le client) et identifie le client par REMOTE_ADDR
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES") or 0),
+    # JSON lu et rendu par orjson (api/renderers.py, api/parsers.py)
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+}
+
+# Limites des vues publiques (api.throttling.TokenBucketThrottle), par scope :
+# "capacité/période" pour l'adresse IP et pour l'email envoyé dans le corps.
+# Seaux stockés dans le cache par défaut : partagé entre les workers, sinon la limite
+# réelle est multipliée par le nombre de workers.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True") == "True"
+RATE_LIMITS = {
+    "login": {"ip": "20/min", "email": "10/min"},
+    "register": {"ip": "10/min"},
+    "send_code": {"ip": "10/min", "email": "3/min"},
+    "verify_code": {"ip": "30/min", "email": "10/min"},
+    "reset_password": {"ip": "10/min", "email": "5/min"},
+    "contact": {"ip": "5/min"},
 }
 
 
@@ -108,6 +153,47 @@ DATABASES = {
     }
 }
 
+# Réutilisation des connexions PostgreSQL (DB_POOL) :
+# - "off" : une connexion par requête (comportement par défaut de Django) ;
+# - "persistent" : connexions gardées DB_CONN_MAX_AGE secondes par thread (WSGI) ;
+# - "psycopg" : pool psycopg 3 par processus, à préférer sous ASGI où les connexions
+#   persistantes ne sont pas réutilisées. Au total, workers x DB_POOL_MAX_SIZE doit
+#   rester sous le max_connections de PostgreSQL.
+DB_POOL = os.getenv("DB_POOL", "off")
+if DB_POOL == "persistent":
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE") or 600)
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif DB_POOL == "psycopg":
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE") or 2),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE") or 10),
+            # Attente maximale (secondes) pour obtenir une connexion du pool
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT") or 10),
+        }
+    }
+
+# Cache configuration
+# LocMemCache par défaut (un cache par worker), un cache partagé peut être choisi
+# par variables d'environnement (ex: django.core.cache.backends.redis.RedisCache)
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+# Durée de vie (secondes) des listes d'enregistrements mises en cache par utilisateur
+RECORDS_CACHE_TIMEOUT = int(os.getenv("RECORDS_CACHE_TIMEOUT") or 300)
+
+# Codes de vérification email : durée de validité (secondes) et stockage ("db" ou
+# "cache", ce dernier uniquement avec un cache partagé : Redis ou Memcached)
+VERIFICATION_CODE_TTL = int(os.getenv("VERIFICATION_CODE_TTL") or 600)
+VERIFICATION_CODE_STORE = os.getenv("VERIFICATION_CODE_STORE", "db")
+
 # Email configuration
 
 EMAIL_BACKEND = os.getenv(
@@ -120,6 +206,19 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "True") == "True"
 
+# Outbox : les emails sont enregistrés en base puis envoyés par `manage.py send_outbox`.
+# EMAIL_OUTBOX=False revient à l'envoi direct pendant la requête.
+EMAIL_OUTBOX = os.getenv("EMAIL_OUTBOX", "True") == "True"
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE") or 50)
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS") or 5)
+# Délai de la première nouvelle tentative (secondes), doublé à chaque échec
+EMAIL_OUTBOX_RETRY_DELAY = int(os.getenv("EMAIL_OUTBOX_RETRY_DELAY") or 30)
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL") or 2)
+# Emails envoyés conservés ce nombre de jours puis supprimés par le worker (0 : jamais)
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS") or 7)
+# Connexion SMTP fermée après ce délai d'inactivité (secondes)
+EMAIL_SMTP_IDLE_TIMEOUT = int(os.getenv("EMAIL_SMTP_IDLE_TIMEOUT") or 60)
+
 # Model for the customised User
 AUTH_USER_MODEL = "api.CustomUser"
 
@@ -141,6 +240,29 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# PASSWORD_HASHER=argon2 passe le hachage par défaut à Argon2 (paramètres réglables),
+# les hash PBKDF2 existants sont recalculés à la prochaine connexion.
+
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST") or 2)
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST") or 65536)
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM") or 2)
+
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "api.hashing.TunableArgon2PasswordHasher",
+]
+if os.getenv("PASSWORD_HASHER") == "argon2":
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop())
+
+# Pool partagé (thread ou process) pour le hachage : nombre de workers, nombre
+# maximal de demandes en attente ou en cours, délai d'attente maximal dans la file
+PASSWORD_HASHING_POOL = os.getenv("PASSWORD_HASHING_POOL", "thread")
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS") or 2)
+PASSWORD_HASHING_MAX_PENDING = int(os.getenv("PASSWORD_HASHING_MAX_PENDING") or 16)
+PASSWORD_HASHING_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASHING_QUEUE_TIMEOUT") or 5)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -164,6 +286,21 @@ STATICFILES_DIRS = [BASE_DIR / "UI" / "dist"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# collectstatic : manifest haché et variantes gzip/brotli précompressées (api/storage.py)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+            if ENV == "test"
+            else "api.storage.SPAStaticFilesStorage"
+        )
+    },
+}
+
+# Coquille de la SPA servie depuis la mémoire par api.spa
+SPA_INDEX_FILE = BASE_DIR / "UI" / "dist" / "index.html"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -179,6 +316,14 @@ SIMPLE_JWT = {
 }
 
 
+# Authentification sans requête : l'utilisateur est reconstruit depuis les claims
+# du token ou servi par un cache LRU du processus (taille bornée, durée de vie en s).
+# Les révocations (compte supprimé ou désactivé) passent par le cache partagé.
+AUTH_USER_CACHE = os.getenv("AUTH_USER_CACHE", "False") == "True"
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE") or 10000)
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL") or 60)
+
+
 # Cookie settings for auth
 COOKIE_PARAMS = {
     "httponly": True,
@@ -14,12 +14,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from api.spa import spa_shell
+from api.views import metrics_view
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
-from django.views.generic import TemplateView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/", include("api.urls")),
-    path("", TemplateView.as_view(template_name="index.html")),
+    path("metrics", metrics_view, name="metrics"),
+    path("api/", include("api.async_urls" if settings.ASYNC_VIEWS else "api.urls")),
+    path("", spa_shell, name="spa"),
 ]
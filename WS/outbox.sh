@@ -0,0 +1,14 @@
+#!/usr/bin/env bash
+
+./wait.sh "$DATABASE_HOST:$DATABASE_PORT"
+
+# The app service applies the migrations: wait for them instead of failing on a
+# missing table
+echo "Wait for the migrations"
+until python manage.py migrate --check --skip-checks > /dev/null 2>&1; do
+    echo "Migrations not applied yet..."
+    sleep 2
+done
+
+echo "Start the email outbox worker"
+exec python manage.py send_outbox